@@ -0,0 +1,119 @@
+"""
+Picnic basket spreads
+
+A basket trades against its synthetic copy, the weighted sum of its components:
+
+    PICNIC_BASKET1 = 6 CROISSANTS + 3 JAMS + 1 DJEMBES
+    PICNIC_BASKET2 = 4 CROISSANTS + 2 JAMS
+
+synthetic_quote gives the executable synthetic bid/ask: what selling or buying every leg
+for a number of baskets at once really earns or costs, walking each component's book
+level by level instead of pricing the legs at their mids. BasketSpread keeps the basket's
+premium over the synthetic mid in a RollingWindow, so its mean, std and z-score cost
+O(1) per tick:
+
+    spread = BasketSpread(window=100)
+    spread.update(basket_mid - synthetic_mid(mids, BASKETS["PICNIC_BASKET1"]))
+    synthetic_bid, synthetic_ask = synthetic_quote(state.order_depths, BASKETS["PICNIC_BASKET1"])
+    if basket_best_bid > synthetic_ask + spread.mean() + threshold:
+        ...  # the basket is rich even after paying to cross every leg
+"""
+from typing import Dict, Optional, Tuple
+
+from common.datamodel import OrderDepth
+from common.indicators import RollingWindow
+from common.order_book import ask_prices, bid_prices
+
+BASKETS: Dict[str, Dict[str, int]] = {
+    "PICNIC_BASKET1": {"CROISSANTS": 6, "JAMS": 3, "DJEMBES": 1},
+    "PICNIC_BASKET2": {"CROISSANTS": 4, "JAMS": 2},
+}
+
+
+def sweep(levels: Dict[int, int], prices, quantity: int) -> Optional[int]:
+    """Total price of taking quantity units from one side, best price first; None if it is too thin"""
+    total = 0
+    for price in prices:
+        if quantity <= 0:
+            break
+        taken = min(abs(levels[price]), quantity)
+        total += taken * price
+        quantity -= taken
+    return total if quantity <= 0 else None
+
+
+def synthetic_quote(order_depths: Dict[str, OrderDepth], weights: Dict[str, int],
+                    baskets: int = 1) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Per basket (bid, ask) of the synthetic basket when `baskets` of them are sold or bought
+    by hitting every component's book. A side is None if some leg hasn't got the depth.
+    """
+    bid = ask = 0
+    for product, weight in weights.items():
+        depth = order_depths.get(product)
+        if depth is None:
+            return None, None
+        quantity = weight * baskets
+        if bid is not None:
+            proceeds = sweep(depth.buy_orders, bid_prices(depth), quantity)
+            bid = bid + proceeds if proceeds is not None else None
+        if ask is not None:
+            cost = sweep(depth.sell_orders, ask_prices(depth), quantity)
+            ask = ask + cost if cost is not None else None
+    return (bid / baskets if bid is not None else None,
+            ask / baskets if ask is not None else None)
+
+
+def synthetic_capacity(order_depths: Dict[str, OrderDepth], weights: Dict[str, int]) -> Tuple[int, int]:
+    """How many whole synthetic baskets the visible depth can sell and buy"""
+    sell = buy = None
+    for product, weight in weights.items():
+        depth = order_depths.get(product)
+        if depth is None:
+            return 0, 0
+        bids = sum(abs(volume) for volume in depth.buy_orders.values()) // weight
+        asks = sum(abs(volume) for volume in depth.sell_orders.values()) // weight
+        sell = bids if sell is None else min(sell, bids)
+        buy = asks if buy is None else min(buy, asks)
+    return sell or 0, buy or 0
+
+
+def synthetic_mid(mids: Dict[str, float], weights: Dict[str, int]) -> float:
+    return sum(weight * mids[product] for product, weight in weights.items())
+
+
+class BasketSpread:
+    """Rolling statistics of a basket's premium (basket mid - synthetic mid)"""
+
+    def __init__(self, window: int = 100):
+        self.premium = RollingWindow(window)
+
+    def update(self, premium: float) -> None:
+        self.premium.update(premium)
+
+    def mean(self) -> float:
+        """Mean premium of the window, 0 before the first update"""
+        mean = self.premium.mean()
+        return mean if mean is not None else 0.0
+
+    def std(self) -> Optional[float]:
+        return self.premium.std()
+
+    def zscore(self, premium: Optional[float] = None) -> Optional[float]:
+        """How unusual premium (default: the latest one) is, None until the window has spread"""
+        if premium is None:
+            premium = self.premium.last()
+        std = self.premium.std()
+        if premium is None or not std:
+            return None
+        return (premium - self.mean()) / std
+
+    def codec_fields(self, name: str) -> list:
+        return self.premium.codec_fields(name)
+
+    def state(self, name: str) -> Dict[str, object]:
+        return self.premium.state(name)
+
+    def restore_state(self, values: Optional[Dict[str, object]], name: str) -> "BasketSpread":
+        self.premium.restore_state(values, name)
+        return self
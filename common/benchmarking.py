@@ -0,0 +1,29 @@
+"""
+Timing for the module benchmarks (`python -m common.<module>`)
+
+The machines these run on are noisy, so every figure is the fastest of several timed
+loops (timeit.repeat), never a single pass, and every benchmark prints it the same way:
+
+    seconds = best_time(lambda: black_scholes(spot, VOUCHER_STRIKE_ARRAY, time, 0.2), number=1000)
+    print_time("black_scholes", seconds, per="tick")
+
+    seconds = best_time(lambda: [run(tick) for tick in ticks]) / len(ticks)   # varying inputs
+"""
+import timeit
+from typing import Callable
+
+
+def best_time(run: Callable[[], object], number: int = 1, repeat: int = 5) -> float:
+    """Seconds per call of run, the fastest of `repeat` loops of `number` calls"""
+    return min(timeit.repeat(run, number=number, repeat=repeat)) / number
+
+
+def print_time(name: str, seconds: float, per: str = "", note: str = "") -> None:
+    """One aligned benchmark line, in ns below a microsecond, us below a millisecond, ms above"""
+    if seconds < 1e-6:
+        value, unit = seconds * 1e9, "ns"
+    else:
+        value, unit = (seconds * 1e6, "us") if seconds < 1e-3 else (seconds * 1e3, "ms")
+    if per:
+        unit += "/" + per
+    print(f"{name:28} {value:8.1f} {unit:8} {note}".rstrip())
@@ -0,0 +1,153 @@
+"""
+Single file submissions
+
+The exchange takes one Python file, but the traders import the shared code from
+common/. bundle() turns a trader into a self-contained file: every common module it
+imports (and everything those import, at module level) is embedded as source and
+registered in sys.modules under its own name before the trader's code runs, so the
+trader's `from common.x import y` lines work unchanged and the modules keep their own
+namespaces. The trader's sys.path bootstrap lines are dropped, they need __file__ and
+the repo layout.
+
+    python -m common.bundle round_5/day5Algo.py -o submission.py
+    python -m common.bundle prosperity_2/main.py --datamodel > main_standalone.py
+
+`from datamodel import ...` is left to the exchange, which provides that module. With
+--datamodel the datamodel.py next to a trader that imports it (the re-export of
+common.datamodel) is embedded as well, so the file also runs on its own outside the repo.
+
+Imports made inside functions (e.g. common.loader in offline helpers) are not followed;
+those functions are for research and are not called by the traders.
+"""
+import argparse
+import ast
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PACKAGE = "common"
+
+_LOADER = '''
+def _load_bundled_modules():
+    import sys
+    import types
+
+    for name, source in _BUNDLED_MODULES:
+        module = types.ModuleType(name)
+        module.__file__ = "<bundled " + name + ">"
+        if name == "{package}":
+            module.__path__ = []
+        sys.modules[name] = module
+        parent, _, child = name.rpartition(".")
+        if parent:
+            setattr(sys.modules[parent], child, module)
+        exec(compile(source, module.__file__, "exec"), module.__dict__)
+
+
+_load_bundled_modules()
+del _load_bundled_modules, _BUNDLED_MODULES
+'''.format(package=PACKAGE)
+
+
+def _is_path_bootstrap(node: ast.stmt) -> bool:
+    """sys.path.append(...) / sys.path.insert(...) at module level"""
+    if not (isinstance(node, ast.Expr) and isinstance(node.value, ast.Call)):
+        return False
+    function = node.value.func
+    return (isinstance(function, ast.Attribute) and function.attr in ("append", "insert")
+            and isinstance(function.value, ast.Attribute) and function.value.attr == "path"
+            and isinstance(function.value.value, ast.Name) and function.value.value.id == "sys")
+
+
+def _strip_bootstrap(source: str) -> str:
+    lines = source.splitlines(keepends=True)
+    for node in reversed(ast.parse(source).body):
+        if _is_path_bootstrap(node):
+            del lines[node.lineno - 1:node.end_lineno]
+    return "".join(lines)
+
+
+def _common_imports(source: str) -> List[str]:
+    """The common modules a source imports at module level, in order"""
+    modules = []
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names = [node.module]
+            if node.module == PACKAGE:
+                names = [f"{PACKAGE}.{alias.name}" for alias in node.names]
+        elif isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        else:
+            continue
+        modules += [name for name in names if name.startswith(PACKAGE + ".")]
+    return modules
+
+
+def _module_path(name: str) -> Path:
+    return REPO_ROOT.joinpath(*name.split(".")).with_suffix(".py")
+
+
+def required_modules(source: str) -> Dict[str, str]:
+    """name -> source of the common modules source needs, dependencies first"""
+    ordered: Dict[str, str] = {}
+
+    def visit(name: str, stack: tuple):
+        if name in ordered:
+            return
+        if name in stack:
+            raise ValueError(f"Circular import: {' -> '.join(stack + (name,))}")
+        module_source = _module_path(name).read_text(encoding="utf-8")
+        for dependency in _common_imports(module_source):
+            visit(dependency, stack + (name,))
+        ordered[name] = module_source
+
+    for name in _common_imports(source):
+        visit(name, ())
+    return ordered
+
+
+def bundle(trader: Path, datamodel: bool = False) -> str:
+    """The self-contained source of the trader file"""
+    trader = Path(trader)
+    source = trader.read_text(encoding="utf-8")
+    modules: Dict[str, str] = {}
+    # Only traders that import the round's datamodel need it (prosperity_2/main.py
+    # imports common.datamodel directly)
+    datamodel = datamodel and any(isinstance(node, ast.ImportFrom) and node.module == "datamodel"
+                                  for node in ast.parse(source).body)
+    if datamodel:
+        datamodel_source = (trader.parent / "datamodel.py").read_text(encoding="utf-8")
+        modules.update(required_modules(datamodel_source))
+    modules.update({name: module for name, module in required_modules(source).items() if name not in modules})
+    if datamodel:
+        modules["datamodel"] = _strip_bootstrap(datamodel_source)
+    if not modules:
+        return source
+
+    entries = [(PACKAGE, "")] + [(name, _strip_bootstrap(module)) for name, module in modules.items()]
+    header = [
+        f"# Bundled from {trader.name} by `python -m common.bundle`: the {PACKAGE} modules it uses",
+        "# are embedded below and registered in sys.modules before the trader's code.",
+        "_BUNDLED_MODULES = [",
+    ]
+    header += [f"    ({name!r}, {module!r})," for name, module in entries]
+    header.append("]")
+    return "\n".join(header) + "\n" + _LOADER + "\n\n" + _strip_bootstrap(source)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("trader", type=Path)
+    parser.add_argument("-o", "--output", type=Path, help="file to write, stdout if omitted")
+    parser.add_argument("--datamodel", action="store_true",
+                        help="embed the datamodel.py next to the trader too, to run outside the repo")
+    args = parser.parse_args(argv)
+    bundled = bundle(args.trader, args.datamodel)
+    if args.output is None:
+        print(bundled, end="")
+    else:
+        args.output.write_text(bundled, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+Dataset catalog
+
+Scans the repository once and records every data file (round, day, kind, schema,
+row count, timestamp range, products and content hash) in a persisted manifest.
+Lookups such as "round 4 day 2 prices" are answered from the manifest alone, and
+a refresh only re-reads files whose size or modification time changed.
+
+Usage (from the repository root):
+    python -m common.catalog                 # refresh and list everything
+    python -m common.catalog prices 4 2      # resolve a single file
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional
+from xml.etree import ElementTree
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MANIFEST_NAME = "datasets_manifest.json"
+MANIFEST_VERSION = 1
+
+# prices_round_1_day_-2.csv, trades_round_2_day_0_nn.csv, observations_round_4_day_1.csv
+FILE_PATTERN = re.compile(r"^(prices|trades|observations)_round_(-?\d+)_day_(-?\d+)(?:_nn)?\.csv$")
+ROUND_DIR_PATTERN = re.compile(r"round[-_](\d+)")
+DATA_SUFFIXES = (".csv", ".xlsx")
+SKIPPED_DIRS = {".git", "__MACOSX", "__pycache__", "results", ".venv", "venv"}
+
+XLSX_NS = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+class DatasetEntry:
+    """One data file as recorded in the manifest. Paths are relative to the repository root."""
+
+    FIELDS = ("path", "season", "round", "day", "kind", "delimiter", "columns", "row_count",
+              "timestamp_min", "timestamp_max", "products", "sha1", "size", "mtime_ns")
+
+    def __init__(self, path: str, season: int, round: Optional[int], day: Optional[int], kind: str,
+                 delimiter: Optional[str], columns: List[str], row_count: int,
+                 timestamp_min: Optional[int], timestamp_max: Optional[int], products: List[str],
+                 sha1: str, size: int, mtime_ns: int):
+        self.path = path
+        self.season = season
+        self.round = round
+        self.day = day
+        self.kind = kind
+        self.delimiter = delimiter
+        self.columns = columns
+        self.row_count = row_count
+        self.timestamp_min = timestamp_min
+        self.timestamp_max = timestamp_max
+        self.products = products
+        self.sha1 = sha1
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DatasetEntry":
+        return cls(**{field: data[field] for field in cls.FIELDS})
+
+    def __repr__(self) -> str:
+        return f"DatasetEntry({self.path}, season={self.season}, round={self.round}, day={self.day}, kind={self.kind})"
+
+
+def detect_season(relative_path: str) -> int:
+    # datasets_2023 holds Prosperity 1 data, the rest of prosperity_2 is Prosperity 2,
+    # everything else (round_1 ... round_5) is the current Prosperity 3 season
+    parts = relative_path.split("/")
+    if "datasets_2023" in parts:
+        return 1
+    if parts[0] == "prosperity_2":
+        return 2
+    return 3
+
+
+def detect_round(relative_path: str) -> Optional[int]:
+    parts = relative_path.split("/")[:-1]
+    for part in reversed(parts):
+        if "tutorial" in part.lower():
+            return 0
+        match = ROUND_DIR_PATTERN.search(part)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def read_xlsx_rows(data: bytes) -> List[List[str]]:
+    # Minimal reader for the first worksheet so that no Excel engine is needed just to
+    # catalog (or load) the few spreadsheets lying around the repo
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        shared = []
+        if "xl/sharedStrings.xml" in archive.namelist():
+            root = ElementTree.fromstring(archive.read("xl/sharedStrings.xml"))
+            for item in root.findall("m:si", XLSX_NS):
+                shared.append("".join(text.text or "" for text in item.iter(f"{{{XLSX_NS['m']}}}t")))
+
+        sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+        rows = []
+        for row in sheet.iter(f"{{{XLSX_NS['m']}}}row"):
+            values = []
+            for cell in row.findall("m:c", XLSX_NS):
+                column = _column_index(cell.get("r"))
+                while len(values) < column:
+                    values.append("")
+                value = cell.find("m:v", XLSX_NS)
+                text = value.text if value is not None and value.text is not None else ""
+                if cell.get("t") == "s" and text != "":
+                    text = shared[int(text)]
+                values.append(text)
+            rows.append(values)
+    return rows
+
+
+def _column_index(reference: str) -> int:
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + (ord(char.upper()) - ord("A") + 1)
+    return index - 1
+
+
+def _summarize_rows(header: List[str], rows) -> dict:
+    timestamp_col = header.index("timestamp") if "timestamp" in header else None
+    if "product" in header:
+        product_col = header.index("product")
+    elif "symbol" in header:
+        product_col = header.index("symbol")
+    else:
+        product_col = None
+
+    row_count = 0
+    timestamp_min = None
+    timestamp_max = None
+    products = set()
+    for row in rows:
+        if not row:
+            continue
+        row_count += 1
+        if timestamp_col is not None and row[timestamp_col] != "":
+            timestamp = int(float(row[timestamp_col]))
+            if timestamp_min is None or timestamp < timestamp_min:
+                timestamp_min = timestamp
+            if timestamp_max is None or timestamp > timestamp_max:
+                timestamp_max = timestamp
+        if product_col is not None:
+            products.add(row[product_col])
+
+    return {
+        "row_count": row_count,
+        "timestamp_min": timestamp_min,
+        "timestamp_max": timestamp_max,
+        "products": sorted(products),
+    }
+
+
+def scan_file(root: Path, relative_path: str) -> DatasetEntry:
+    """Reads a single data file and builds its manifest entry"""
+    full_path = root / relative_path
+    stat = full_path.stat()
+    data = full_path.read_bytes()
+    name = full_path.name
+
+    match = FILE_PATTERN.match(name)
+    if match:
+        kind, round_num, day = match.group(1), int(match.group(2)), int(match.group(3))
+    else:
+        # Files that do not follow the platform naming (e.g. Macarons_data.xlsx) only get
+        # the round of the directory they live in
+        kind, round_num, day = ("observations" if name.endswith(".xlsx") else "unknown"), None, None
+    if round_num is None:
+        round_num = detect_round(relative_path)
+
+    if name.endswith(".xlsx"):
+        delimiter = None
+        rows = read_xlsx_rows(data)
+        header = rows[0] if rows else []
+        body = rows[1:]
+    else:
+        text = data.decode("utf-8-sig")
+        first_line = text.split("\n", 1)[0]
+        delimiter = ";" if first_line.count(";") >= first_line.count(",") else ","
+        reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+        header = next(reader, [])
+        body = reader
+
+    # The spreadsheet exports use "_" for the unnamed timestamp column
+    columns = ["timestamp" if column == "_" else column for column in header]
+    summary = _summarize_rows(columns, body)
+
+    # Prosperity 2 round 2 ships its ORCHIDS observations as prices_round_2_day_*.csv
+    if kind == "prices" and "product" not in columns:
+        kind = "observations"
+
+    return DatasetEntry(
+        path=relative_path,
+        season=detect_season(relative_path),
+        round=round_num,
+        day=day,
+        kind=kind,
+        delimiter=delimiter,
+        columns=columns,
+        sha1=hashlib.sha1(data).hexdigest(),
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        **summary,
+    )
+
+
+class DatasetCatalog:
+    def __init__(self, root: Path = REPO_ROOT, manifest_path: Optional[Path] = None):
+        self.root = Path(root)
+        self.manifest_path = Path(manifest_path) if manifest_path is not None else self.root / MANIFEST_NAME
+        self.entries: Dict[str, DatasetEntry] = {}
+
+    @classmethod
+    def load(cls, root: Path = REPO_ROOT, manifest_path: Optional[Path] = None) -> "DatasetCatalog":
+        """Opens the persisted manifest, building it on first use"""
+        catalog = cls(root, manifest_path)
+        if not catalog.read_manifest():
+            catalog.refresh()
+        return catalog
+
+    def read_manifest(self) -> bool:
+        if not self.manifest_path.exists():
+            return False
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            return False
+        self.entries = {entry["path"]: DatasetEntry.from_dict(entry) for entry in manifest["files"]}
+        return True
+
+    def write_manifest(self) -> None:
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "files": [self.entries[path].to_dict() for path in sorted(self.entries)],
+        }
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def discover(self) -> List[str]:
+        found = []
+        for directory, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in SKIPPED_DIRS and not d.startswith(".")]
+            for filename in filenames:
+                if filename.startswith(".") or not filename.endswith(DATA_SUFFIXES):
+                    continue
+                full_path = Path(directory) / filename
+                found.append(full_path.relative_to(self.root).as_posix())
+        return sorted(found)
+
+    def refresh(self) -> List[str]:
+        """
+        Brings the manifest up to date with the files on disk. Only files whose size or
+        mtime changed are re-read; returns the paths that were (re)scanned.
+        """
+        scanned = []
+        entries = {}
+        for relative_path in self.discover():
+            stat = (self.root / relative_path).stat()
+            entry = self.entries.get(relative_path)
+            if entry is None or entry.size != stat.st_size or entry.mtime_ns != stat.st_mtime_ns:
+                entry = scan_file(self.root, relative_path)
+                scanned.append(relative_path)
+            entries[relative_path] = entry
+
+        changed = bool(scanned) or entries.keys() != self.entries.keys()
+        self.entries = entries
+        if changed or not self.manifest_path.exists():
+            self.write_manifest()
+        return scanned
+
+    def entry_for(self, path) -> DatasetEntry:
+        """
+        Entry for a file given by path, rescanning it if it changed since the manifest was
+        written. Files outside the repository are scanned but not added to the manifest.
+        """
+        full_path = Path(path).resolve()
+        try:
+            relative_path = full_path.relative_to(self.root.resolve()).as_posix()
+        except ValueError:
+            return scan_file(self.root, full_path.as_posix())
+
+        stat = full_path.stat()
+        entry = self.entries.get(relative_path)
+        if entry is None or entry.size != stat.st_size or entry.mtime_ns != stat.st_mtime_ns:
+            entry = scan_file(self.root, relative_path)
+            self.entries[relative_path] = entry
+            self.write_manifest()
+        return entry
+
+    def find(self, kind: Optional[str] = None, round_num: Optional[int] = None, day: Optional[int] = None,
+             season: Optional[int] = None, product: Optional[str] = None) -> List[DatasetEntry]:
+        matches = []
+        for entry in self.entries.values():
+            if kind is not None and entry.kind != kind:
+                continue
+            if round_num is not None and entry.round != round_num:
+                continue
+            if day is not None and entry.day != day:
+                continue
+            if season is not None and entry.season != season:
+                continue
+            if product is not None and product not in entry.products:
+                continue
+            matches.append(entry)
+        return sorted(matches, key=lambda e: (e.season, e.round if e.round is not None else -1,
+                                              e.day if e.day is not None else -99, e.path))
+
+    def resolve(self, kind: str, round_num: int, day: int, season: Optional[int] = 3) -> DatasetEntry:
+        """Returns the single file holding the given round/day/kind, raising LookupError otherwise"""
+        matches = self.find(kind=kind, round_num=round_num, day=day, season=season)
+        if len(matches) != 1:
+            # The same day is sometimes shipped again with a later round (e.g. round 1 and
+            # round 2 trades for day -1); prefer the copy stored under its own round folder
+            own = [entry for entry in matches if detect_round(entry.path) == round_num]
+            if len(own) == 1:
+                return own[0]
+            raise LookupError(f"Expected one {kind} file for season {season} round {round_num} day {day}, "
+                              f"found {[entry.path for entry in matches]}")
+        return matches[0]
+
+    def path(self, kind: str, round_num: int, day: int, season: Optional[int] = 3) -> Path:
+        return self.root / self.resolve(kind, round_num, day, season).path
+
+
+def main():
+    catalog = DatasetCatalog.load()
+    scanned = catalog.refresh()
+    if scanned:
+        print(f"Scanned {len(scanned)} changed file(s)")
+
+    if len(sys.argv) >= 4:
+        season = int(sys.argv[4]) if len(sys.argv) >= 5 else 3
+        print(catalog.path(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), season))
+        return
+
+    for entry in catalog.find():
+        print(f"S{entry.season} R{entry.round} D{entry.day} {entry.kind:12} {entry.row_count:>7} rows "
+              f"{entry.timestamp_min}-{entry.timestamp_max} {','.join(entry.products)}  {entry.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Shared datamodel for every round
+
+One copy of the exchange's datamodel classes, used by the round folders (their
+datamodel.py only re-exports this module) and by prosperity_2/main.py. All classes
+declare __slots__: Orders, Trades and OrderDepths are created thousands of times per
+backtest, and without a per-instance __dict__ each one is smaller and faster to build.
+
+The constructors accept everything the separate copies did, including the Prosperity 2
+OrderDepth(buy_orders, sell_orders) used by the simulators. ConversionObservation has
+the current (sugarPrice, sunlightIndex) layout, LegacyConversionObservation the
+(sunlight, humidity) one of Prosperity 2, which rounds 1-3 and the tutorial still import.
+"""
+from json import JSONEncoder
+from typing import Dict, List, Optional
+
+from common.serialization import observation_to_str, state_to_json, to_dict
+
+Time = int
+Symbol = str
+Product = str
+Position = int
+UserId = str
+ObservationValue = int
+
+
+class Listing:
+    __slots__ = ("symbol", "product", "denomination")
+
+    def __init__(self, symbol: Symbol, product: Product, denomination: Product):
+        self.symbol = symbol
+        self.product = product
+        self.denomination = denomination
+
+
+class ConversionObservation:
+    __slots__ = ("bidPrice", "askPrice", "transportFees", "exportTariff", "importTariff", "sunlightIndex",
+                 "sugarPrice")
+
+    def __init__(self, bidPrice: float, askPrice: float, transportFees: float, exportTariff: float,
+                 importTariff: float, sugarPrice: float, sunlightIndex: float):
+        self.bidPrice = bidPrice
+        self.askPrice = askPrice
+        self.transportFees = transportFees
+        self.exportTariff = exportTariff
+        self.importTariff = importTariff
+        self.sunlightIndex = sunlightIndex
+        self.sugarPrice = sugarPrice
+
+
+class LegacyConversionObservation:
+    __slots__ = ("bidPrice", "askPrice", "transportFees", "exportTariff", "importTariff", "sunlight", "humidity")
+
+    def __init__(self, bidPrice: float, askPrice: float, transportFees: float, exportTariff: float,
+                 importTariff: float, sunlight: float, humidity: float):
+        self.bidPrice = bidPrice
+        self.askPrice = askPrice
+        self.transportFees = transportFees
+        self.exportTariff = exportTariff
+        self.importTariff = importTariff
+        self.sunlight = sunlight
+        self.humidity = humidity
+
+
+class Observation:
+    __slots__ = ("plainValueObservations", "conversionObservations")
+
+    def __init__(self, plainValueObservations: Dict[Product, ObservationValue],
+                 conversionObservations: Dict[Product, ConversionObservation]) -> None:
+        self.plainValueObservations = plainValueObservations
+        self.conversionObservations = conversionObservations
+
+    def __str__(self) -> str:
+        return observation_to_str(self)
+
+
+class Order:
+    __slots__ = ("symbol", "price", "quantity")
+
+    def __init__(self, symbol: Symbol, price: int, quantity: int) -> None:
+        self.symbol = symbol
+        self.price = price
+        self.quantity = quantity
+
+    def __str__(self) -> str:
+        return "(" + self.symbol + ", " + str(self.price) + ", " + str(self.quantity) + ")"
+
+    def __repr__(self) -> str:
+        return "(" + self.symbol + ", " + str(self.price) + ", " + str(self.quantity) + ")"
+
+
+class OrderDepth:  # Key: price, Value: quantity
+    __slots__ = ("buy_orders", "sell_orders")
+
+    def __init__(self, buy_orders: Optional[Dict[int, int]] = None, sell_orders: Optional[Dict[int, int]] = None):
+        self.buy_orders: Dict[int, int] = buy_orders if buy_orders is not None else {}
+        self.sell_orders: Dict[int, int] = sell_orders if sell_orders is not None else {}
+
+
+class Trade:
+    __slots__ = ("symbol", "price", "quantity", "buyer", "seller", "timestamp")
+
+    def __init__(self, symbol: Symbol, price: int, quantity: int, buyer: UserId = None, seller: UserId = None,
+                 timestamp: int = 0) -> None:
+        self.symbol = symbol
+        self.price: int = price
+        self.quantity: int = quantity
+        self.buyer = buyer
+        self.seller = seller
+        self.timestamp = timestamp
+
+    def __str__(self) -> str:
+        return ("(" + self.symbol + ", " + str(self.buyer) + " << " + str(self.seller) + ", " + str(self.price) + ", "
+                + str(self.quantity) + ", " + str(self.timestamp) + ")")
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class OwnTrade:
+    __slots__ = ("symbol", "price", "quantity", "counter_party")
+
+    def __init__(self, symbol: Symbol, price: int, quantity: int, counter_party: UserId = None) -> None:
+        self.symbol = symbol
+        self.price: int = price
+        self.quantity: int = quantity
+        self.counter_party = counter_party
+
+
+class TradingState:
+    __slots__ = ("traderData", "timestamp", "listings", "order_depths", "own_trades", "market_trades", "position",
+                 "observations", "product_ids")
+
+    def __init__(self,
+                 traderData: str,
+                 timestamp: Time,
+                 listings: Dict[Symbol, Listing],
+                 order_depths: Dict[Symbol, OrderDepth],
+                 own_trades: Dict[Symbol, List[Trade]],
+                 market_trades: Dict[Symbol, List[Trade]],
+                 position: Dict[Product, Position],
+                 observations: Observation,
+                 product_ids: Optional[Dict[Symbol, int]] = None):
+        self.traderData = traderData
+        self.timestamp = timestamp
+        self.listings = listings
+        self.order_depths = order_depths
+        self.own_trades = own_trades
+        self.market_trades = market_trades
+        self.position = position
+        self.observations = observations
+        # Dense integer ids (see common.products) set by the local simulators, None on the exchange
+        self.product_ids = product_ids
+
+    def toJSON(self):
+        return state_to_json(self)
+
+
+class ProsperityEncoder(JSONEncoder):
+
+    def default(self, o):
+        return to_dict(o)
@@ -0,0 +1,174 @@
+"""
+Vectorized order book features
+
+One kernel, book_features, turns (rows, levels) book arrays into a float64 matrix with a
+column per feature. Live, a trader passes the tick's order depths (one row per product);
+offline the rows of a whole prices file go through the same kernel, so research and
+trading see bit for bit the same numbers:
+
+    products = ProductRegistry.from_state(state)
+    features = state_features(state, products)             # (products, FEATURES)
+    mid = features[products["KELP"], MID_PRICE]
+
+    prices = load_day("prices", 1, 0)
+    history = day_features(prices)                          # (rows, FEATURES)
+
+Columns (NaN where a feature is undefined, e.g. the mid of a one sided book):
+
+    mid_price    (best bid + best ask) / 2
+    microprice   best bid and ask weighted by the opposite side's volume
+    spread       best ask - best bid
+    imbalance    (best bid volume - best ask volume) / (best bid volume + best ask volume)
+    bid_vwap     volume weighted average of all bid levels (the avg_buy_price of the algos)
+    ask_vwap     the same for the ask levels
+    bid_depth    total bid volume, ask_depth and total_depth likewise (always defined)
+
+Prices and volumes are integers, so sums are done in int64 and every feature is a single
+rounding away from the exact value, the same as the per product Python formulas.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+from common.datamodel import OrderDepth
+from common.order_book import BookArrays, OrderDepthView
+from common.products import ProductRegistry
+
+FEATURES = ("mid_price", "microprice", "spread", "imbalance", "bid_vwap", "ask_vwap", "bid_depth", "ask_depth",
+            "total_depth")
+(MID_PRICE, MICROPRICE, SPREAD, IMBALANCE, BID_VWAP, ASK_VWAP, BID_DEPTH, ASK_DEPTH,
+ TOTAL_DEPTH) = range(len(FEATURES))
+FEATURE_INDEX: Dict[str, int] = {name: i for i, name in enumerate(FEATURES)}
+
+
+def book_features(book: BookArrays) -> np.ndarray:
+    """Features of every row of book, shape (rows, len(FEATURES))"""
+    bid_prices, bid_volumes = book.bid_prices, book.bid_volumes
+    ask_prices, ask_volumes = book.ask_prices, book.ask_volumes
+    best_bid, best_ask = bid_prices[:, 0], ask_prices[:, 0]
+    best_bid_volume, best_ask_volume = bid_volumes[:, 0], -ask_volumes[:, 0]
+    top_volume = best_bid_volume + best_ask_volume
+    bid_depth = bid_volumes.sum(axis=1)
+    # Both of these are negative, their ratio is the ask VWAP
+    ask_volume = ask_volumes.sum(axis=1)
+    ask_notional = (ask_prices * ask_volumes).sum(axis=1)
+
+    # Empty sides and levels come out as 0 / 0 = NaN; the top of book features of one
+    # sided books are blanked below
+    with np.errstate(divide="ignore", invalid="ignore"):
+        features = np.column_stack((
+            (best_bid + best_ask) / 2,
+            (best_bid * best_ask_volume + best_ask * best_bid_volume) / top_volume,
+            best_ask - best_bid,
+            (best_bid_volume - best_ask_volume) / top_volume,
+            (bid_prices * bid_volumes).sum(axis=1) / bid_depth,
+            ask_notional / ask_volume,
+            bid_depth,
+            -ask_volume,
+            bid_depth - ask_volume,
+        )).astype(np.float64, copy=False)
+    features[(best_bid == 0) | (best_ask == 0), :IMBALANCE + 1] = np.nan
+    return features
+
+
+def book_arrays(order_depths: Dict[str, OrderDepth], products: ProductRegistry,
+                levels: Optional[int] = None) -> BookArrays:
+    """
+    The order depths as BookArrays with one row per product id, best level first. Products
+    without an order depth get an empty row. levels defaults to the deepest side present.
+    """
+    if levels is None:
+        levels = max((max(len(depth.buy_orders), len(depth.sell_orders)) for depth in order_depths.values()),
+                     default=1) or 1
+    # Flat (products, 4, levels) values, one np.array call at the end; the BookArrays fields
+    # are views into it
+    values = [0] * (len(products) * 4 * levels)
+    ids = products.ids
+    for symbol, depth in order_depths.items():
+        row = ids.get(symbol)
+        if row is None:
+            continue
+        start = row * 4 * levels
+        if (type(depth) is OrderDepthView and depth._buy_side() is None and depth._sell_side() is None
+                and depth.book.bid_prices.shape[1] == levels):
+            # The simulator's row as it is, no dicts involved
+            book = depth.book
+            for i, array in enumerate((book.bid_prices, book.bid_volumes, book.ask_prices, book.ask_volumes)):
+                values[start + i * levels:start + (i + 1) * levels] = array[depth.row].tolist()
+            continue
+        for side, descending in ((depth.buy_orders, True), (depth.sell_orders, False)):
+            prices = sorted(side, reverse=descending)[:levels]
+            values[start:start + len(prices)] = prices
+            values[start + levels:start + levels + len(prices)] = [side[price] for price in prices]
+            start += 2 * levels
+    arrays = np.array(values, dtype=np.int64).reshape(len(products), 4, levels).transpose(1, 0, 2)
+    return BookArrays(*arrays)
+
+
+def state_features(state, products: Optional[ProductRegistry] = None) -> np.ndarray:
+    """Features of every product of a TradingState, one row per product id"""
+    if products is None:
+        products = ProductRegistry.from_state(state)
+    return book_features(book_arrays(state.order_depths, products))
+
+
+def day_features(prices, levels: int = 3) -> np.ndarray:
+    """Features of every row of a prices DataFrame or common.loader Table, in row order"""
+    return book_features(BookArrays.from_columns(prices, levels))
+
+
+def benchmark(ticks: int = 2000):
+    from common.benchmarking import best_time, print_time
+    from common.order_book import SortedOrderDepth
+
+    rng = np.random.default_rng(0)
+    symbols = [f"PRODUCT_{i}" for i in range(15)]
+    products = ProductRegistry(symbols)
+    states = []
+    for _ in range(ticks):
+        depths = {}
+        for symbol in symbols:
+            mid = int(rng.integers(1000, 10000))
+            depths[symbol] = OrderDepth({mid - 1 - i: int(rng.integers(1, 30)) for i in range(3)},
+                                        {mid + 1 + i: -int(rng.integers(1, 30)) for i in range(3)})
+        states.append(depths)
+
+    def per_product(depths):
+        # The same features product by product, the way the algos compute them today
+        for depth in depths.values():
+            best_ask = min(depth.sell_orders.keys())
+            best_bid = max(depth.buy_orders.keys())
+            best_ask_volume = -depth.sell_orders[best_ask]
+            best_bid_volume = depth.buy_orders[best_bid]
+            (best_ask + best_bid) / 2
+            (best_bid * best_ask_volume + best_ask * best_bid_volume) / (best_bid_volume + best_ask_volume)
+            best_ask - best_bid
+            (best_bid_volume - best_ask_volume) / (best_bid_volume + best_ask_volume)
+            bid_depth = sum([np.abs(depth.buy_orders[i]) for i in depth.buy_orders.keys()])
+            ask_depth = sum([np.abs(depth.sell_orders[i]) for i in depth.sell_orders.keys()])
+            sum([np.abs(depth.buy_orders[i]) * i for i in depth.buy_orders.keys()]) / bid_depth
+            sum([np.abs(depth.sell_orders[i]) * i for i in depth.sell_orders.keys()]) / ask_depth
+            bid_depth + ask_depth
+
+    def accessors(depths):
+        for depth in depths.values():
+            book = SortedOrderDepth(depth.buy_orders, depth.sell_orders)
+            book.mid_price(), book.microprice(), book.spread(), book.bid_vwap(), book.ask_vwap(), book.total_depth()
+
+    runs = {
+        "per product Python": per_product,
+        "SortedOrderDepth accessors": accessors,
+        "state_features": lambda depths: book_features(book_arrays(depths, products)),
+    }
+    for name, run in runs.items():
+        seconds = best_time(lambda: [run(depths) for depths in states], repeat=3) / ticks
+        print_time(name, seconds, per="tick", note=f"({len(symbols)} products)")
+
+    book = book_arrays(states[0], products)
+    rows = BookArrays(*(np.tile(array, (700, 1)) for array in
+                        (book.bid_prices, book.bid_volumes, book.ask_prices, book.ask_volumes)))
+    print_time("day_features", best_time(lambda: book_features(rows)), note=f"for {len(rows.bid_prices)} rows")
+
+
+if __name__ == "__main__":
+    benchmark()
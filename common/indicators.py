@@ -0,0 +1,472 @@
+"""
+Streaming rolling-window indicators
+
+Fixed-size ring buffers with running aggregates, so each update costs O(1) (O(log w) for
+the median) no matter how long the day is, and memory stays bounded by the window:
+
+    sma = RollingWindow(50)
+    sma.update(price)
+    if sma.seen > 50:
+        trend = price - sma.mean()
+
+RollingWindow keeps a compensated running sum for the mean and a rolling sum of squared
+deviations for the variance. RollingMin/RollingMax use monotonic deques and RollingMedian
+a sorted list searched by bisection; all of them can be fed the same values.
+
+ExponentialAverages follows one series with EMAs (and EWMA variances) over several spans
+at once, in a fixed handful of floats per span:
+
+    ema = ExponentialAverages([10, 50], initial=2010)
+    ema.update(mid_price)
+    fast, slow = ema.mean(10), ema.mean(50)
+
+Every indicator can be saved to and restored from traderData through its values (oldest
+first), see codec_fields and common.state_codec:
+
+    codec = StateCodec(sma.codec_fields("sma_KELP"))
+    trader_data = codec.encode(sma.state("sma_KELP"))
+    sma.restore_state(codec.decode(trader_data), "sma_KELP")
+"""
+import bisect
+import math
+import operator
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+def _floats(values: Sequence[float], limit: int) -> List[float]:
+    # The last `limit` values as Python floats; tolist() converts a decoded ring in C
+    if hasattr(values, "tolist"):
+        return values[-limit:].tolist()
+    return [float(value) for value in list(values)[-limit:]]
+
+
+class RollingWindow:
+    """The last `window` values with their mean and variance"""
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError(f"Window must be at least 1, got {window}")
+        self.window = window
+        self.buffer: List[float] = [0.0] * window
+        self.count = 0      # values currently in the window
+        self.seen = 0       # values ever added
+        self.position = 0   # where the next value goes
+        self.total = 0.0
+        self.compensation = 0.0
+        self.average = 0.0
+        self.squares = 0.0  # sum of squared deviations from the mean
+
+    def _add_to_total(self, value: float) -> None:
+        # Neumaier summation keeps the running sum exact to ~1 ulp over a whole day
+        total = self.total + value
+        if abs(self.total) >= abs(value):
+            self.compensation += (self.total - total) + value
+        else:
+            self.compensation += (value - total) + self.total
+        self.total = total
+
+    def update(self, value: float) -> Optional[float]:
+        """Adds value, returns the value that dropped out of the window (None while filling up)"""
+        evicted = None
+        if self.count == self.window:
+            evicted = self.buffer[self.position]
+            self._add_to_total(-evicted)
+            old_average = self.average
+            self.average = old_average + (value - evicted) / self.window
+            self.squares += (value - evicted) * (value - self.average + evicted - old_average)
+        else:
+            self.count += 1
+            delta = value - self.average
+            self.average += delta / self.count
+            self.squares += delta * (value - self.average)
+
+        self._add_to_total(value)
+        self.buffer[self.position] = value
+        self.position = (self.position + 1) % self.window
+        self.seen += 1
+        return evicted
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.window
+
+    def __len__(self) -> int:
+        return self.count
+
+    def mean(self) -> Optional[float]:
+        return (self.total + self.compensation) / self.count if self.count else None
+
+    def sum(self) -> float:
+        return self.total + self.compensation
+
+    def var(self, ddof: int = 0) -> Optional[float]:
+        if self.count <= ddof:
+            return None
+        return max(self.squares, 0.0) / (self.count - ddof)
+
+    def std(self, ddof: int = 0) -> Optional[float]:
+        variance = self.var(ddof)
+        return math.sqrt(variance) if variance is not None else None
+
+    def last(self) -> Optional[float]:
+        return self.buffer[self.position - 1] if self.count else None
+
+    def values(self) -> List[float]:
+        """The window, oldest first"""
+        if self.count < self.window:
+            return self.buffer[:self.count]
+        return self.buffer[self.position:] + self.buffer[:self.position]
+
+    def restore(self, values: Sequence[float], seen: Optional[int] = None) -> "RollingWindow":
+        """Refills the window from values (oldest first), e.g. decoded from traderData"""
+        values = _floats(values, self.window)
+        count = len(values)
+        self.__init__(self.window)
+        if count:
+            # The running sums rebuilt directly rather than by replaying an update per value:
+            # the total and its rounding error (as the compensated sum keeps them), then the
+            # squared deviations in one pass, shifted by the oldest value against cancellation
+            shift = values[0]
+            deviations = squares = 0.0
+            for value in values:
+                deviation = value - shift
+                deviations += deviation
+                squares += deviation * deviation
+            self.buffer[:count] = values
+            self.count = count
+            self.position = count % self.window
+            self.total = math.fsum(values)
+            self.compensation = math.fsum(values + [-self.total])  # what the rounded total lost
+            self.average = self.total / count
+            self.squares = squares - deviations * deviations / count
+        self.seen = count if seen is None else max(int(seen), count)
+        return self
+
+    def codec_fields(self, name: str) -> list:
+        return [(name, "ring", self.window), (name + "_seen", "i8", 1)]
+
+    def state(self, name: str) -> Dict[str, object]:
+        return {name: self.values(), name + "_seen": self.seen}
+
+    def restore_state(self, values: Optional[Dict[str, object]], name: str) -> "RollingWindow":
+        if values is not None:
+            self.restore(values[name], values[name + "_seen"])
+        return self
+
+
+class _RollingExtreme:
+    # Monotonic deque of (index, value): each value is pushed and popped at most once, so
+    # updates are amortized O(1). keep(kept, new) tells whether an older value stays in
+    # front of a newer one (< for the minimum, > for the maximum).
+    def __init__(self, window: int, keep: Callable[[float, float], bool]):
+        if window < 1:
+            raise ValueError(f"Window must be at least 1, got {window}")
+        self.window = window
+        self.keep = keep
+        self.items: deque = deque()
+        self.seen = 0
+
+    def update(self, value: float) -> None:
+        items = self.items
+        while items and not self.keep(items[-1][1], value):
+            items.pop()
+        items.append((self.seen, value))
+        self.seen += 1
+        if items[0][0] <= self.seen - 1 - self.window:
+            items.popleft()
+
+    def value(self) -> Optional[float]:
+        return self.items[0][1] if self.items else None
+
+    def restore(self, values: Sequence[float]) -> None:
+        values = _floats(values, self.window)
+        # From the newest value back, a value stays in the deque when it beats every
+        # newer one, i.e. the oldest value kept so far
+        kept = []
+        for index in range(len(values) - 1, -1, -1):
+            if not kept or self.keep(values[index], kept[-1][1]):
+                kept.append((index, values[index]))
+        self.items = deque(reversed(kept))
+        self.seen = len(values)
+
+    def codec_fields(self, name: str) -> list:
+        # The deque itself (at most `window` items) rather than the window it summarizes
+        return [(name, "ring", self.window), (name + "_index", "ring", self.window), (name + "_seen", "i8", 1)]
+
+    def state(self, name: str) -> Dict[str, object]:
+        return {name: [value for _, value in self.items], name + "_index": [index for index, _ in self.items],
+                name + "_seen": self.seen}
+
+    def restore_state(self, values: Optional[Dict[str, object]], name: str) -> "_RollingExtreme":
+        if values is not None:
+            self.items = deque(zip((int(index) for index in values[name + "_index"]),
+                                   (float(value) for value in values[name])))
+            self.seen = int(values[name + "_seen"])
+        return self
+
+
+class RollingMin(_RollingExtreme):
+    def __init__(self, window: int):
+        super().__init__(window, operator.lt)
+
+
+class RollingMax(_RollingExtreme):
+    def __init__(self, window: int):
+        super().__init__(window, operator.gt)
+
+
+class RollingMedian:
+    """
+    Median of the last `window` values, kept in a sorted list. Finding the insert and
+    delete positions is a binary search, O(log w); shifting the list is a C memmove,
+    which for trading windows (tens to hundreds of values) costs less than maintaining
+    two heaps in Python would.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque()
+        self.sorted: List[float] = []
+
+    def update(self, value: float) -> None:
+        self.values.append(value)
+        bisect.insort(self.sorted, value)
+        if len(self.values) > self.window:
+            del self.sorted[bisect.bisect_left(self.sorted, self.values.popleft())]
+
+    def median(self) -> Optional[float]:
+        count = len(self.sorted)
+        if count == 0:
+            return None
+        middle = count // 2
+        if count % 2:
+            return self.sorted[middle]
+        return (self.sorted[middle - 1] + self.sorted[middle]) / 2
+
+    def restore(self, values: Sequence[float]) -> None:
+        values = _floats(values, self.window)
+        self.values = deque(values)
+        self.sorted = sorted(values)
+
+    def codec_fields(self, name: str) -> list:
+        return [(name, "ring", self.window)]
+
+    def state(self, name: str) -> Dict[str, object]:
+        return {name: list(self.values)}
+
+    def restore_state(self, values: Optional[Dict[str, object]], name: str) -> "RollingMedian":
+        if values is not None:
+            self.restore(values[name])
+        return self
+
+
+class WeightedPriceWindow:
+    """
+    Volume weighted average price over the book sides of the last `window` ticks. Each
+    push adds the side's sum of price * volume and of volume to running totals and takes
+    the oldest tick's sums back out, so the average is a division however many levels the
+    window covers, and only two numbers per tick are kept.
+
+    Volumes are used as given, e.g. negative for sell_orders; with integer prices and
+    volumes the totals are exact and the average equals np.average over the same levels.
+    push_trades does the same for the trades of a tick, as a trade tape VWAP.
+    """
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError(f"Window must be at least 1, got {window}")
+        self.window = window
+        self.notionals = [0] * window
+        self.volumes = [0] * window
+        self.position = 0
+        self.count = 0
+        self.seen = 0
+        self.notional = 0
+        self.volume = 0
+
+    def push(self, levels: Dict[float, float]) -> None:
+        """Adds one tick's price -> volume levels, evicting the oldest tick once full"""
+        notional = 0
+        volume = 0
+        for price, level_volume in levels.items():
+            notional += price * level_volume
+            volume += level_volume
+        self.add(notional, volume)
+
+    def push_trades(self, trades) -> None:
+        """Adds one tick's trades (anything with price and quantity), weighted by absolute quantity"""
+        notional = 0
+        volume = 0
+        for trade in trades:
+            quantity = abs(trade.quantity)
+            notional += trade.price * quantity
+            volume += quantity
+        self.add(notional, volume)
+
+    def add(self, notional: float, volume: float) -> None:
+        """Adds one tick's price * volume and volume sums"""
+        position = self.position
+        if self.count == self.window:
+            self.notional -= self.notionals[position]
+            self.volume -= self.volumes[position]
+        else:
+            self.count += 1
+        self.notionals[position] = notional
+        self.volumes[position] = volume
+        self.notional += notional
+        self.volume += volume
+        self.position = (position + 1) % self.window
+        self.seen += 1
+
+    def average(self) -> Optional[float]:
+        """The weighted average price, None while the window holds no volume"""
+        return self.notional / self.volume if self.volume else None
+
+    def sums(self) -> List[tuple]:
+        """(notional, volume) per tick in the window, oldest first"""
+        start = self.position if self.count == self.window else 0
+        return [(self.notionals[(start + i) % self.window], self.volumes[(start + i) % self.window])
+                for i in range(self.count)]
+
+    def codec_fields(self, name: str) -> list:
+        return [(name + "_notional", "ring", self.window), (name + "_volume", "ring", self.window),
+                (name + "_seen", "i8", 1)]
+
+    def state(self, name: str) -> Dict[str, object]:
+        sums = self.sums()
+        return {name + "_notional": [notional for notional, _ in sums], name + "_volume": [volume for _, volume in sums],
+                name + "_seen": self.seen}
+
+    def restore_state(self, values: Optional[Dict[str, object]], name: str) -> "WeightedPriceWindow":
+        if values is not None:
+            self.__init__(self.window)
+            for notional, volume in zip(values[name + "_notional"], values[name + "_volume"]):
+                self.add(float(notional), float(volume))
+            self.seen = max(int(values[name + "_seen"]), self.count)
+        return self
+
+
+class ExponentialAverages:
+    """
+    EMAs of one series over several spans, alpha = 2 / (span + 1), each with the EWMA of
+    its squared deviations. An update costs the same on the last tick of a day as on the
+    first, and nothing but the current values is kept.
+    """
+
+    def __init__(self, spans: Sequence[int], initial: Optional[float] = None):
+        if not spans or min(spans) < 1:
+            raise ValueError(f"Spans must be at least 1, got {list(spans)}")
+        self.spans = list(spans)
+        self.index = {span: i for i, span in enumerate(self.spans)}
+        self.alphas = [2 / (span + 1) for span in self.spans]
+        self.means: List[Optional[float]] = [initial] * len(self.spans)
+        self.variances = [0.0] * len(self.spans)
+        self.seen = 0
+
+    def update(self, value: float) -> List[float]:
+        """Adds value, returns the EMAs in the order of spans"""
+        means = self.means
+        variances = self.variances
+        for i, alpha in enumerate(self.alphas):
+            mean = means[i]
+            if mean is None:
+                # Without an initial value the first observation starts the average
+                means[i] = value
+                continue
+            delta = value - mean
+            means[i] = mean + alpha * delta
+            variances[i] = (1 - alpha) * (variances[i] + alpha * delta * delta)
+        self.seen += 1
+        return means
+
+    def mean(self, span: Optional[int] = None) -> Optional[float]:
+        """EMA for span, the first span when not given"""
+        return self.means[self.index[span] if span is not None else 0]
+
+    def var(self, span: Optional[int] = None) -> float:
+        return self.variances[self.index[span] if span is not None else 0]
+
+    def std(self, span: Optional[int] = None) -> float:
+        return math.sqrt(self.var(span))
+
+    def codec_fields(self, name: str) -> list:
+        # Stored as rings so that a single span still decodes as a list
+        count = len(self.spans)
+        return [(name + "_mean", "ring", count), (name + "_var", "ring", count), (name + "_seen", "i8", 1)]
+
+    def state(self, name: str) -> Dict[str, object]:
+        means = [math.nan if mean is None else mean for mean in self.means]
+        return {name + "_mean": means, name + "_var": self.variances, name + "_seen": self.seen}
+
+    def restore_state(self, values: Optional[Dict[str, object]], name: str) -> "ExponentialAverages":
+        if values is not None and len(values[name + "_mean"]) == len(self.spans):
+            self.means = [None if math.isnan(mean) else mean for mean in map(float, values[name + "_mean"])]
+            self.variances = [float(variance) for variance in values[name + "_var"]]
+            self.seen = int(values[name + "_seen"])
+        return self
+
+
+def benchmark(ticks: int = 10000, window: int = 50):
+    import random
+    import time
+
+    import numpy as np
+
+    from common.benchmarking import best_time, print_time
+
+    rng = random.Random(0)
+    prices = [2000 + rng.gauss(0, 5) for _ in range(ticks)]
+
+    def run(name, step):
+        print_time(name, best_time(lambda: [step(price) for price in prices], repeat=3) / ticks, per="tick")
+
+    history = []
+
+    def list_slice(price):
+        history.append(price)
+        if len(history) > window:
+            np.mean(history[-window:])
+
+    rolling = RollingWindow(window)
+
+    def ring(price):
+        rolling.update(price)
+        rolling.mean()
+
+    run("list + np.mean(slice)", list_slice)
+    run("RollingWindow.mean", ring)
+    print(f"max abs difference of the means: {abs(np.mean(history[-window:]) - rolling.mean()):.2e}")
+    run("RollingWindow.std", lambda price: (rolling.update(price), rolling.std()))
+    low, high = RollingMin(window), RollingMax(window)
+    run("RollingMin + RollingMax", lambda price: (low.update(price), high.update(price)))
+    median = RollingMedian(window)
+    run("RollingMedian", lambda price: (median.update(price), median.median()))
+
+    # The timestamp-keyed EMA dict of round_1/day1Algo.py against ExponentialAverages, timed
+    # per block of ticks to show whether the cost per tick grows during the day
+    blocks = 5
+    block = ticks // blocks
+    ema_dict = {0: prices[0]}
+    ema = ExponentialAverages([window], initial=prices[0])
+    dict_times, ema_times = [], []
+    for start in range(0, block * blocks, block):
+        begin = time.perf_counter()
+        for timestamp in range(start, start + block):
+            previous = ema_dict[list(ema_dict.keys())[-1]]
+            ema_dict[(timestamp + 1) * 100] = (2 * prices[timestamp] + (window - 1) * previous) / (window + 1)
+        dict_times.append((time.perf_counter() - begin) / block * 1e6)
+        begin = time.perf_counter()
+        for timestamp in range(start, start + block):
+            ema.update(prices[timestamp])
+        ema_times.append((time.perf_counter() - begin) / block * 1e6)
+    print("us/tick per fifth of the day:")
+    print(f"{'dict + list(keys())[-1]':28} " + " ".join(f"{t:7.2f}" for t in dict_times))
+    print(f"{'ExponentialAverages':28} " + " ".join(f"{t:7.2f}" for t in ema_times))
+    print(f"max abs difference of the EMAs: {abs(ema_dict[block * blocks * 100] - ema.mean()):.2e}")
+    multi = ExponentialAverages([10, 50, 200])
+    run("ExponentialAverages x3", lambda price: (multi.update(price), multi.std(50)))
+
+
+if __name__ == "__main__":
+    benchmark()
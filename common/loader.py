@@ -0,0 +1,227 @@
+"""
+Schema-normalizing loader
+
+Every dataset variant in the repo (semicolon prices, Prosperity 1/2/3 trade files,
+comma separated round 4 observations, the ORCHIDS observations shipped as "prices"
+and Macarons_data.xlsx) is mapped onto one canonical typed schema:
+
+* prices        day:int16, timestamp:int32, product:category, {bid,ask}_{price,volume}_{1,2,3}:int32,
+                mid_price:float64, profit_and_loss:float64. Missing book levels are stored as 0.
+* trades        timestamp:int32, buyer/seller/symbol/currency:category, price:int32, quantity:int32
+* observations  day:int16, timestamp:int32 and float64 columns named like ConversionObservation
+                (bidPrice, askPrice, transportFees, exportTariff, importTariff, sugarPrice,
+                sunlightIndex, sunlight, humidity, mid_price)
+
+Categorical columns are stored as int16 codes plus the list of categories. The
+converted columns are cached as .npy files keyed by the file's content hash and
+opened memory-mapped, so loading a day a second time costs next to nothing.
+"""
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from common.catalog import REPO_ROOT, DatasetCatalog, DatasetEntry, read_xlsx_rows
+
+CACHE_DIR = REPO_ROOT / ".data_cache"
+SCHEMA_VERSION = 1
+LEVELS = (1, 2, 3)
+
+PRICE_LEVEL_COLUMNS = [f"{side}_{field}_{i}" for side in ("bid", "ask") for i in LEVELS for field in ("price", "volume")]
+CATEGORY_COLUMNS = {
+    "prices": ["product"],
+    "trades": ["buyer", "seller", "symbol", "currency"],
+    "observations": [],
+}
+
+# Observation headers seen across seasons -> canonical (ConversionObservation style) name
+OBSERVATION_RENAMES = {
+    "ORCHIDS": "mid_price",
+    "TRANSPORT_FEES": "transportFees",
+    "EXPORT_TARIFF": "exportTariff",
+    "IMPORT_TARIFF": "importTariff",
+    "SUNLIGHT": "sunlight",
+    "HUMIDITY": "humidity",
+    "DAY": "day",
+    "_": "timestamp",
+}
+
+
+class Table:
+    """
+    Columnar view of one dataset file. Columns are (usually memory-mapped) NumPy arrays;
+    categorical columns hold int16 codes into self.categories[column].
+    """
+
+    def __init__(self, kind: str, columns: Dict[str, np.ndarray], categories: Dict[str, List[str]],
+                 source: Optional[str] = None):
+        self.kind = kind
+        self.columns = columns
+        self.categories = categories
+        self.source = source
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+
+    def __len__(self) -> int:
+        return len(self.columns["timestamp"])
+
+    def code(self, column: str, value: str) -> int:
+        """Category code of value in column, -1 if it never occurs"""
+        try:
+            return self.categories[column].index(value)
+        except ValueError:
+            return -1
+
+    def decode(self, column: str) -> np.ndarray:
+        return np.asarray(self.categories[column], dtype=object)[self.columns[column]]
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Builds a DataFrame shaped like pd.read_csv on the original file: categorical
+        columns become pandas categoricals and missing book levels become NaN again.
+        """
+        data = {}
+        for name, values in self.columns.items():
+            if name in self.categories:
+                data[name] = pd.Categorical.from_codes(values, categories=self.categories[name])
+            elif name in PRICE_LEVEL_COLUMNS:
+                price_column = name.replace("volume", "price")
+                present = self.columns[price_column] != 0
+                data[name] = values if present.all() else np.where(present, values, np.nan)
+            else:
+                data[name] = values
+        return pd.DataFrame(data)
+
+
+def _encode_categories(values: pd.Series):
+    filled = values.fillna("").astype(str)
+    categories = sorted(filled.unique())
+    codes = pd.Categorical(filled, categories=categories).codes.astype(np.int16)
+    return codes, categories
+
+
+def _to_int32(values: pd.Series) -> np.ndarray:
+    return np.rint(values.fillna(0).to_numpy(dtype=np.float64)).astype(np.int32)
+
+
+def _day_from_timestamps(timestamps: np.ndarray, first_day: int) -> np.ndarray:
+    # Multi-day exports restart the timestamp at 0 for every new day
+    restarts = np.concatenate(([0], (np.diff(timestamps) < 0).astype(np.int16)))
+    return (first_day + np.cumsum(restarts)).astype(np.int16)
+
+
+def read_raw(entry: DatasetEntry, root: Path) -> pd.DataFrame:
+    path = root / entry.path
+    if entry.path.endswith(".xlsx"):
+        rows = read_xlsx_rows(path.read_bytes())
+        frame = pd.DataFrame(rows[1:], columns=rows[0])
+        return frame.apply(pd.to_numeric, errors="coerce")
+    return pd.read_csv(path, sep=entry.delimiter)
+
+
+def normalize(entry: DatasetEntry, frame: pd.DataFrame):
+    """Maps a raw frame of any known variant onto the canonical schema of entry.kind"""
+    columns = {}
+    categories = {}
+    frame = frame.rename(columns=OBSERVATION_RENAMES)
+
+    if entry.kind == "prices":
+        day = entry.day if entry.day is not None else 0
+        columns["day"] = frame["day"].to_numpy(dtype=np.int16) if "day" in frame else np.full(len(frame), day, np.int16)
+        columns["timestamp"] = frame["timestamp"].to_numpy(dtype=np.int32)
+        columns["product"], categories["product"] = _encode_categories(frame["product"])
+        for name in PRICE_LEVEL_COLUMNS:
+            columns[name] = _to_int32(frame[name]) if name in frame else np.zeros(len(frame), np.int32)
+        # Volumes are only meaningful where the level exists
+        for side in ("bid", "ask"):
+            for i in LEVELS:
+                columns[f"{side}_volume_{i}"][columns[f"{side}_price_{i}"] == 0] = 0
+        columns["mid_price"] = frame["mid_price"].to_numpy(dtype=np.float64)
+        pnl = frame["profit_and_loss"] if "profit_and_loss" in frame else pd.Series(np.zeros(len(frame)))
+        columns["profit_and_loss"] = pnl.fillna(0).to_numpy(dtype=np.float64)
+
+    elif entry.kind == "trades":
+        columns["timestamp"] = frame["timestamp"].to_numpy(dtype=np.int32)
+        for name in CATEGORY_COLUMNS["trades"]:
+            series = frame[name] if name in frame else pd.Series([""] * len(frame))
+            columns[name], categories[name] = _encode_categories(series)
+        columns["price"] = _to_int32(frame["price"])
+        columns["quantity"] = _to_int32(frame["quantity"])
+
+    elif entry.kind == "observations":
+        timestamps = frame["timestamp"].to_numpy(dtype=np.int32)
+        if "day" in frame:
+            columns["day"] = frame["day"].to_numpy(dtype=np.int16)
+        else:
+            # Macarons_data.xlsx concatenates round 4 days 1 to 3
+            columns["day"] = _day_from_timestamps(timestamps, entry.day if entry.day is not None else 1)
+        columns["timestamp"] = timestamps
+        for name in frame.columns:
+            if name not in ("day", "timestamp"):
+                columns[name] = frame[name].to_numpy(dtype=np.float64)
+
+    else:
+        raise ValueError(f"Don't know how to normalize {entry.kind} file {entry.path}")
+
+    return columns, categories
+
+
+def _cache_path(entry: DatasetEntry) -> Path:
+    return CACHE_DIR / f"v{SCHEMA_VERSION}" / entry.sha1
+
+
+def _write_cache(directory: Path, columns: Dict[str, np.ndarray], categories: Dict[str, List[str]]) -> None:
+    tmp_dir = directory.with_name(directory.name + ".tmp")
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    for name, values in columns.items():
+        np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(values))
+    with open(tmp_dir / "categories.txt", "w") as f:
+        for name, values in categories.items():
+            f.write(name + "\t" + "\t".join(values) + "\n")
+    with open(tmp_dir / "columns.txt", "w") as f:
+        f.write("\n".join(columns))
+    os.replace(tmp_dir, directory)
+
+
+def _read_cache(directory: Path, kind: str, source: str) -> Table:
+    with open(directory / "columns.txt") as f:
+        names = f.read().split("\n")
+    columns = {name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in names}
+    categories = {}
+    with open(directory / "categories.txt") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            categories[parts[0]] = parts[1:]
+    return Table(kind, columns, categories, source)
+
+
+def load_entry(entry: DatasetEntry, root: Path = REPO_ROOT, use_cache: bool = True) -> Table:
+    directory = _cache_path(entry)
+    if use_cache and directory.exists():
+        return _read_cache(directory, entry.kind, entry.path)
+
+    columns, categories = normalize(entry, read_raw(entry, root))
+    if not use_cache:
+        return Table(entry.kind, columns, categories, entry.path)
+    _write_cache(directory, columns, categories)
+    return _read_cache(directory, entry.kind, entry.path)
+
+
+def load(path: Union[str, Path], catalog: Optional[DatasetCatalog] = None, use_cache: bool = True) -> Table:
+    """Loads any dataset file by path (absolute or relative to the working directory)"""
+    catalog = catalog if catalog is not None else DatasetCatalog.load()
+    entry = catalog.entry_for(path)
+    return load_entry(entry, catalog.root, use_cache)
+
+
+def load_day(kind: str, round_num: int, day: int, season: Optional[int] = 3,
+             catalog: Optional[DatasetCatalog] = None) -> Table:
+    """Loads e.g. load_day("prices", 1, -1) without knowing where the file lives"""
+    catalog = catalog if catalog is not None else DatasetCatalog.load()
+    return load_entry(catalog.resolve(kind, round_num, day, season), catalog.root)
@@ -0,0 +1,124 @@
+"""
+Standard normal CDF and PDF
+
+norm_cdf and norm_pdf take a Python number and return a float, or take an array of any
+shape and return an array of that shape. NaN goes through as NaN.
+
+On numbers, and on arrays of up to 16 elements (an option chain), norm_cdf is
+0.5 * math.erfc(-x / sqrt(2)), which is exact to rounding and cheaper than any Python
+level formula or a dozen array operations. NumPy has no erf, so on larger arrays it
+uses Hart's double precision rational approximation (algorithm 5666, in the form given by G. West,
+"Better approximations to cumulative normal functions", 2005): exp(-x^2 / 2) times a
+degree 6 / degree 7 rational function of |x| up to 7.07, a continued fraction beyond.
+Measured against math.erfc on 2 million points of [-40, 40] (`python -m common.normal`):
+
+    max absolute error   2.2e-16  (rounding level)
+    max relative error   1e-8     in the lower tail (x < 0), 3e-9 for x > -7.07
+
+The Abramowitz-Stegun 7.1.26 formula this replaces (the cdf of prosperity_2/main.py)
+has an absolute error of up to 7.5e-8, about 1e-3 on the price of an option on a 10000
+spot, and no relative accuracy in the tails.
+"""
+import math
+
+import numpy as np
+
+_SQRT_2 = math.sqrt(2.0)
+_SQRT_2PI = math.sqrt(2 * math.pi)
+# |x| where the rational function hands over to the continued fraction
+_TAIL = 7.07106781186547
+# Arrays up to this size go through math.erfc element by element
+_SMALL = 16
+
+# Hart 5666, highest degree first
+_NUMERATOR = (0.0352624965998911, 0.700383064443688, 6.37396220353165, 33.912866078383, 112.079291497871,
+              221.213596169931, 220.206867912376)
+_DENOMINATOR = (0.0883883476483184, 1.75566716318264, 16.064177579207, 86.7807322029461, 296.564248779674,
+                637.333633378831, 793.826512519948, 440.413735824752)
+
+
+def norm_cdf(x):
+    """P(Z <= x) for a standard normal Z, see the module docstring for the accuracy"""
+    if isinstance(x, (int, float)):
+        return 0.5 * math.erfc(-x / _SQRT_2)
+
+    x = np.asarray(x, dtype=np.float64)
+    if x.size <= _SMALL:
+        # A chain of a few strikes costs less in math.erfc than in a dozen array operations
+        value = np.array([0.5 * math.erfc(-v / _SQRT_2) for v in x.ravel().tolist()]).reshape(x.shape)
+        return value if value.ndim else float(value)
+    return _array_cdf(x)
+
+
+def _array_cdf(x: np.ndarray):
+    z = np.abs(x)
+    # Lower tail P(Z <= -|x|): the rational function everywhere, the continued fraction
+    # only on the (rare) elements beyond _TAIL
+    lower = np.full_like(z, _NUMERATOR[0])
+    for coefficient in _NUMERATOR[1:]:
+        lower *= z
+        lower += coefficient
+    denominator = np.full_like(z, _DENOMINATOR[0])
+    for coefficient in _DENOMINATOR[1:]:
+        denominator *= z
+        denominator += coefficient
+    with np.errstate(invalid="ignore"):  # inf / inf at x = +-inf, replaced just below
+        lower /= denominator
+    tail = ~(z < _TAIL)  # NaN goes through the tail branch and stays NaN
+    if tail.any():
+        t = z[tail]
+        lower[tail] = 1 / ((t + 1 / (t + 2 / (t + 3 / (t + 4 / (t + 0.65))))) * _SQRT_2PI)
+    lower *= np.exp(-0.5 * z * z)
+    upper = x > 0
+    lower[upper] = 1.0 - lower[upper]
+    return lower if lower.ndim else float(lower)
+
+
+def norm_pdf(x):
+    """Density of the standard normal at x"""
+    if isinstance(x, (int, float)):
+        return math.exp(-0.5 * x * x) / _SQRT_2PI
+    x = np.asarray(x, dtype=np.float64)
+    value = np.exp(-0.5 * x * x) / _SQRT_2PI
+    return value if value.ndim else float(value)
+
+
+def abramowitz_stegun_cdf(x: float) -> float:
+    """The cdf of prosperity_2/main.py (A&S 7.1.26, absolute error up to 7.5e-8), kept for comparison"""
+    a1, a2, a3, a4, a5 = 0.254829592, -0.284496736, 1.421413741, -1.453152027, 1.061405429
+    p = 0.3275911
+    sign = 1 if x >= 0 else -1
+    x = abs(x) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + p * x)
+    y = 1.0 - (((((a5 * t + a4) * t) + a3) * t + a2) * t + a1) * t * math.exp(-x * x)
+    return 0.5 * (1.0 + sign * y)
+
+
+def benchmark(points: int = 2_000_000):
+    from common.benchmarking import best_time, print_time
+
+    grid = np.linspace(-40, 40, points)
+    exact = np.array([norm_cdf(x) for x in grid.tolist()])
+    approximate = norm_cdf(grid)
+    lower = (grid < 0) & (exact > 1e-300)
+    print(f"norm_cdf on arrays     max abs error {np.max(np.abs(approximate - exact)):.1e}, "
+          f"max rel error (x < 0) {np.max(np.abs(approximate[lower] / exact[lower] - 1)):.1e}")
+    old = np.array([abramowitz_stegun_cdf(x) for x in grid[::100].tolist()])
+    print(f"Abramowitz-Stegun      max abs error {np.max(np.abs(old - exact[::100])):.1e}")
+
+    values = np.random.default_rng(0).normal(0, 2, 100_000)
+    floats = values.tolist()
+    runs = {
+        "math.erf per float": lambda: [0.5 * (1 + math.erf(x / _SQRT_2)) for x in floats],
+        "A&S cdf per float": lambda: [abramowitz_stegun_cdf(x) for x in floats],
+        "norm_cdf per float": lambda: [norm_cdf(x) for x in floats],
+        "A&S cdf vectorized": lambda: np.vectorize(abramowitz_stegun_cdf)(values),
+        "norm_cdf on the array": lambda: norm_cdf(values),
+        "norm_pdf on the array": lambda: norm_pdf(values),
+    }
+    for name, run in runs.items():
+        print_time(name, best_time(run, repeat=3) / len(floats), per="value")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,345 @@
+"""
+Sorted, self-summarizing order depth
+
+SortedOrderDepth is a drop-in OrderDepth whose buy_orders/sell_orders are BookSide
+dicts: plain price -> volume dicts (sell volumes negative, as on the exchange) that
+iterate best price first and lazily cache their sorted prices and volume totals. The
+summaries (best bid/ask, spread, mid, microprice, per side VWAP, depth) are computed once
+per book, however often the strategies ask, and any change to a side resets its cache.
+
+    order_depth = SortedOrderDepth({10: 5, 9: 3}, {12: -4})
+    order_depth.best_bid(), order_depth.microprice(), order_depth.ask_vwap()
+
+OrderDepthView offers the same accessors over one row of the simulator's BookArrays and
+only builds the dicts if a strategy reads buy_orders or sell_orders, so strategies that
+stick to the accessors allocate next to nothing per product and tick.
+
+ask_prices/bid_prices work on any OrderDepth and use the cache when there is one, so
+strategies can switch from sorted(order_depth.sell_orders.keys()) without caring which
+kind of book they were given.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from common.datamodel import OrderDepth
+
+
+class BookSide(dict):
+    """price -> volume of one side of the book, iterating best price first (also after changes)"""
+    __slots__ = ("descending", "_prices", "_volume", "_notional")
+
+    def __init__(self, levels: Optional[Dict[int, int]] = None, descending: bool = False):
+        super().__init__(sorted(levels.items(), reverse=descending) if levels else ())
+        self.descending = descending
+        self._prices = None
+        self._volume = None
+        self._notional = None
+
+    def _reset(self) -> None:
+        self._prices = None
+        self._volume = None
+
+    def _sort(self) -> None:
+        # A dict iterates in insertion order, so a new price goes to its place by
+        # reinserting the levels in price order (books hold a handful of levels)
+        levels = sorted(super().items(), reverse=self.descending)
+        super().clear()
+        super().update(levels)
+
+    # Every mutating dict method resets the cached summaries, and the ones that can add a
+    # price keep the iteration order best price first
+    def __setitem__(self, price, volume):
+        new = price not in self
+        super().__setitem__(price, volume)
+        if new and len(self) > 1:
+            # Appended at the end, which is its place only if it is the worst price
+            last = self.prices()[-1] if self._prices is not None else None
+            if last is None or (price > last if self.descending else price < last):
+                self._sort()
+        self._reset()
+
+    def __delitem__(self, price):
+        super().__delitem__(price)
+        self._reset()
+
+    def pop(self, *args):
+        self._reset()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._reset()
+        return super().popitem()
+
+    def clear(self):
+        super().clear()
+        self._reset()
+
+    def update(self, *args, **kwargs):
+        size = len(self)
+        super().update(*args, **kwargs)
+        if len(self) != size:
+            self._sort()
+        self._reset()
+
+    def setdefault(self, price, volume=None):
+        if price not in self:
+            self[price] = volume
+        return self[price]
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def prices(self) -> List[int]:
+        """Prices best first. The list is cached, don't modify it."""
+        if self._prices is None:
+            self._prices = sorted(self, reverse=self.descending)
+        return self._prices
+
+    def best(self) -> Optional[int]:
+        prices = self.prices()
+        return prices[0] if prices else None
+
+    def best_volume(self) -> int:
+        """Absolute volume at the best price, 0 for an empty side"""
+        prices = self.prices()
+        return abs(self[prices[0]]) if prices else 0
+
+    def _totals(self) -> None:
+        volume = 0
+        notional = 0
+        for price, level_volume in self.items():
+            level_volume = abs(level_volume)
+            volume += level_volume
+            notional += price * level_volume
+        self._volume = volume
+        self._notional = notional
+
+    def volume(self) -> int:
+        """Absolute volume over all levels"""
+        if self._volume is None:
+            self._totals()
+        return self._volume
+
+    def vwap(self) -> Optional[float]:
+        """Volume weighted average price over all levels, None for an empty side"""
+        if self._volume is None:
+            self._totals()
+        return self._notional / self._volume if self._volume else None
+
+
+class SortedOrderDepth(OrderDepth):
+    __slots__ = ()
+
+    def __init__(self, buy_orders: Optional[Dict[int, int]] = None, sell_orders: Optional[Dict[int, int]] = None):
+        super().__init__(BookSide(buy_orders, descending=True), BookSide(sell_orders))
+
+    def __setattr__(self, name, value):
+        # Plain dicts assigned later on (order_depth.buy_orders = {...}) get wrapped too
+        if name in ("buy_orders", "sell_orders") and not isinstance(value, BookSide):
+            value = BookSide(value, descending=name == "buy_orders")
+        super().__setattr__(name, value)
+
+    def best_bid(self) -> Optional[int]:
+        return self.buy_orders.best()
+
+    def best_ask(self) -> Optional[int]:
+        return self.sell_orders.best()
+
+    def best_bid_volume(self) -> int:
+        return self.buy_orders.best_volume()
+
+    def best_ask_volume(self) -> int:
+        return self.sell_orders.best_volume()
+
+    def spread(self) -> Optional[int]:
+        bid, ask = self.buy_orders.best(), self.sell_orders.best()
+        return ask - bid if bid is not None and ask is not None else None
+
+    def mid_price(self) -> Optional[float]:
+        bid, ask = self.buy_orders.best(), self.sell_orders.best()
+        return (bid + ask) / 2 if bid is not None and ask is not None else None
+
+    def microprice(self) -> Optional[float]:
+        """Best bid and ask weighted by the opposite side's volume"""
+        bid, ask = self.buy_orders.best(), self.sell_orders.best()
+        if bid is None or ask is None:
+            return None
+        bid_volume, ask_volume = self.buy_orders.best_volume(), self.sell_orders.best_volume()
+        return (bid * ask_volume + ask * bid_volume) / (bid_volume + ask_volume)
+
+    def bid_vwap(self) -> Optional[float]:
+        return self.buy_orders.vwap()
+
+    def ask_vwap(self) -> Optional[float]:
+        return self.sell_orders.vwap()
+
+    def bid_depth(self) -> int:
+        return self.buy_orders.volume()
+
+    def ask_depth(self) -> int:
+        return self.sell_orders.volume()
+
+    def total_depth(self) -> int:
+        return self.buy_orders.volume() + self.sell_orders.volume()
+
+
+def ask_prices(order_depth: OrderDepth) -> List[int]:
+    """Ask prices, best (lowest) first"""
+    levels = order_depth.sell_orders
+    return levels.prices() if isinstance(levels, BookSide) else sorted(levels)
+
+
+def bid_prices(order_depth: OrderDepth) -> List[int]:
+    """Bid prices, best (highest) first"""
+    levels = order_depth.buy_orders
+    return levels.prices() if isinstance(levels, BookSide) else sorted(levels, reverse=True)
+
+
+class BookArrays:
+    """
+    The price levels of a whole prices file as (rows, levels) arrays, best level first.
+    Missing levels have price and volume 0 (a listed level can have volume 0); ask volumes
+    are negative like in sell_orders.
+    """
+
+    def __init__(self, bid_prices: np.ndarray, bid_volumes: np.ndarray, ask_prices: np.ndarray,
+                 ask_volumes: np.ndarray):
+        self.bid_prices = bid_prices
+        self.bid_volumes = bid_volumes
+        self.ask_prices = ask_prices
+        self.ask_volumes = ask_volumes
+
+    @classmethod
+    def from_columns(cls, columns, levels: int = 3) -> "BookArrays":
+        """From a prices DataFrame or common.loader Table (NaN or 0 marking missing levels)"""
+        def stack(name):
+            values = [np.nan_to_num(np.asarray(columns[f"{name}_{i}"], dtype=np.float64)) for i in range(1, levels + 1)]
+            return np.column_stack(values).astype(np.int64)
+
+        return cls(stack("bid_price"), stack("bid_volume"), stack("ask_price"), -stack("ask_volume"))
+
+
+# The slots holding materialized sides, bypassing OrderDepthView's properties
+_BUY_ORDERS = OrderDepth.buy_orders
+_SELL_ORDERS = OrderDepth.sell_orders
+
+
+class OrderDepthView(SortedOrderDepth):
+    """
+    One row of BookArrays as an OrderDepth. The accessors read the arrays, buy_orders and
+    sell_orders are only built (as BookSide dicts) when a strategy touches them, after
+    which the accessors follow the dicts so changes made to them are respected.
+    """
+    __slots__ = ("book", "row")
+
+    def __init__(self, book: BookArrays, row: int):
+        self.book = book
+        self.row = row
+
+    @staticmethod
+    def _levels(prices: np.ndarray, volumes: np.ndarray) -> Dict[int, int]:
+        return {price: volume for price, volume in zip(prices.tolist(), volumes.tolist()) if price}
+
+    @property
+    def buy_orders(self) -> BookSide:
+        try:
+            return _BUY_ORDERS.__get__(self)
+        except AttributeError:
+            side = BookSide(self._levels(self.book.bid_prices[self.row], self.book.bid_volumes[self.row]), True)
+            _BUY_ORDERS.__set__(self, side)
+            return side
+
+    @buy_orders.setter
+    def buy_orders(self, value):
+        _BUY_ORDERS.__set__(self, value)
+
+    @property
+    def sell_orders(self) -> BookSide:
+        try:
+            return _SELL_ORDERS.__get__(self)
+        except AttributeError:
+            side = BookSide(self._levels(self.book.ask_prices[self.row], self.book.ask_volumes[self.row]))
+            _SELL_ORDERS.__set__(self, side)
+            return side
+
+    @sell_orders.setter
+    def sell_orders(self, value):
+        _SELL_ORDERS.__set__(self, value)
+
+    def _buy_side(self) -> Optional[BookSide]:
+        try:
+            return _BUY_ORDERS.__get__(self)
+        except AttributeError:
+            return None
+
+    def _sell_side(self) -> Optional[BookSide]:
+        try:
+            return _SELL_ORDERS.__get__(self)
+        except AttributeError:
+            return None
+
+    def best_bid(self) -> Optional[int]:
+        side = self._buy_side()
+        if side is not None:
+            return side.best()
+        price = int(self.book.bid_prices[self.row, 0])
+        return price if price else None
+
+    def best_ask(self) -> Optional[int]:
+        side = self._sell_side()
+        if side is not None:
+            return side.best()
+        price = int(self.book.ask_prices[self.row, 0])
+        return price if price else None
+
+    def best_bid_volume(self) -> int:
+        side = self._buy_side()
+        return side.best_volume() if side is not None else int(self.book.bid_volumes[self.row, 0])
+
+    def best_ask_volume(self) -> int:
+        side = self._sell_side()
+        return side.best_volume() if side is not None else -int(self.book.ask_volumes[self.row, 0])
+
+    def spread(self) -> Optional[int]:
+        bid, ask = self.best_bid(), self.best_ask()
+        return ask - bid if bid is not None and ask is not None else None
+
+    def mid_price(self) -> Optional[float]:
+        bid, ask = self.best_bid(), self.best_ask()
+        return (bid + ask) / 2 if bid is not None and ask is not None else None
+
+    def microprice(self) -> Optional[float]:
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        bid_volume, ask_volume = self.best_bid_volume(), self.best_ask_volume()
+        return (bid * ask_volume + ask * bid_volume) / (bid_volume + ask_volume)
+
+    def bid_vwap(self) -> Optional[float]:
+        side = self._buy_side()
+        if side is not None:
+            return side.vwap()
+        volumes = self.book.bid_volumes[self.row]
+        volume = int(volumes.sum())
+        return float(self.book.bid_prices[self.row] @ volumes) / volume if volume else None
+
+    def ask_vwap(self) -> Optional[float]:
+        side = self._sell_side()
+        if side is not None:
+            return side.vwap()
+        volumes = self.book.ask_volumes[self.row]
+        volume = int(volumes.sum())
+        return float(self.book.ask_prices[self.row] @ volumes) / volume if volume else None
+
+    def bid_depth(self) -> int:
+        side = self._buy_side()
+        return side.volume() if side is not None else int(self.book.bid_volumes[self.row].sum())
+
+    def ask_depth(self) -> int:
+        side = self._sell_side()
+        return side.volume() if side is not None else -int(self.book.ask_volumes[self.row].sum())
+
+    def total_depth(self) -> int:
+        return self.bid_depth() + self.ask_depth()
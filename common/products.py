@@ -0,0 +1,90 @@
+"""
+Integer product ids
+
+ProductRegistry hands out dense ids (0, 1, 2, ...) for product symbols, so per-product
+state can live in NumPy arrays indexed by id instead of dicts keyed by long strings:
+
+    products = ProductRegistry.from_state(state)
+    limits = products.array({"KELP": 50, "SQUID_INK": 50}, dtype=np.int64)
+    positions = products.array(state.position, dtype=np.int64)
+    room_to_buy = limits - positions                   # every product at once
+    products.to_dict(room_to_buy)                      # back to {symbol: value}
+
+The local simulators put their registry's ids on every TradingState (state.product_ids),
+so a trader sees the same ids on each tick without interning anything. The exchange does
+not send ids; from_state then numbers the products in sorted order, which is stable as
+long as the listed products don't change.
+"""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+class ProductRegistry:
+    def __init__(self, symbols: Iterable[str] = ()):
+        self.symbols: List[str] = []
+        self.ids: Dict[str, int] = {}
+        for symbol in symbols:
+            self.intern(symbol)
+
+    @classmethod
+    def from_state(cls, state, previous: Optional["ProductRegistry"] = None) -> "ProductRegistry":
+        """
+        The registry for a TradingState. Pass the registry of the previous tick to reuse it
+        while the ids haven't changed.
+        """
+        ids = getattr(state, "product_ids", None)
+        if ids is not None:
+            if previous is not None and previous.ids == ids:
+                return previous
+            registry = cls()
+            registry.symbols = sorted(ids, key=ids.get)
+            registry.ids = dict(ids)
+            return registry
+
+        symbols = set(state.listings) | set(state.order_depths)
+        if previous is not None and len(previous.ids) == len(symbols) and all(s in previous.ids for s in symbols):
+            return previous
+        return cls(sorted(symbols))
+
+    def intern(self, symbol: str) -> int:
+        """Id of symbol, registering it if needed. Arrays made earlier don't grow with it."""
+        product_id = self.ids.get(symbol)
+        if product_id is None:
+            product_id = self.ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return product_id
+
+    def __getitem__(self, symbol: str) -> int:
+        return self.ids[symbol]
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.ids
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+    def ids_of(self, symbols: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.ids[symbol] for symbol in symbols), dtype=np.intp)
+
+    def array(self, values: Optional[Dict[str, float]] = None, default=0, dtype=np.float64) -> np.ndarray:
+        """One entry per product, filled from values where given and default elsewhere"""
+        array = np.full(len(self.symbols), default, dtype=dtype)
+        if values:
+            self.scatter(array, values)
+        return array
+
+    def scatter(self, array: np.ndarray, values: Dict[str, float]) -> np.ndarray:
+        """Writes values (e.g. this tick's positions) into array in place, unknown symbols are skipped"""
+        ids = self.ids
+        known = [(ids[symbol], value) for symbol, value in values.items() if symbol in ids]
+        if known:
+            index, data = zip(*known)
+            array[list(index)] = data
+        return array
+
+    def to_dict(self, array: np.ndarray) -> Dict[str, float]:
+        return dict(zip(self.symbols, array.tolist()))
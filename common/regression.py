@@ -0,0 +1,174 @@
+"""
+Online linear regression
+
+RecursiveLeastSquares refits y ~ coefficients . x one observation at a time: each update
+is a handful of k x k matrix operations (k = number of features), never a refit over the
+history. The forgetting factor discounts old observations by `forgetting` per update, so
+the fit follows a drifting relationship (0.999 remembers roughly the last 1000 ticks).
+
+The MAGNIFICENT_MACARONS fair value model of rounds 4 and 5 is defined here too: the
+coefficients fitted offline in round_4/scripts/features.ipynb as the starting point,
+updated every tick from the ConversionObservation, and seeded from the round 4
+observations files by `python -m common.regression`:
+
+    model = macarons_model(MACARONS_SEEDED_COEFFICIENTS)
+    observation = state.observations.conversionObservations["MAGNIFICENT_MACARONS"]
+    x = macarons_features(observation)
+    fair_value = model.predict(x)
+    model.update(x, macarons_target(observation))
+
+The target is the conversion mid, offline and live alike. The round 4 data has no
+order book for macarons (observations and trades files only), and the trades sit on the
+conversion mid: their mean difference is under 0.2 per day with a standard deviation
+of ~3.6, against a daily range of 50-90.
+
+The model state (coefficients and covariance) fits in traderData through codec_fields,
+like the indicators in common.indicators.
+"""
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+MACARONS_FEATURES = ("intercept", "transportFees", "exportTariff", "importTariff", "sugarPrice", "sunlightIndex",
+                     "sunlightIndex^2")
+# Frozen fit from round_4/scripts/features.ipynb
+MACARONS_COEFFICIENTS = (-173.43, -75.37, -61.49, -34.63, 7.59, -4.76, 0.0336)
+# Where the model ends up after the three round 4 observations files (seed_macarons(),
+# printed by `python -m common.regression`), the starting point for live trading
+MACARONS_SEEDED_COEFFICIENTS = (-2487.523885, 272.880932, 24.769408, 57.017129, 10.141907, 40.067609, -0.4802)
+
+
+class RecursiveLeastSquares:
+    def __init__(self, coefficients: Sequence[float], forgetting: float = 0.999, covariance: float = 1.0,
+                 max_covariance: float = 1e8):
+        """
+        coefficients: starting point of the fit, one per feature
+        forgetting: weight of the past per update, 1 for ordinary least squares
+        covariance: starting covariance (times the identity), i.e. how far the first
+            updates may move the coefficients
+        max_covariance: the covariance trace at which forgetting stops, so directions the
+            features don't move in (e.g. a tariff constant for hours) can't blow it up
+        """
+        if not 0 < forgetting <= 1:
+            raise ValueError(f"Forgetting factor must be in (0, 1], got {forgetting}")
+        self.coefficients = np.array(coefficients, dtype=np.float64)
+        self.covariance = np.eye(len(self.coefficients)) * covariance
+        self.forgetting = forgetting
+        self.max_covariance = max_covariance
+        self.count = 0
+
+    def predict(self, x: Sequence[float]) -> float:
+        return float(self.coefficients @ np.asarray(x, dtype=np.float64))
+
+    def update(self, x: Sequence[float], y: float) -> float:
+        """Adds one observation, returns the prediction error before the update"""
+        x = np.asarray(x, dtype=np.float64)
+        covariance = self.covariance
+        px = covariance @ x
+        gain = px / (self.forgetting + x @ px)
+        error = y - self.coefficients @ x
+        self.coefficients += gain * error
+        covariance -= np.outer(gain, px)
+        if self.forgetting < 1 and np.trace(covariance) < self.max_covariance:
+            covariance /= self.forgetting
+        # Keep it symmetric against rounding
+        self.covariance = (covariance + covariance.T) / 2
+        self.count += 1
+        return float(error)
+
+    def fit(self, features: np.ndarray, targets: np.ndarray) -> "RecursiveLeastSquares":
+        """Runs update over the rows of features (e.g. whole days offline); NaN rows are skipped"""
+        usable = ~(np.isnan(features).any(axis=1) | np.isnan(targets))
+        for x, y in zip(features[usable], targets[usable]):
+            self.update(x, y)
+        return self
+
+    def codec_fields(self, name: str) -> list:
+        k = len(self.coefficients)
+        return [(name + "_coefficients", "f8", k), (name + "_covariance", "f8", k * k), (name + "_count", "i8", 1)]
+
+    def state(self, name: str) -> Dict[str, object]:
+        return {name + "_coefficients": self.coefficients, name + "_covariance": self.covariance.ravel(),
+                name + "_count": self.count}
+
+    def restore_state(self, values: Optional[Dict[str, object]], name: str) -> "RecursiveLeastSquares":
+        if values is not None:
+            k = len(self.coefficients)
+            self.coefficients = np.array(values[name + "_coefficients"], dtype=np.float64)
+            self.covariance = np.array(values[name + "_covariance"], dtype=np.float64).reshape(k, k)
+            self.count = int(values[name + "_count"])
+        return self
+
+
+def macarons_features(observation) -> list:
+    """The regression features of a ConversionObservation, in MACARONS_FEATURES order"""
+    sunlight = observation.sunlightIndex
+    return [1.0, observation.transportFees, observation.exportTariff, observation.importTariff,
+            observation.sugarPrice, sunlight, sunlight * sunlight]
+
+
+def macarons_target(observation) -> float:
+    """What the macarons model fits, the mid of the conversion bid and ask"""
+    return (observation.bidPrice + observation.askPrice) / 2
+
+
+def macarons_targets(observations) -> np.ndarray:
+    """macarons_target for every row of an observations DataFrame or common.loader Table"""
+    return (np.asarray(observations["bidPrice"], dtype=np.float64)
+            + np.asarray(observations["askPrice"], dtype=np.float64)) / 2
+
+
+def macarons_feature_matrix(observations) -> np.ndarray:
+    """macarons_features for every row of an observations DataFrame or common.loader Table"""
+    sunlight = np.asarray(observations["sunlightIndex"], dtype=np.float64)
+    columns = [np.ones(len(sunlight))]
+    columns += [np.asarray(observations[name], dtype=np.float64) for name in MACARONS_FEATURES[1:5]]
+    return np.column_stack(columns + [sunlight, sunlight * sunlight])
+
+
+def macarons_model(coefficients: Sequence[float] = MACARONS_COEFFICIENTS, forgetting: float = 0.999,
+                   covariance: float = 1e-4) -> RecursiveLeastSquares:
+    # A small starting covariance keeps the first updates close to the given coefficients
+    return RecursiveLeastSquares(coefficients, forgetting, covariance)
+
+
+def seed_macarons(days: Sequence[int] = (1, 2, 3), **kwargs) -> RecursiveLeastSquares:
+    """The macarons model run over the round 4 observations files, fitting macarons_target like the traders"""
+    from common.loader import load_day
+
+    model = macarons_model(**kwargs)
+    for day in days:
+        observations = load_day("observations", 4, day)
+        model.fit(macarons_feature_matrix(observations), macarons_targets(observations))
+    return model
+
+
+def main():
+    from common.benchmarking import best_time, print_time
+    from common.loader import load_day
+
+    frozen = np.array(MACARONS_COEFFICIENTS)
+    model = macarons_model()
+    errors = {"frozen": [], "online": []}
+    days = [load_day("observations", 4, day) for day in (1, 2, 3)]
+    features = np.concatenate([macarons_feature_matrix(observations) for observations in days])
+    targets = np.concatenate([macarons_targets(observations) for observations in days])
+    for x, y in zip(features, targets):
+        errors["frozen"].append(y - frozen @ x)
+        # Error of the prediction made before seeing y
+        errors["online"].append(model.update(x, y))
+    ticks = len(targets)
+
+    print_time("RecursiveLeastSquares.update", best_time(lambda: macarons_model().fit(features, targets),
+                                                         repeat=3) / ticks, note=f"({ticks} ticks)")
+    for name, values in errors.items():
+        values = np.asarray(values)
+        print(f"{name:7} RMSE {np.sqrt(np.mean(values ** 2)):8.2f}   mean abs {np.mean(np.abs(values)):8.2f}")
+    print("seeded coefficients:")
+    for name, before, after in zip(MACARONS_FEATURES, MACARONS_COEFFICIENTS, model.coefficients):
+        print(f"  {name:16} {before:10.4f} -> {after:10.4f}")
+    print("MACARONS_SEEDED_COEFFICIENTS =", tuple(round(float(c), 6) for c in model.coefficients))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+jsonpickle-free serialization of the datamodel classes
+
+Explicit, schema-aware encoders turn a whole TradingState into a tree of plain dicts
+and lists, which json's C encoder then writes in one call without calling back into
+Python. The output is the exact text of the original implementations:
+
+    state_to_json(state) == json.dumps(state, default=lambda o: o.__dict__, sort_keys=True)
+    observation_to_str(observation) == the jsonpickle based Observation.__str__
+
+without importing jsonpickle (~80ms at import) and without its per-object reflection,
+which makes Observation.__str__ about 5x faster (44 -> 9 us). TradingState encoding is
+not meaningfully faster: for ten products the C encoder alone takes ~140 us to write
+the text from the plain tree (~30 us to build), and the original toJSON spends no more
+than that on its default hook, so both take ~175-180 us. What state_to_json gains is
+that the __slots__ classes of common.datamodel, which have no __dict__ for the original
+hook, still encode to the same text.
+The decoders rebuild the objects from that JSON using the classes of a datamodel module,
+common.datamodel unless another one is given:
+
+    state = state_from_json(text)
+
+Both ConversionObservation layouts are supported: sunlight/humidity (Prosperity 2 and
+rounds 1-3) and sugarPrice/sunlightIndex (rounds 4-5).
+
+Run `python -m common.serialization [round dir]` for a benchmark against a copy of the
+original classes and code.
+"""
+import json
+from typing import Any, Dict
+
+# Attributes in the order the datamodel constructors assign them, which is the order
+# jsonpickle writes them in
+LISTING_FIELDS = ("symbol", "product", "denomination")
+ORDER_FIELDS = ("symbol", "price", "quantity")
+TRADE_FIELDS = ("symbol", "price", "quantity", "buyer", "seller", "timestamp")
+OWN_TRADE_FIELDS = ("symbol", "price", "quantity", "counter_party")
+CONVERSION_FIELDS = ("bidPrice", "askPrice", "transportFees", "exportTariff", "importTariff", "sunlight", "humidity")
+CONVERSION_FIELDS_SUGAR = ("bidPrice", "askPrice", "transportFees", "exportTariff", "importTariff", "sunlightIndex",
+                           "sugarPrice")
+# Constructor argument order where it differs from the assignment order
+CONVERSION_ARGS_SUGAR = ("bidPrice", "askPrice", "transportFees", "exportTariff", "importTariff", "sugarPrice",
+                         "sunlightIndex")
+
+
+def conversion_fields(observation) -> tuple:
+    return CONVERSION_FIELDS_SUGAR if hasattr(observation, "sugarPrice") else CONVERSION_FIELDS
+
+
+def listing_to_dict(listing) -> Dict[str, Any]:
+    return {"symbol": listing.symbol, "product": listing.product, "denomination": listing.denomination}
+
+
+def order_to_dict(order) -> Dict[str, Any]:
+    return {"symbol": order.symbol, "price": order.price, "quantity": order.quantity}
+
+
+def order_depth_to_dict(order_depth) -> Dict[str, Any]:
+    return {"buy_orders": order_depth.buy_orders, "sell_orders": order_depth.sell_orders}
+
+
+def own_trade_to_dict(trade) -> Dict[str, Any]:
+    return {"symbol": trade.symbol, "price": trade.price, "quantity": trade.quantity,
+            "counter_party": trade.counter_party}
+
+
+def trade_to_dict(trade) -> Dict[str, Any]:
+    return {"symbol": trade.symbol, "price": trade.price, "quantity": trade.quantity, "buyer": trade.buyer,
+            "seller": trade.seller, "timestamp": trade.timestamp}
+
+
+def conversion_observation_to_dict(observation) -> Dict[str, Any]:
+    return {field: getattr(observation, field) for field in conversion_fields(observation)}
+
+
+def observation_to_dict(observation) -> Dict[str, Any]:
+    return {
+        "plainValueObservations": observation.plainValueObservations,
+        "conversionObservations": {product: conversion_observation_to_dict(conversion)
+                                   for product, conversion in observation.conversionObservations.items()},
+    }
+
+
+def trades_to_dicts(trades) -> list:
+    # One encoder lookup per run of trades of the same class (Trade or OwnTrade)
+    dicts = []
+    kind = encoder = None
+    for trade in trades:
+        if type(trade) is not kind:
+            kind = type(trade)
+            encoder = encoder_for(kind)
+        dicts.append(encoder(trade))
+    return dicts
+
+
+def state_to_dict(state) -> Dict[str, Any]:
+    """The whole state as plain dicts and lists, for one pass of json's C encoder"""
+    observations = state.observations
+    return {
+        "traderData": state.traderData,
+        "timestamp": state.timestamp,
+        "listings": {symbol: listing_to_dict(listing) for symbol, listing in state.listings.items()},
+        "order_depths": {symbol: {"buy_orders": order_depth.buy_orders, "sell_orders": order_depth.sell_orders}
+                         for symbol, order_depth in state.order_depths.items()},
+        "own_trades": {symbol: trades_to_dicts(trades) for symbol, trades in state.own_trades.items()},
+        "market_trades": {symbol: trades_to_dicts(trades) for symbol, trades in state.market_trades.items()},
+        "position": state.position,
+        "observations": observation_to_dict(observations) if hasattr(observations, "conversionObservations")
+        else observations,
+    }
+
+
+ENCODERS = {
+    "Listing": listing_to_dict,
+    "Order": order_to_dict,
+    "OrderDepth": order_depth_to_dict,
+    "Trade": trade_to_dict,
+    "OwnTrade": own_trade_to_dict,
+    "ConversionObservation": conversion_observation_to_dict,
+    "LegacyConversionObservation": conversion_observation_to_dict,
+    "Observation": observation_to_dict,
+    "TradingState": state_to_dict,
+}
+
+
+# ENCODERS resolved per class; classes are matched by name so any datamodel module works
+encoders_by_type = {}
+
+
+def encoder_for(cls):
+    encoder = encoders_by_type.get(cls)
+    if encoder is None:
+        # Subclasses such as SortedOrderDepth are encoded like their datamodel base class
+        names = [base.__name__ for base in cls.__mro__ if base.__name__ in ENCODERS]
+        if names:
+            encoder = ENCODERS[names[0]]
+        elif "__dict__" in dir(cls):
+            encoder = vars
+        else:
+            raise TypeError(f"Object of type {cls.__name__} is not JSON serializable")
+        encoders_by_type[cls] = encoder
+    return encoder
+
+
+def to_dict(o) -> Dict[str, Any]:
+    """json default hook for every datamodel class"""
+    return encoder_for(type(o))(o)
+
+
+# The tree state_to_dict builds holds only dicts, lists and scalars, and never a
+# reference cycle, so the C encoder writes it without calling back into Python
+STATE_ENCODER = json.JSONEncoder(sort_keys=True, check_circular=False)
+
+
+def state_to_json(state) -> str:
+    return STATE_ENCODER.encode(state_to_dict(state))
+
+
+# jsonpickle tags objects with their class path. Before the datamodel moved to common/
+# every round imported its own datamodel.ConversionObservation (LegacyConversionObservation
+# is that class for rounds 1-3), so the shared classes keep writing that path and
+# jsonpickle.decode of old and new traderData resolves the round's own class.
+PICKLE_PATHS = {
+    "common.datamodel.ConversionObservation": "datamodel.ConversionObservation",
+    "common.datamodel.LegacyConversionObservation": "datamodel.ConversionObservation",
+}
+
+
+def pickle_path(cls) -> str:
+    path = cls.__module__ + "." + cls.__qualname__
+    return PICKLE_PATHS.get(path, path)
+
+
+def observation_to_str(observation) -> str:
+    conversions = {}
+    for product, conversion in observation.conversionObservations.items():
+        tagged = {"py/object": pickle_path(type(conversion))}
+        for field in conversion_fields(conversion):
+            tagged[field] = getattr(conversion, field)
+        conversions[product] = tagged
+    return ("(plainValueObservations: " + json.dumps(observation.plainValueObservations)
+            + ", conversionObservations: " + json.dumps(conversions) + ")")
+
+
+def order_depth_from_dict(data: Dict[str, Any], model):
+    # JSON turned the integer price keys into strings
+    order_depth = model.OrderDepth()
+    order_depth.buy_orders = {int(price): volume for price, volume in data["buy_orders"].items()}
+    order_depth.sell_orders = {int(price): volume for price, volume in data["sell_orders"].items()}
+    return order_depth
+
+
+def trade_from_dict(data: Dict[str, Any], model):
+    if "counter_party" in data:
+        return model.OwnTrade(data["symbol"], data["price"], data["quantity"], data["counter_party"])
+    return model.Trade(data["symbol"], data["price"], data["quantity"], data["buyer"], data["seller"],
+                       data["timestamp"])
+
+
+def observation_from_dict(data: Dict[str, Any], model):
+    conversions = {}
+    for product, values in data["conversionObservations"].items():
+        if "sugarPrice" in values:
+            conversions[product] = model.ConversionObservation(*[values[field] for field in CONVERSION_ARGS_SUGAR])
+        else:
+            # common.datamodel keeps the sunlight/humidity layout under its own name
+            cls = getattr(model, "LegacyConversionObservation", model.ConversionObservation)
+            conversions[product] = cls(*[values[field] for field in CONVERSION_FIELDS])
+    return model.Observation(data["plainValueObservations"], conversions)
+
+
+def state_from_dict(data: Dict[str, Any], model=None):
+    if model is None:
+        from common import datamodel as model
+    observations = data["observations"]
+    return model.TradingState(
+        traderData=data["traderData"],
+        timestamp=data["timestamp"],
+        listings={symbol: model.Listing(listing["symbol"], listing["product"], listing["denomination"])
+                  for symbol, listing in data["listings"].items()},
+        order_depths={symbol: order_depth_from_dict(order_depth, model)
+                      for symbol, order_depth in data["order_depths"].items()},
+        own_trades={symbol: [trade_from_dict(trade, model) for trade in trades]
+                    for symbol, trades in data["own_trades"].items()},
+        market_trades={symbol: [trade_from_dict(trade, model) for trade in trades]
+                       for symbol, trades in data["market_trades"].items()},
+        position=data["position"],
+        observations=observation_from_dict(observations, model) if "conversionObservations" in observations
+        else observations,
+    )
+
+
+def state_from_json(text: str, model=None):
+    return state_from_dict(json.loads(text), model)
+
+
+def _original_datamodel(sugar: bool):
+    """
+    The classes of the round folders' datamodel.py as they were before common/, to
+    benchmark against: plain __dict__ objects, toJSON through json's default hook and
+    Observation.__str__ through jsonpickle
+    """
+    import types
+
+    import jsonpickle
+
+    class Listing:
+        def __init__(self, symbol, product, denomination):
+            self.symbol = symbol
+            self.product = product
+            self.denomination = denomination
+
+    class ConversionObservation:
+        def __init__(self, bidPrice, askPrice, transportFees, exportTariff, importTariff, *last):
+            self.bidPrice = bidPrice
+            self.askPrice = askPrice
+            self.transportFees = transportFees
+            self.exportTariff = exportTariff
+            self.importTariff = importTariff
+            if sugar:
+                self.sunlightIndex = last[1]
+                self.sugarPrice = last[0]
+            else:
+                self.sunlight = last[0]
+                self.humidity = last[1]
+
+    class Observation:
+        def __init__(self, plainValueObservations, conversionObservations):
+            self.plainValueObservations = plainValueObservations
+            self.conversionObservations = conversionObservations
+
+        def __str__(self):
+            return ("(plainValueObservations: " + jsonpickle.encode(self.plainValueObservations)
+                    + ", conversionObservations: " + jsonpickle.encode(self.conversionObservations) + ")")
+
+    class OrderDepth:
+        def __init__(self):
+            self.buy_orders = {}
+            self.sell_orders = {}
+
+    class Trade:
+        def __init__(self, symbol, price, quantity, buyer=None, seller=None, timestamp=0):
+            self.symbol = symbol
+            self.price = price
+            self.quantity = quantity
+            self.buyer = buyer
+            self.seller = seller
+            self.timestamp = timestamp
+
+    class TradingState:
+        def __init__(self, traderData, timestamp, listings, order_depths, own_trades, market_trades, position,
+                     observations):
+            self.traderData = traderData
+            self.timestamp = timestamp
+            self.listings = listings
+            self.order_depths = order_depths
+            self.own_trades = own_trades
+            self.market_trades = market_trades
+            self.position = position
+            self.observations = observations
+
+        def toJSON(self):
+            return json.dumps(self, default=lambda o: o.__dict__, sort_keys=True)
+
+    # Where the round's datamodel.py defined it, which is what jsonpickle writes
+    ConversionObservation.__module__ = "datamodel"
+    ConversionObservation.__qualname__ = "ConversionObservation"
+    return types.SimpleNamespace(Listing=Listing, ConversionObservation=ConversionObservation,
+                                 Observation=Observation, OrderDepth=OrderDepth, Trade=Trade,
+                                 TradingState=TradingState)
+
+
+def sample_state(model, seed: int = 0):
+    """A ten product TradingState built from the classes of model"""
+    import random
+
+    rng = random.Random(seed)
+    products = ["RAINFOREST_RESIN", "KELP", "SQUID_INK", "CROISSANTS", "JAMS", "DJEMBES", "PICNIC_BASKET1",
+                "PICNIC_BASKET2", "VOLCANIC_ROCK", "MAGNIFICENT_MACARONS"]
+    order_depths = {}
+    for product in products:
+        order_depth = model.OrderDepth()
+        mid = rng.randint(1000, 10000)
+        order_depth.buy_orders = {mid - 1 - i: rng.randint(1, 30) for i in range(3)}
+        order_depth.sell_orders = {mid + 1 + i: -rng.randint(1, 30) for i in range(3)}
+        order_depths[product] = order_depth
+    trades = {product: [model.Trade(product, rng.randint(1000, 10000), rng.randint(1, 10), "", "", 100)
+                        for _ in range(3)] for product in products}
+    conversion_args = [650.0, 652.5, 1.5, 9.5, -5.0, 200.0, 60.0]
+    observation = model.Observation({"SOME_INDEX": 1},
+                                    {"MAGNIFICENT_MACARONS": model.ConversionObservation(*conversion_args)})
+    return model.TradingState("", 100, {product: model.Listing(product, product, "SEASHELLS") for product in products},
+                              order_depths, trades, trades, {product: 0 for product in products}, observation)
+
+
+def benchmark(model, ticks: int = 500):
+    import warnings
+
+    from common.benchmarking import best_time, print_time
+
+    # jsonpickle 4 warns about a default changing in 5.0 on every encode
+    warnings.filterwarnings("ignore", message="keys will default", category=DeprecationWarning)
+    state = sample_state(model)
+    observation = state.observations
+    original = sample_state(_original_datamodel(hasattr(observation.conversionObservations["MAGNIFICENT_MACARONS"],
+                                                        "sugarPrice")))
+
+    # Same text as the original code, and decoding gives back the same state
+    text = state_to_json(state)
+    assert text == original.toJSON()
+    assert observation_to_str(observation) == str(original.observations)
+    assert state_to_json(state_from_json(text, model)) == text
+
+    runs = {
+        "original toJSON": original.toJSON,
+        "state_to_json": lambda: state_to_json(state),
+        "original Observation str": lambda: str(original.observations),
+        "observation_to_str": lambda: observation_to_str(observation),
+        "json.loads": lambda: json.loads(text),
+        "state_from_json": lambda: state_from_json(text, model),
+    }
+    for name, run in runs.items():
+        print_time(name, best_time(run, number=ticks))
+
+
+if __name__ == "__main__":
+    import importlib
+    import sys
+
+    # The datamodel of a round folder, e.g. python -m common.serialization round_5
+    if len(sys.argv) > 1:
+        sys.path.insert(0, sys.argv[1])
+        benchmark(importlib.import_module("datamodel"))
+    else:
+        benchmark(importlib.import_module("common.datamodel"))
@@ -0,0 +1,178 @@
+"""
+Volatility smile fit
+
+SmileFit fits the implied vols of an option chain as a polynomial (quadratic by default)
+in the time scaled log-moneyness
+
+    m = ln(strike / spot) / sqrt(time to expiry)
+
+by weighted least squares. The normal equations X'WX and X'Wy are kept between ticks:
+an update scales them by the forgetting factor, adds the tick's strikes and solves a
+3 x 3 system, so a tick costs the same on the last tick of a day as on the first and
+the fit follows the smile as it moves (forgetting 0.9 remembers roughly ten ticks).
+Residuals (market vol - fitted vol) point at the strikes priced off the smile:
+
+    smile = SmileFit()
+    m = log_moneyness(VOUCHER_STRIKE_ARRAY, rock_mid, time_to_expiry)
+    smile.update(m, vols, weights=vegas)     # vega weights keep illiquid wings from dominating
+    smile.residuals(m, vols)                 # > 0: the strike is rich against the smile
+    smile.residuals(m, vols) * vegas         # the same in price units
+
+smile_history runs the same recursion over every tick of a day (e.g. the output of
+common.options.implied_volatility_surface) to study how the smile moves.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+
+def log_moneyness(strike, spot, time):
+    return np.log(np.asarray(strike, dtype=np.float64) / spot) / np.sqrt(time)
+
+
+class SmileFit:
+    def __init__(self, forgetting: float = 0.9, degree: int = 2, ridge: float = 1e-9):
+        """
+        forgetting: weight of the previous ticks per update, 0 fits every tick on its own
+        degree: degree of the polynomial in the log-moneyness
+        ridge: regularization relative to the size of X'WX, so a tick with fewer distinct
+            strikes than coefficients still gives a (flat) answer instead of a singular system
+        """
+        if not 0 <= forgetting <= 1:
+            raise ValueError(f"Forgetting factor must be in [0, 1], got {forgetting}")
+        self.forgetting = forgetting
+        self.degree = degree
+        self.ridge = ridge
+        size = degree + 1
+        self.normal = np.zeros((size, size))   # X'WX
+        self.moment = np.zeros(size)           # X'Wy
+        self.coefficients = np.full(size, np.nan)  # constant term first
+        self.points = 0
+
+    def update(self, moneyness, vols, weights=None) -> np.ndarray:
+        """Adds a tick's (moneyness, vol) points (NaN ones are skipped), returns the coefficients"""
+        moneyness = np.asarray(moneyness, dtype=np.float64)
+        vols = np.asarray(vols, dtype=np.float64)
+        weights = np.ones_like(vols) if weights is None else np.asarray(weights, dtype=np.float64)
+        usable = ~(np.isnan(moneyness) | np.isnan(vols) | np.isnan(weights))
+        design = moneyness[usable, None] ** np.arange(self.degree + 1)
+        weighted = design.T * weights[usable]
+        self.normal = self.forgetting * self.normal + weighted @ design
+        self.moment = self.forgetting * self.moment + weighted @ vols[usable]
+        self.points += int(usable.sum())
+        if self.points:
+            self.coefficients = _solve(self.normal, self.moment, self.ridge)
+        return self.coefficients
+
+    def fitted(self, moneyness) -> np.ndarray:
+        return np.polynomial.polynomial.polyval(np.asarray(moneyness, dtype=np.float64), self.coefficients)
+
+    def residuals(self, moneyness, vols) -> np.ndarray:
+        """Market minus fitted vol, NaN where there is no vol or no fit yet"""
+        return np.asarray(vols, dtype=np.float64) - self.fitted(moneyness)
+
+    def codec_fields(self, name: str) -> list:
+        size = self.degree + 1
+        return [(name + "_normal", "f8", size * size), (name + "_moment", "f8", size), (name + "_points", "i8", 1)]
+
+    def state(self, name: str) -> Dict[str, object]:
+        return {name + "_normal": self.normal.ravel(), name + "_moment": self.moment, name + "_points": self.points}
+
+    def restore_state(self, values: Optional[Dict[str, object]], name: str) -> "SmileFit":
+        if values is not None:
+            size = self.degree + 1
+            self.normal = np.array(values[name + "_normal"], dtype=np.float64).reshape(size, size)
+            self.moment = np.atleast_1d(np.array(values[name + "_moment"], dtype=np.float64))
+            self.points = int(values[name + "_points"])
+            if self.points:
+                self.coefficients = _solve(self.normal, self.moment, self.ridge)
+        return self
+
+
+def _solve(normal: np.ndarray, moment: np.ndarray, ridge: float) -> np.ndarray:
+    # Works on a single system or a stack of them
+    size = normal.shape[-1]
+    scale = np.trace(normal, axis1=-2, axis2=-1)[..., None, None] / size
+    return np.linalg.solve(normal + ridge * scale * np.eye(size), moment[..., None])[..., 0]
+
+
+def smile_history(moneyness: np.ndarray, vols: np.ndarray, weights: Optional[np.ndarray] = None,
+                  forgetting: float = 0.9, degree: int = 2, ridge: float = 1e-9) -> np.ndarray:
+    """
+    SmileFit.update over the rows of (ticks, strikes) arrays, all at once: the
+    coefficients after every tick, shape (ticks, degree + 1), NaN before the first point.
+    """
+    moneyness = np.asarray(moneyness, dtype=np.float64)
+    vols = np.asarray(vols, dtype=np.float64)
+    weights = np.ones_like(vols) if weights is None else np.asarray(weights, dtype=np.float64)
+    usable = ~(np.isnan(moneyness) | np.isnan(vols) | np.isnan(weights))
+    design = np.where(usable, moneyness, 0.0)[..., None] ** np.arange(degree + 1)
+    weighted = design * np.where(usable, weights, 0.0)[..., None]
+    # Each tick's contribution to X'WX and X'Wy, then the forgetting recursion across ticks
+    normals = np.einsum("tki,tkj->tij", weighted, design)
+    moments = np.einsum("tki,tk->ti", weighted, np.where(usable, vols, 0.0))
+    for t in range(1, len(normals)):
+        normals[t] += forgetting * normals[t - 1]
+        moments[t] += forgetting * moments[t - 1]
+
+    coefficients = np.full(moments.shape, np.nan)
+    fitted = np.cumsum(usable.sum(axis=1)) > 0
+    coefficients[fitted] = _solve(normals[fitted], moments[fitted], ridge)
+    return coefficients
+
+
+def benchmark(ticks: int = 10000):
+    from common.benchmarking import best_time, print_time
+    from common.options import VOUCHER_STRIKE_ARRAY, black_scholes, implied_volatility
+
+    rng = np.random.default_rng(0)
+    spots = 10000 * np.exp(np.cumsum(rng.normal(0, 0.001, ticks)))
+    times = (5 - np.arange(ticks) / ticks) / 365
+    moneyness = log_moneyness(VOUCHER_STRIKE_ARRAY, spots[:, None], times[:, None])
+    # A smile whose level drifts, quoted on a whole price grid like the exchange
+    level = 0.2 + np.cumsum(rng.normal(0, 0.0002, ticks))
+    true_vols = level[:, None] + 0.02 * moneyness + 0.03 * moneyness ** 2
+    prices = np.round(black_scholes(spots[:, None], VOUCHER_STRIKE_ARRAY, times[:, None], true_vols).price)
+    # One strike mispriced by a few ticks every 100th tick
+    mispriced = np.zeros(prices.shape, dtype=bool)
+    mispriced[::100, 2] = True
+    prices[mispriced] += 5
+    vols, _ = implied_volatility(prices, spots[:, None], VOUCHER_STRIKE_ARRAY, times[:, None])
+    vegas = black_scholes(spots[:, None], VOUCHER_STRIKE_ARRAY, times[:, None], vols).vega
+
+    live = np.empty((ticks, 3))
+
+    def run_live():
+        smile = SmileFit()
+        for t in range(ticks):
+            live[t] = smile.update(moneyness[t], vols[t], vegas[t])
+
+    update_time = best_time(run_live, repeat=3) / ticks
+
+    def refit(t, forgetting=0.9):
+        # The same fit recomputed from every tick so far
+        age = forgetting ** (t - np.arange(t + 1))[:, None] * vegas[:t + 1]
+        usable = ~np.isnan(vols[:t + 1])
+        x = moneyness[:t + 1][usable]
+        root = np.sqrt(age[usable])
+        design = x[:, None] ** np.arange(3)
+        return np.linalg.lstsq(design * root[:, None], vols[:t + 1][usable] * root, rcond=None)[0]
+
+    print_time("SmileFit.update", update_time, per="tick")
+    for t in (ticks // 10, ticks - 1):
+        print_time(f"refit from scratch, tick {t}", best_time(lambda: refit(t), number=5),
+                   note=f"max coefficient difference {np.max(np.abs(refit(t) - live[t])):.1e}")
+
+    history = smile_history(moneyness, vols, vegas)
+    print_time("smile_history", best_time(lambda: smile_history(moneyness, vols, vegas), repeat=3),
+               note=f"for {ticks} ticks, max difference from the live fit {np.nanmax(np.abs(history - live)):.1e}")
+
+    residuals = vols - (live[:, :1] + live[:, 1:2] * moneyness + live[:, 2:] * moneyness ** 2)
+    # In price units (vol residual times vega) the wings' rounding noise stays small
+    flagged = np.abs(residuals * vegas) > 2
+    print(f"residual x vega > 2: {np.mean(flagged[mispriced]):.0%} of the mispriced quotes, "
+          f"{np.mean(flagged[~mispriced & ~np.isnan(vols)]):.1%} of the others")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,141 @@
+"""
+Compact traderData codec
+
+The exchange may rebuild the Trader between calls, so anything kept on self is lost
+unless it travels through traderData. StateCodec packs bounded numeric state (ring
+buffers of recent prices, EMAs, last mids per product) into one fixed-layout binary
+record, described by a NumPy structured dtype, and base64 encodes it. Decoding is a
+base64 decode plus np.frombuffer, i.e. a few microseconds.
+
+    codec = StateCodec([
+        ("price_action_KELP", "ring", 51),   # last 51 values of a list/array
+        ("ema_KELP", "f8", 1),               # scalar
+        ("last_mids", "f8", 3),              # fixed length vector
+    ])
+    trader_data = codec.encode({"price_action_KELP": prices, "ema_KELP": 2010.5, "last_mids": mids})
+    values = codec.decode(state.traderData)  # None if empty or written with another schema
+
+The record size is fixed by the schema, so a schema that would not fit in traderData
+fails when the codec is built rather than in the middle of a run. Float fields left out
+of encode() decode as NaN.
+
+Run `python -m common.state_codec` for a comparison against json and jsonpickle.
+"""
+import base64
+import binascii
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# The exchange truncates traderData beyond this many characters
+MAX_TRADER_DATA_LENGTH = 50000
+
+RING_COUNT_SUFFIX = "__n"
+
+
+class StateCodec:
+    def __init__(self, fields: List[Tuple[str, str, int]], max_length: int = MAX_TRADER_DATA_LENGTH):
+        """
+        fields: (name, kind, length) where kind is "ring" (float64 ring of the last `length`
+        values) or a NumPy dtype string such as "f8", "f4" or "i4". Length 1 means scalar.
+        """
+        self.fields = fields
+        layout = [("schema", "<u4")]
+        for name, kind, length in fields:
+            if kind == "ring":
+                layout.append((name, "<f8", (length,)))
+                layout.append((name + RING_COUNT_SUFFIX, "<u4"))
+            elif length == 1:
+                layout.append((name, "<" + kind))
+            else:
+                layout.append((name, "<" + kind, (length,)))
+        self.dtype = np.dtype(layout)
+
+        # A different schema (e.g. a new version of the trader) must not be decoded as ours
+        self.schema = zlib.crc32(repr(fields).encode())
+        self.encoded_length = 4 * ((self.dtype.itemsize + 2) // 3)
+        if self.encoded_length > max_length:
+            raise ValueError(f"State of {self.encoded_length} characters does not fit in traderData ({max_length})")
+
+    def encode(self, values: Dict[str, Any]) -> str:
+        record = np.zeros((), dtype=self.dtype)
+        record["schema"] = self.schema
+        for name, kind, length in self.fields:
+            if name not in values:
+                # Missing floats decode as NaN, so "unknown" stays distinguishable from 0
+                if kind != "ring" and np.dtype(kind).kind == "f":
+                    record[name] = np.nan
+                continue
+            value = values[name]
+            if kind == "ring":
+                # Keep the most recent values, right aligned so the record layout stays fixed
+                recent = np.asarray(value[-length:] if len(value) > length else value, dtype=np.float64)
+                record[name][length - len(recent):] = recent
+                record[name + RING_COUNT_SUFFIX] = len(recent)
+            else:
+                record[name] = value
+        return base64.b64encode(record.tobytes()).decode("ascii")
+
+    def decode(self, data: str) -> Optional[Dict[str, Any]]:
+        if not data or len(data) != self.encoded_length:
+            return None
+        try:
+            record = np.frombuffer(base64.b64decode(data), dtype=self.dtype)[0]
+        except (binascii.Error, ValueError):
+            return None
+        if record["schema"] != self.schema:
+            return None
+
+        values = {}
+        for name, kind, length in self.fields:
+            if kind == "ring":
+                count = int(record[name + RING_COUNT_SUFFIX])
+                values[name] = record[name][length - count:]
+            elif length == 1:
+                values[name] = record[name].item()
+            else:
+                values[name] = record[name]
+        return values
+
+
+def benchmark(ticks: int = 500):
+    import json
+    import warnings
+
+    from common.benchmarking import best_time
+
+    products = ["SQUID_INK", "CROISSANTS", "JAMS", "DJEMBES"]
+    rng = np.random.default_rng(0)
+    state = {f"price_action_{product}": list(2000 + rng.standard_normal(51).cumsum()) for product in products}
+    state.update({f"last_mid_{product}": float(rng.normal(2000, 10)) for product in products})
+
+    codec = StateCodec([(f"price_action_{product}", "ring", 51) for product in products]
+                       + [(f"last_mid_{product}", "f8", 1) for product in products])
+    encoded = {
+        "codec": codec.encode(state),
+        "json": json.dumps(state),
+    }
+    runs = {
+        "codec": (lambda: codec.encode(state), lambda: codec.decode(encoded["codec"])),
+        "json": (lambda: json.dumps(state), lambda: json.loads(encoded["json"])),
+    }
+    with warnings.catch_warnings():
+        # jsonpickle 4 announces on every call that its keys default changes in 5.0
+        warnings.filterwarnings("ignore", message="keys will default", category=DeprecationWarning)
+        try:
+            import jsonpickle
+            encoded["jsonpickle"] = jsonpickle.encode(state)
+            runs["jsonpickle"] = (lambda: jsonpickle.encode(state), lambda: jsonpickle.decode(encoded["jsonpickle"]))
+        except ImportError:
+            pass
+
+        print(f"{'format':12} {'chars':>7} {'encode us':>10} {'decode us':>10}")
+        for name, (encode, decode) in runs.items():
+            encode_us = best_time(encode, number=ticks, repeat=3) * 1e6
+            decode_us = best_time(decode, number=ticks, repeat=3) * 1e6
+            print(f"{name:12} {len(encoded[name]):>7} {encode_us:>10.2f} {decode_us:>10.2f}")
+
+
+if __name__ == "__main__":
+    benchmark()
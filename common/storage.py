@@ -0,0 +1,122 @@
+"""
+Per-product partitioned storage
+
+Splits every prices/trades file into one partition per product, each holding its
+canonical columns (see common.loader) sorted by timestamp as separate .npy files.
+Partitions are opened memory-mapped and range queries binary-search the timestamp
+column, so "KELP mid prices, day -1, ticks 200000-400000" only touches the bytes of
+those rows instead of filtering whole files with self.prices["product"] == product.
+
+Partitions are keyed by the source file's content hash, so edited files never serve
+stale data.
+
+    store = PartitionedStore()
+    kelp = store.query_day("prices", 1, -1, "KELP", 200000, 400000, ["timestamp", "mid_price"])
+"""
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from common.catalog import DatasetCatalog, DatasetEntry
+from common.loader import CACHE_DIR, load_entry
+
+PARTITION_DIR = CACHE_DIR / "partitions" / "v1"
+PRODUCT_COLUMN = {"prices": "product", "trades": "symbol"}
+
+
+class PartitionedStore:
+    def __init__(self, catalog: Optional[DatasetCatalog] = None, root: Path = PARTITION_DIR):
+        self.catalog = catalog if catalog is not None else DatasetCatalog.load()
+        self.root = Path(root)
+        # Opened partitions, keyed by (sha1, product)
+        self.opened: Dict[tuple, Dict[str, np.ndarray]] = {}
+
+    def _file_dir(self, entry: DatasetEntry) -> Path:
+        return self.root / entry.sha1
+
+    def build(self, entry: DatasetEntry) -> Path:
+        """Writes the partitions of one file, if not already on disk"""
+        if entry.kind not in PRODUCT_COLUMN:
+            raise ValueError(f"Only prices and trades files can be partitioned by product, got {entry.kind}")
+
+        directory = self._file_dir(entry)
+        if directory.exists():
+            return directory
+
+        table = load_entry(entry, self.catalog.root)
+        product_column = PRODUCT_COLUMN[entry.kind]
+        codes = np.asarray(table[product_column])
+        # One stable sort groups rows per product while keeping them in timestamp order
+        order = np.lexsort((np.asarray(table["timestamp"]), codes))
+        bounds = np.searchsorted(codes[order], np.arange(len(table.categories[product_column]) + 1))
+
+        tmp_dir = directory.with_name(directory.name + ".tmp")
+        for code, product in enumerate(table.categories[product_column]):
+            rows = order[bounds[code]:bounds[code + 1]]
+            if len(rows) == 0:
+                continue
+            product_dir = tmp_dir / product
+            product_dir.mkdir(parents=True, exist_ok=True)
+            for name, values in table.columns.items():
+                if name == product_column:
+                    continue
+                np.save(product_dir / f"{name}.npy", np.asarray(values)[rows])
+            if table.categories:
+                with open(product_dir / "categories.txt", "w") as f:
+                    for name, values in table.categories.items():
+                        if name != product_column:
+                            f.write(name + "\t" + "\t".join(values) + "\n")
+        os.replace(tmp_dir, directory)
+        return directory
+
+    def products(self, entry: DatasetEntry) -> List[str]:
+        return sorted(os.listdir(self.build(entry)))
+
+    def partition(self, entry: DatasetEntry, product: str) -> Dict[str, np.ndarray]:
+        """All columns of one product as memory-mapped arrays sorted by timestamp"""
+        key = (entry.sha1, product)
+        if key not in self.opened:
+            product_dir = self.build(entry) / product
+            if not product_dir.exists():
+                raise KeyError(f"{product} does not occur in {entry.path}")
+            self.opened[key] = {
+                filename[:-4]: np.load(product_dir / filename, mmap_mode="r")
+                for filename in os.listdir(product_dir) if filename.endswith(".npy")
+            }
+        return self.opened[key]
+
+    def categories(self, entry: DatasetEntry, product: str) -> Dict[str, List[str]]:
+        """Category lists for the code columns of a partition (buyer, seller, currency)"""
+        path = self.build(entry) / product / "categories.txt"
+        categories = {}
+        if path.exists():
+            with open(path) as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    categories[parts[0]] = parts[1:]
+        return categories
+
+    def query(self, entry: DatasetEntry, product: str, start: Optional[int] = None, end: Optional[int] = None,
+              columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Rows of product with start <= timestamp <= end. The returned arrays are slices of
+        the memory maps, so only the requested byte range is ever read from disk.
+        """
+        partition = self.partition(entry, product)
+        timestamps = partition["timestamp"]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side="right"))
+        names = columns if columns is not None else list(partition)
+        return {name: partition[name][lo:hi] for name in names}
+
+    def query_day(self, kind: str, round_num: int, day: int, product: str, start: Optional[int] = None,
+                  end: Optional[int] = None, columns: Optional[List[str]] = None,
+                  season: Optional[int] = 3) -> Dict[str, np.ndarray]:
+        entry = self.catalog.resolve(kind, round_num, day, season)
+        return self.query(entry, product, start, end, columns)
+
+    def query_file(self, path, product: str, start: Optional[int] = None, end: Optional[int] = None,
+                   columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        return self.query(self.catalog.entry_for(path), product, start, end, columns)
@@ -0,0 +1,194 @@
+"""
+Incremental volatility estimators
+
+Each estimator takes one observation per tick and updates its variance in O(1), so an
+option pricer can ask for a fresh volatility on the last tick of a day for the same
+price as on the first:
+
+* RealizedVariance   Welford mean/variance of simple returns p_t / p_{t-1} - 1, equal to
+                     np.var(np.diff(prices) / prices[:-1]) over everything seen so far
+* EwmaVariance       RiskMetrics style var_t = lambda * var_{t-1} + (1 - lambda) * r_t^2
+* ParkinsonVariance  the Parkinson range estimator ln(high / low)^2 / (4 ln 2) with the best
+                     ask and bid as high and low, averaged over all ticks or with an EWMA
+
+VolatilityEstimator feeds all three from the same tick:
+
+    volatility = VolatilityEstimator(lambda_=0.94)
+    volatility.update(mid_price, best_bid, best_ask)
+    volatility.realized.variance(), volatility.ewma.std(), volatility.parkinson.variance()
+
+Variances are per tick; scale them (e.g. by ticks per year) where they are used.
+"""
+import math
+from typing import Optional, Sequence
+
+PARKINSON_SCALE = 1 / (4 * math.log(2))
+
+
+class RealizedVariance:
+    """Population variance of all simple returns seen so far (Welford)"""
+
+    def __init__(self):
+        self.previous: Optional[float] = None
+        self.count = 0        # returns, one less than prices
+        self.mean = 0.0
+        self.squares = 0.0    # sum of squared deviations from the mean
+
+    def update(self, price: float) -> Optional[float]:
+        """Adds a price, returns the new return (None for the first price)"""
+        previous = self.previous
+        self.previous = price
+        if previous is None:
+            return None
+        value = (price - previous) / previous
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.squares += delta * (value - self.mean)
+        return value
+
+    def extend(self, prices: Sequence[float]) -> None:
+        for price in prices:
+            self.update(price)
+
+    def variance(self, ddof: int = 0) -> Optional[float]:
+        if self.count <= ddof:
+            return None
+        return max(self.squares, 0.0) / (self.count - ddof)
+
+    def std(self, ddof: int = 0) -> Optional[float]:
+        variance = self.variance(ddof)
+        return math.sqrt(variance) if variance is not None else None
+
+
+class EwmaVariance:
+    """Exponentially weighted variance of simple returns, decay lambda_ per tick"""
+
+    def __init__(self, lambda_: float = 0.94, initial: Optional[float] = None):
+        if not 0 < lambda_ < 1:
+            raise ValueError(f"lambda_ must be between 0 and 1, got {lambda_}")
+        self.lambda_ = lambda_
+        self.previous: Optional[float] = None
+        self.value: Optional[float] = initial
+
+    def update(self, price: float) -> Optional[float]:
+        previous = self.previous
+        self.previous = price
+        if previous is None:
+            return self.value
+        squared = ((price - previous) / previous) ** 2
+        # Without an initial value the first squared return starts the average
+        self.value = squared if self.value is None else self.lambda_ * self.value + (1 - self.lambda_) * squared
+        return self.value
+
+    def variance(self) -> Optional[float]:
+        return self.value
+
+    def std(self) -> Optional[float]:
+        return math.sqrt(self.value) if self.value is not None else None
+
+
+class ParkinsonVariance:
+    """
+    Parkinson variance with best ask/bid as the tick's high/low. lambda_=None averages all
+    ticks, otherwise ticks are weighted like in EwmaVariance.
+    """
+
+    def __init__(self, lambda_: Optional[float] = None):
+        self.lambda_ = lambda_
+        self.count = 0
+        self.value: Optional[float] = None
+
+    def update(self, bid: float, ask: float) -> Optional[float]:
+        """Ticks with a one sided or crossed book are skipped"""
+        if bid is None or ask is None or bid <= 0 or ask < bid:
+            return self.value
+        observation = math.log(ask / bid) ** 2 * PARKINSON_SCALE
+        self.count += 1
+        if self.value is None:
+            self.value = observation
+        elif self.lambda_ is None:
+            self.value += (observation - self.value) / self.count
+        else:
+            self.value = self.lambda_ * self.value + (1 - self.lambda_) * observation
+        return self.value
+
+    def variance(self) -> Optional[float]:
+        return self.value
+
+    def std(self) -> Optional[float]:
+        return math.sqrt(self.value) if self.value is not None else None
+
+
+class VolatilityEstimator:
+    """The three estimators above, updated from the same ticks"""
+
+    def __init__(self, lambda_: float = 0.94, parkinson_lambda: Optional[float] = None):
+        self.realized = RealizedVariance()
+        self.ewma = EwmaVariance(lambda_)
+        self.parkinson = ParkinsonVariance(parkinson_lambda)
+        self.seen = 0
+
+    def update(self, price: float, bid: Optional[float] = None, ask: Optional[float] = None) -> None:
+        self.realized.update(price)
+        self.ewma.update(price)
+        if bid is not None and ask is not None:
+            self.parkinson.update(bid, ask)
+        self.seen += 1
+
+    def extend(self, prices: Sequence[float]) -> None:
+        for price in prices:
+            self.update(price)
+
+
+def benchmark(ticks: int = 10000):
+    import random
+    import time
+
+    import numpy as np
+
+    rng = random.Random(0)
+    prices = [10000.0]
+    for _ in range(ticks - 1):
+        prices.append(prices[-1] * math.exp(rng.gauss(0, 0.001)))
+
+    # What BlackScholesStrategy.update_volatility used to do on every tick
+    def full_history(history):
+        returns = np.diff(history) / history[:-1]
+        return np.var(returns)
+
+    blocks = 5
+    block = ticks // blocks
+    history = []
+    realized = RealizedVariance()
+    estimator = VolatilityEstimator()
+    full_times, realized_times, estimator_times = [], [], []
+    for start in range(0, block * blocks, block):
+        begin = time.perf_counter()
+        for price in prices[start:start + block]:
+            history.append(price)
+            if len(history) > 1:
+                full_history(np.array(history))
+        full_times.append((time.perf_counter() - begin) / block * 1e6)
+
+        begin = time.perf_counter()
+        for price in prices[start:start + block]:
+            realized.update(price)
+            realized.variance()
+        realized_times.append((time.perf_counter() - begin) / block * 1e6)
+
+        begin = time.perf_counter()
+        for price in prices[start:start + block]:
+            estimator.update(price, price - 0.5, price + 0.5)
+        estimator_times.append((time.perf_counter() - begin) / block * 1e6)
+
+    print("us/tick per fifth of the day:")
+    print(f"{'np.var over full history':28} " + " ".join(f"{t:8.2f}" for t in full_times))
+    print(f"{'RealizedVariance':28} " + " ".join(f"{t:8.2f}" for t in realized_times))
+    print(f"{'VolatilityEstimator (all 3)':28} " + " ".join(f"{t:8.2f}" for t in estimator_times))
+    expected = full_history(np.array(history))
+    print(f"relative difference of the variances: {abs(realized.variance() - expected) / expected:.2e}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,106 +1,25 @@
 import json
-from json import JSONEncoder
+import os
+import sys
 import numpy as np
-from typing import List, Tuple, Dict
-import jsonpickle
-import math
-
-def cdf(x):
-    """Approximation of the cumulative distribution function for the standard normal distribution."""
-    # Constants for the approximation
-    a1, a2, a3, a4, a5 = 0.254829592, -0.284496736, 1.421413741, -1.453152027, 1.061405429
-    p = 0.3275911
-
-    # Save the sign of x
-    sign = 1 if x >= 0 else -1
-    x = abs(x) / math.sqrt(2.0)
-
-    # A&S formula 7.1.26
-    t = 1.0 / (1.0 + p*x)
-    y = 1.0 - (((((a5*t + a4)*t) + a3)*t + a2)*t + a1)*t * math.exp(-x*x)
-
-    return 0.5 * (1.0 + sign * y)
-
-
+from collections import deque
+from typing import List, Optional, Tuple, Dict
 
 """
  Data Model
 """
 
-Time = int
-Symbol = str
-Product = str
-Position = int
-UserId = str
-Observation = int
-
-
-class Listing:
-    def __init__(self, symbol: Symbol, product: Product, denomination: Product):
-        self.symbol = symbol
-        self.product = product
-        self.denomination = denomination
-
-
-class Order:
-    def __init__(self, symbol: Symbol, price: int, quantity: int) -> None:
-        self.symbol = symbol
-        self.price = price
-        self.quantity = quantity
-
-    def __str__(self) -> str:
-        return "(" + self.symbol + ", " + str(self.price) + ", " + str(self.quantity) + ")"
-
-    def __repr__(self) -> str:
-        return "(" + self.symbol + ", " + str(self.price) + ", " + str(self.quantity) + ")"
-
-
-class OrderDepth:
-    def __init__(self, buy_orders=None, sell_orders=None):
-        if sell_orders is None:
-            sell_orders = {}
-        if buy_orders is None:
-            buy_orders = {}
-        self.buy_orders: Dict[int, int] = buy_orders
-        self.sell_orders: Dict[int, int] = sell_orders
-
-
-class Trade:
-    def __init__(self, symbol: Symbol, price: int, quantity: int, buyer: UserId = None, seller: UserId = None,
-                 timestamp: int = 0) -> None:
-        self.symbol = symbol
-        self.price: int = price
-        self.quantity: int = quantity
-        self.buyer = buyer
-        self.seller = seller
-        self.timestamp = timestamp
-
-class TradingState(object):
-    def __init__(self,
-                 traderData: str,
-                 timestamp: int,
-                 listings: Dict[str, Listing],
-                 order_depths: Dict[str, OrderDepth],
-                 own_trades: Dict[str, List[Trade]],
-                 market_trades: Dict[str, List[Trade]],
-                 position: Dict[str, int],
-                 observations: Observation):
-        self.traderData = traderData
-        self.timestamp = timestamp
-        self.listings = listings
-        self.order_depths = order_depths
-        self.own_trades = own_trades
-        self.market_trades = market_trades
-        self.position = position
-        self.observations = observations
-        
-    def toJSON(self):
-       return json.dumps(self, default=lambda o: o.__dict__, sort_keys=True)
-
-
-class ProsperityEncoder(JSONEncoder):
-    def default(self, o):
-        return o.__dict__
+# Shared with the Prosperity 3 rounds, see <repo>/common/datamodel.py. `make combine`
+# bundles these modules into submit_trader.py for a submission (common/bundle.py).
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.datamodel import (  # noqa: E402,F401
+    Time, Symbol, Product, Position, UserId, Listing, LegacyConversionObservation as ConversionObservation,
+    Observation, Order, OrderDepth, Trade, TradingState, ProsperityEncoder,
+)
+from common.order_book import ask_prices, bid_prices  # noqa: E402
+from common.indicators import WeightedPriceWindow  # noqa: E402
+from common.options import black_scholes_call  # noqa: E402
+from common.volatility import VolatilityEstimator  # noqa: E402
 
 """
 Strategies
@@ -157,7 +76,7 @@ class Strategy:
 
     def continuous_buy(self, order_depth: OrderDepth, orders: list):
         if len(order_depth.sell_orders) != 0:
-            best_asks = sorted(order_depth.sell_orders.keys())
+            best_asks = ask_prices(order_depth)
 
             i = 0
             while i < self.trade_count and len(best_asks) > i:
@@ -169,7 +88,7 @@ class Strategy:
 
     def continuous_sell(self, order_depth: OrderDepth, orders: list):
         if len(order_depth.buy_orders) != 0:
-            best_bids = sorted(order_depth.buy_orders.keys(), reverse=True)
+            best_bids = bid_prices(order_depth)
 
             i = 0
             while i < self.trade_count and len(best_bids) > i:
@@ -185,20 +104,24 @@ class CrossStrategy(Strategy):
         super().__init__(name, max_position)
         self.strategy_start_day = 2
 
-        self.old_asks = []
-        self.old_bids = []
+        # Running price * volume and volume sums of the last strategy_start_day books
+        self.ask_window = WeightedPriceWindow(self.strategy_start_day)
+        self.bid_window = WeightedPriceWindow(self.strategy_start_day)
         self.min_req_price_difference = min_req_price_difference
 
     def trade(self, trading_state: TradingState, orders: list):
         order_depth: OrderDepth = trading_state.order_depths[self.name]
         self.cache_prices(order_depth)
-        if len(self.old_asks) < self.strategy_start_day or len(self.old_bids) < self.strategy_start_day:
+        if self.ask_window.seen < self.strategy_start_day or self.bid_window.seen < self.strategy_start_day:
             return
 
-        avg_bid, avg_ask = self.calculate_prices(self.strategy_start_day)
+        avg_bid, avg_ask = self.calculate_prices()
+        if avg_bid is None or avg_ask is None:
+            # No volume on one side over the whole window
+            return
 
         if len(order_depth.sell_orders) != 0:
-            best_asks = sorted(order_depth.sell_orders.keys())
+            best_asks = ask_prices(order_depth)
 
             i = 0
             while i < self.trade_count and len(best_asks) > i and best_asks[i] - avg_bid <= self.min_req_price_difference:
@@ -208,7 +131,7 @@ class CrossStrategy(Strategy):
                 i += 1
 
         if len(order_depth.buy_orders) != 0:
-            best_bids = sorted(order_depth.buy_orders.keys(), reverse=True)
+            best_bids = bid_prices(order_depth)
 
             i = 0
             while i < self.trade_count and len(best_bids) > i and avg_ask - best_bids[i] <= self.min_req_price_difference:
@@ -218,27 +141,13 @@ class CrossStrategy(Strategy):
 
                 i += 1
 
-    def calculate_prices(self, days: int) -> Tuple[int, int]:
-        # Calculate the average bid and ask price for the last days
-
-        relevant_bids = []
-        for bids in self.old_bids[-days:]:
-            relevant_bids.extend([(value, bids[value]) for value in bids])
-        relevant_asks = []
-        for asks in self.old_asks[-days:]:
-            relevant_asks.extend([(value, asks[value]) for value in asks])
-
-        avg_bid = np.average([x[0] for x in relevant_bids], weights=[x[1] for x in relevant_bids])
-        avg_ask = np.average([x[0] for x in relevant_asks], weights=[x[1] for x in relevant_asks])
-
-        return avg_bid, avg_ask
+    def calculate_prices(self) -> Tuple[Optional[float], Optional[float]]:
+        # Average bid and ask price, weighted by volume, over the last strategy_start_day books
+        return self.bid_window.average(), self.ask_window.average()
 
     def cache_prices(self, order_depth: OrderDepth):
-        sell_orders = order_depth.sell_orders
-        buy_orders = order_depth.buy_orders
-
-        self.old_asks.append(sell_orders)
-        self.old_bids.append(buy_orders)
+        self.ask_window.push(order_depth.sell_orders)
+        self.bid_window.push(order_depth.buy_orders)
 
 
 class DiffStrategy(Strategy):
@@ -246,6 +155,10 @@ class DiffStrategy(Strategy):
         super().__init__(name, max_pos)
         self.derivative_resolution: int = derivative_resolution
         self.diff_thresh: int = diff_thresh
+        # VWAP of the latest tick that had trades
+        self.trade_vwap = WeightedPriceWindow(1)
+        # Only the last derivative_resolution means are ever compared
+        self.cached_means = deque(maxlen=derivative_resolution)
 
     def trade(self, trading_state: TradingState, orders: list):
         order_depth: OrderDepth = trading_state.order_depths[self.name]
@@ -262,28 +175,14 @@ class DiffStrategy(Strategy):
 
     def get_price_difference(self) -> float:
         # Calculate the difference between the current mean and the mean from
-        # self.derivative_resolution days ago
-        if len(self.cached_means) < self.derivative_resolution + 1:
-            old_mean = self.cached_means[0]
-        else:
-            old_mean = self.cached_means[-self.derivative_resolution]
-        diff = self.cached_means[-1] - old_mean
-        return diff
+        # self.derivative_resolution days ago (the oldest one kept, or the first one while
+        # fewer have been seen)
+        return self.cached_means[-1] - self.cached_means[0]
 
     def calculate_means(self):
-        #
-        if len(self.cached_prices) == 0:
-            self.cached_means.append(0)
-
-        else:
-            relevant_prices = []
-            for day_prices in self.cached_prices[max(-len(self.cached_prices), -1):]:
-                for price in day_prices:
-                    relevant_prices.append(price)
-            prices = np.array([x[1] for x in relevant_prices])
-            quantities = np.abs(np.array([x[0] for x in relevant_prices]))
-
-            self.cached_means.append(np.average(prices, weights=quantities))
+        # The trade VWAP of the latest tick with trades, 0 until there has been one
+        mean = self.trade_vwap.average()
+        self.cached_means.append(mean if mean is not None else 0)
 
     def cache_purchased_prices(self, state: TradingState) -> None:
         # Caches prices of bought and sold products
@@ -294,8 +193,7 @@ class DiffStrategy(Strategy):
         prod_trades: List[Trade] = own_trades.get(self.name, []) + market_trades.get(self.name, [])
 
         if len(prod_trades) > 0:
-            prices = [(trade.quantity, trade.price) for trade in prod_trades]
-            self.cached_prices.append(prices)
+            self.trade_vwap.push_trades(prod_trades)
 
 
 class NullStrategy(Strategy):
@@ -318,7 +216,7 @@ class FixedStrategy(Strategy):
             #
             # self.cache_prices(order_depth)
             # Sort all the available sell orders by their price
-            best_asks = sorted(order_depth.sell_orders.keys())
+            best_asks = ask_prices(order_depth)
 
             # Check if the lowest ask (sell order) is lower than the above defined fair value
             i = 0
@@ -329,7 +227,7 @@ class FixedStrategy(Strategy):
                 self.buy_product(best_asks, i, order_depth, orders)
                 i += 1
         if len(order_depth.buy_orders) != 0:
-            best_bids = sorted(order_depth.buy_orders.keys(), reverse=True)
+            best_bids = bid_prices(order_depth)
 
             i = 0
             while i < self.trade_count and best_bids[i] > self.amethyst_price:
@@ -412,7 +310,7 @@ class TimeBasedStrategy(CrossStrategy):
 
             # start buying berries if they start being ripe
             if len(order_depth.sell_orders) != 0:
-                best_asks = sorted(order_depth.sell_orders.keys())
+                best_asks = ask_prices(order_depth)
 
                 i = 0
                 while i < self.trade_count and len(best_asks) > i:
@@ -498,27 +396,6 @@ class DivingGear(DiffStrategy):
 """
 Conversin
 """
-class ConversionObservation:
-
-    def __init__(self, bidPrice: float, askPrice: float, transportFees: float, exportTariff: float, importTariff: float, sunlight: float, humidity: float):
-        self.bidPrice = bidPrice
-        self.askPrice = askPrice
-        self.transportFees = transportFees
-        self.exportTariff = exportTariff
-        self.importTariff = importTariff
-        self.sunlight = sunlight
-        self.humidity = humidity
-
-class Observation:
-
-    def __init__(self, plainValueObservations: Dict[Product, int], conversionObservations: Dict[Product, ConversionObservation]) -> None:
-        self.plainValueObservations = plainValueObservations
-        self.conversionObservations = conversionObservations
-        
-    def __str__(self) -> str:
-        return "(plainValueObservations: " + jsonpickle.encode(self.plainValueObservations) + ", conversionObservations: " + jsonpickle.encode(self.conversionObservations) + ")"
-
-
 class OrchidStrategy(Strategy):
     """
     * import only
@@ -587,8 +464,8 @@ class OrchidStrategy(Strategy):
         return obs.transportFees + obs.exportTariff + obs.importTariff
 
     def execute_trading_logic(self, order_depth, orders, expected_price):
-        best_asks = sorted(order_depth.sell_orders.keys())
-        best_bids = sorted(order_depth.buy_orders.keys(), reverse=True)
+        best_asks = ask_prices(order_depth)
+        best_bids = bid_prices(order_depth)
 
         # Decision to buy
         for ask_price in best_asks:
@@ -684,6 +561,10 @@ class GiftBaskets(BasketStrategy):
         super().__init__("GIFT_BASKET", max_pos=60, premium=375)
 
 
+# Timestamps run from 0 to 999900 in steps of 100
+TICKS_PER_DAY = 10000
+
+
 class BlackScholesStrategy(Strategy):
     def __init__(self, name: str, strike_price: float, maturity: int, max_pos: int):
         super().__init__(name, max_pos)
@@ -691,35 +572,36 @@ class BlackScholesStrategy(Strategy):
         self.maturity = maturity  # days until expiration
         self.r = 0.0  # risk-free rate, assume 0 for simplicity
         self.sigma = 0.2  # initial volatility estimate, adjust as needed
+        # EWMA variance of the underlying's tick returns, fed one mid price per tick. The
+        # RiskMetrics 0.94 is a daily decay; with 10000 ticks a day 0.99 remembers ~100 ticks
+        self.volatility = VolatilityEstimator(lambda_=0.99)
 
-    def update_volatility(self, historical_prices):
-        # Use Exponentially Weighted Moving Average (EWMA) to update volatility
-        lambda_ = 0.94  # Decay factor for EWMA, common choice in finance
-        if len(historical_prices) > 1:
-            returns = np.diff(historical_prices) / historical_prices[:-1]
-            var = np.var(returns)
-            if hasattr(self, 'sigma'):
-                self.sigma = np.sqrt(lambda_ * self.sigma**2 + (1 - lambda_) * var) * np.sqrt(252)
-            else:
-                self.sigma = np.sqrt(var) * np.sqrt(252)
+    def update_volatility(self, order_depth: OrderDepth):
+        # One sided books carry no mid price and are skipped
+        if not order_depth.buy_orders or not order_depth.sell_orders:
+            return
+        best_bid = max(order_depth.buy_orders.keys())
+        best_ask = min(order_depth.sell_orders.keys())
+        self.volatility.update((best_bid + best_ask) / 2, best_bid, best_ask)
+        tick_std = self.volatility.ewma.std()
+        if tick_std:
+            # Per tick -> per year, the unit of T in black_scholes_price
+            self.sigma = tick_std * np.sqrt(TICKS_PER_DAY * 365)
 
     def black_scholes_price(self, current_price, time_to_maturity, premium = 0):
         if current_price <= 0 or self.strike_price <= 0 or time_to_maturity <= 0 or self.sigma <= 0:
             return 0
-        S = current_price
-        K = self.strike_price
         T = time_to_maturity / 365
-        r = self.r
-        sigma = self.sigma
-        d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-        d2 = d1 - sigma * np.sqrt(T)
-        call_price = (S * cdf(d1) - (K + premium) * np.exp(-r * T) * cdf(d2))
-        
+        option = black_scholes_call(current_price, self.strike_price, T, self.sigma, self.r)
+        # The premium is paid on exercise like the strike
+        call_price = option.price - premium * np.exp(-self.r * T) * option.exercise_probability
+
         return call_price
 
     def trade(self, trading_state: TradingState, orders: list):
-        current_price = self.get_current_price(trading_state, self.name.replace('_COUPON', ''))
-        self.update_volatility(self.cached_prices)
+        underlying = self.name.replace('_COUPON', '')
+        current_price = self.get_current_price(trading_state, underlying)
+        self.update_volatility(trading_state.order_depths[underlying])
         premium = self.calculate_dynamic_premium(self.maturity)  # Calculate premium dynamically
         theoretical_price = self.black_scholes_price(current_price, self.maturity, premium)
         order_depth = trading_state.order_depths[self.name]
@@ -733,8 +615,8 @@ class BlackScholesStrategy(Strategy):
 
     def execute_trading_logic(self, order_depth, orders, theoretical_price, current_price):
         # Sort the asks and bids so that we can access the best prices
-        best_asks = sorted(order_depth.sell_orders.keys())
-        best_bids = sorted(order_depth.buy_orders.keys(), reverse=True)
+        best_asks = ask_prices(order_depth)
+        best_bids = bid_prices(order_depth)
 
         # Go through the asks and determine if we should buy
         for i, ask_price in enumerate(best_asks):
@@ -768,36 +650,132 @@ Logger
 import json
 from typing import Any
 
+class LogEncoder(ProsperityEncoder):
+    def default(self, o):
+        # NumPy scalars (from the strategies' arrays or the simulator's frames) as the Python number they hold
+        if isinstance(o, np.generic):
+            return o.item()
+        return super().default(o)
+
+
 class Logger:
-    def __init__(self) -> None:
+    def __init__(self, delta_mode: bool = False, keyframe_interval: int = 100) -> None:
         self.logs = ""
         self.max_log_length = 3750
+        # Listings never change during a run, so their JSON is built once per symbol set
+        self.listings_key = None
+        self.listings_json = "[]"
+
+        # In delta mode listings and full books are only written every keyframe_interval ticks
+        # (keyframes); the ticks in between carry just the price levels that changed, with
+        # volume 0 for removed levels and null for a removed symbol. Lines get a sixth
+        # element: 1 for keyframes, 0 for deltas.
+        # simulator.replay rebuilds the full books. The jmerle visualizer needs delta_mode off.
+        self.delta_mode = delta_mode
+        self.keyframe_interval = keyframe_interval
+        self.ticks_since_keyframe = 0
+        self.previous_books: dict[Symbol, tuple[dict[int, int], dict[int, int]]] = {}
 
     def print(self, *objects: Any, sep: str = " ", end: str = "\n") -> None:
         self.logs += sep.join(map(str, objects)) + end
 
     def flush(self, state: TradingState, orders: dict[Symbol, list[Order]], conversions: int, trader_data: str) -> None:
-        base_length = len(self.to_json([
-            self.compress_state(state, ""),
-            self.compress_orders(orders),
-            conversions,
-            "",
-            "",
-        ]))
-
-        # We truncate state.traderData, trader_data, and self.logs to the same max. length to fit the log limit
-        max_item_length = (self.max_log_length - base_length) // 3
-
-        print(self.to_json([
-            self.compress_state(state, self.truncate(state.traderData, max_item_length)),
-            self.compress_orders(orders),
-            conversions,
-            self.truncate(trader_data, max_item_length),
-            self.truncate(self.logs, max_item_length),
-        ]))
-
+        print(self.serialize(state, orders, conversions, trader_data))
         self.logs = ""
 
+    def serialize(self, state: TradingState, orders: dict[Symbol, list[Order]], conversions: int, trader_data: str) -> str:
+        # Everything except the three free-form strings is serialized exactly once; the strings
+        # are then fitted into whatever is left of the budget and spliced in
+        if self.delta_mode:
+            keyframe = self.ticks_since_keyframe % self.keyframe_interval == 0
+            self.ticks_since_keyframe += 1
+            listings_json = self.listings_to_json(state.listings) if keyframe else "null"
+            order_depths = self.compress_order_depths(state.order_depths) if keyframe \
+                else self.diff_order_depths(state.order_depths)
+            self.remember_order_depths(state.order_depths)
+            frame_json = ",1" if keyframe else ",0"
+        else:
+            listings_json = self.listings_to_json(state.listings)
+            order_depths = self.compress_order_depths(state.order_depths)
+            frame_json = ""
+
+        state_json = ",".join([
+            listings_json,
+            self.to_json(order_depths),
+            self.to_json(self.compress_trades(state.own_trades)),
+            self.to_json(self.compress_trades(state.market_trades)),
+            self.to_json(state.position),
+            self.to_json(self.compress_observations(state.observations)),
+        ])
+        orders_json = self.to_json(self.compress_orders(orders))
+        conversions_json = self.to_json(conversions)
+        timestamp_json = self.to_json(state.timestamp)
+
+        # Brackets and commas of [[ts,td,...],orders,conversions,td,logs]
+        base_length = len(timestamp_json) + len(state_json) + len(orders_json) + len(conversions_json) \
+            + len(frame_json) + 11
+        state_trader_data, trader_data, logs = self.fit_strings(
+            [state.traderData, trader_data, self.logs], self.max_log_length - base_length)
+
+        return "".join([
+            "[[", timestamp_json, ",", state_trader_data, ",", state_json, "],",
+            orders_json, ",", conversions_json, ",", trader_data, ",", logs, frame_json, "]",
+        ])
+
+    def start_keyframe(self) -> None:
+        """Forces the next flush to write a keyframe, e.g. after the trader was rebuilt"""
+        self.ticks_since_keyframe = 0
+
+    def diff_order_depths(self, order_depths: dict[Symbol, OrderDepth]) -> dict[Symbol, list[Any]]:
+        # A symbol that left the order depths is written as null, a new one always (even
+        # with an empty book) so the decoder knows it is there
+        compressed = {symbol: None for symbol in self.previous_books if symbol not in order_depths}
+        for symbol, order_depth in order_depths.items():
+            old_buy_orders, old_sell_orders = self.previous_books.get(symbol, ({}, {}))
+            buy_changes = self.diff_levels(old_buy_orders, order_depth.buy_orders)
+            sell_changes = self.diff_levels(old_sell_orders, order_depth.sell_orders)
+            if buy_changes or sell_changes or symbol not in self.previous_books:
+                compressed[symbol] = [buy_changes, sell_changes]
+
+        return compressed
+
+    def diff_levels(self, old: dict[int, int], new: dict[int, int]) -> dict[int, int]:
+        changes = {price: volume for price, volume in new.items() if old.get(price) != volume}
+        for price in old:
+            if price not in new:
+                changes[price] = 0
+        return changes
+
+    def remember_order_depths(self, order_depths: dict[Symbol, OrderDepth]) -> None:
+        self.previous_books = {
+            symbol: (dict(order_depth.buy_orders), dict(order_depth.sell_orders))
+            for symbol, order_depth in order_depths.items()
+        }
+
+    def fit_strings(self, values: list[str], budget: int) -> list[str]:
+        # Returns the JSON encoded values, truncated so that together they take at most budget
+        # characters. Short values leave their unused share to the longer ones.
+        encoded = [json.dumps(value) for value in values]
+        result = list(encoded)
+        remaining = max(budget, 0)
+        order = sorted(range(len(values)), key=lambda i: len(encoded[i]))
+        for position, i in enumerate(order):
+            share = remaining // (len(order) - position)
+            if len(encoded[i]) > share:
+                result[i] = self.truncate_encoded(values[i], share)
+            remaining -= len(result[i])
+        return result
+
+    def truncate_encoded(self, value: str, max_length: int) -> str:
+        # Escaping can make the encoded string longer than the raw one, so shrink until it fits
+        max_length = max(max_length, 2)
+        cut = max_length - 2
+        encoded = json.dumps(self.truncate(value, cut))
+        while len(encoded) > max_length and cut > 0:
+            cut -= len(encoded) - max_length
+            encoded = json.dumps(self.truncate(value, max(cut, 0)))
+        return encoded
+
     def compress_state(self, state: TradingState, trader_data: str) -> list[Any]:
         return [
             state.timestamp,
@@ -810,10 +788,21 @@ class Logger:
             self.compress_observations(state.observations),
         ]
 
+    def listings_to_json(self, listings: dict[Symbol, Listing]) -> str:
+        key = tuple(listings.keys())
+        if key != self.listings_key:
+            self.listings_key = key
+            self.listings_json = self.to_json(self.compress_listings(listings))
+        return self.listings_json
+
     def compress_listings(self, listings: dict[Symbol, Listing]) -> list[list[Any]]:
         compressed = []
         for listing in listings.values():
-            compressed.append([listing["symbol"], listing["product"], listing["denomination"]])
+            # The exchange sends listings as plain dicts, the local simulator as Listing objects
+            if isinstance(listing, dict):
+                compressed.append([listing["symbol"], listing["product"], listing["denomination"]])
+            else:
+                compressed.append([listing.symbol, listing.product, listing.denomination])
 
         return compressed
 
@@ -840,6 +829,10 @@ class Logger:
         return compressed
 
     def compress_observations(self, observations: Observation) -> list[Any]:
+        if isinstance(observations, dict):
+            # The local simulator only passes plain value observations
+            return [observations, {}]
+
         conversion_observations = {}
         for product, observation in observations.conversionObservations.items():
             conversion_observations[product] = [
@@ -863,13 +856,13 @@ class Logger:
         return compressed
 
     def to_json(self, value: Any) -> str:
-        return json.dumps(value, cls=ProsperityEncoder, separators=(",", ":"))
+        return json.dumps(value, cls=LogEncoder, separators=(",", ":"))
 
     def truncate(self, value: str, max_length: int) -> str:
         if len(value) <= max_length:
             return value
 
-        return value[:max_length - 3] + "..."
+        return value[:max(max_length - 3, 0)] + "..."
 
 logger = Logger()
 
@@ -0,0 +1,97 @@
+import gzip
+import json
+import queue
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+
+# Captures everything the trader prints (its own print calls and the Logger.flush line) per
+# tick, so that backtests don't spend their time writing to the terminal. The last
+# buffer_size ticks are kept in memory; with spill_path set, every tick is also appended to
+# a gzip compressed JSON lines file by a background thread.
+
+class _TickWriter:
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text: str) -> int:
+        self.parts.append(text)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+class SpillWriter(threading.Thread):
+    def __init__(self, path: str):
+        super().__init__(daemon=True)
+        self.path = path
+        self.queue: queue.Queue = queue.Queue()
+        self.start()
+
+    def run(self) -> None:
+        with gzip.open(self.path, "wt") as f:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                timestamp, output = item
+                f.write(json.dumps({"timestamp": timestamp, "output": output}) + "\n")
+
+    def put(self, timestamp: int, output: str) -> None:
+        self.queue.put((int(timestamp), output))
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self.join()
+
+
+class OutputCapture:
+    def __init__(self, buffer_size: int = 1000, spill_path: Optional[str] = None):
+        self.buffer_size = buffer_size
+        self.buffer: "OrderedDict[int, str]" = OrderedDict()
+        self.spill = SpillWriter(spill_path) if spill_path is not None else None
+
+    @contextmanager
+    def tick(self, timestamp: int):
+        writer = _TickWriter()
+        stdout = sys.stdout
+        sys.stdout = writer
+        try:
+            yield
+        finally:
+            sys.stdout = stdout
+            self.store(timestamp, "".join(writer.parts))
+
+    def store(self, timestamp: int, output: str) -> None:
+        if not output:
+            return
+        self.buffer[timestamp] = output
+        if len(self.buffer) > self.buffer_size:
+            self.buffer.popitem(last=False)
+        if self.spill is not None:
+            self.spill.put(timestamp, output)
+
+    def get(self, timestamp: int) -> Optional[str]:
+        """Output of the given tick, None if it printed nothing or was evicted from the buffer"""
+        return self.buffer.get(timestamp)
+
+    def last(self, ticks: int = 10) -> str:
+        timestamps = list(self.buffer)[-ticks:]
+        return "".join(f"--- {timestamp} ---\n{self.buffer[timestamp]}" for timestamp in timestamps)
+
+    def close(self) -> None:
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+
+
+def read_spill(path: str):
+    """Yields (timestamp, output) pairs from a file written with spill_path"""
+    with gzip.open(path, "rt") as f:
+        for line in f:
+            item = json.loads(line)
+            yield item["timestamp"], item["output"]
@@ -0,0 +1,290 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from main import ConversionObservation, Listing, Observation, Order, Trade, TradingState
+
+from common.order_book import SortedOrderDepth
+from common.products import ProductRegistry
+
+from .capture import OutputCapture
+from .simulator import Simulator
+
+
+# Replays the [state, orders, conversions, traderData, logs] lines printed by Logger.flush.
+# The platform returns them inside the "lambdaLog" field of every sandbox log entry, so a
+# downloaded submission log can be turned back into the exact TradingStates our bot saw.
+
+class ReplayTick:
+    def __init__(self, state: TradingState, orders: Dict[str, List[Order]], conversions: Any, trader_data: str,
+                 logs: str):
+        self.state = state
+        self.orders = orders
+        self.conversions = conversions
+        self.trader_data = trader_data
+        self.logs = logs
+
+
+def decode_trades(compressed: List[list]) -> Dict[str, List[Trade]]:
+    trades = {}
+    for symbol, price, quantity, buyer, seller, timestamp in compressed:
+        trades.setdefault(symbol, []).append(Trade(symbol, price, quantity, buyer, seller, timestamp))
+    return trades
+
+
+def decode_order_depths(compressed: Dict[str, list]) -> Dict[str, SortedOrderDepth]:
+    # JSON turned the integer price keys into strings
+    order_depths = {}
+    for symbol, (buy_orders, sell_orders) in compressed.items():
+        order_depths[symbol] = SortedOrderDepth(
+            buy_orders={int(price): volume for price, volume in buy_orders.items()},
+            sell_orders={int(price): volume for price, volume in sell_orders.items()},
+        )
+    return order_depths
+
+
+def decode_observations(compressed: list) -> Observation:
+    plain_value_observations, conversion_observations = compressed
+    return Observation(
+        plain_value_observations,
+        {product: ConversionObservation(*values) for product, values in conversion_observations.items()},
+    )
+
+
+def decode_state(compressed: list) -> TradingState:
+    timestamp, trader_data, listings, order_depths, own_trades, market_trades, position, observations = compressed
+    return TradingState(
+        traderData=trader_data,
+        timestamp=timestamp,
+        listings={symbol: Listing(symbol, product, denomination) for symbol, product, denomination in listings},
+        order_depths=decode_order_depths(order_depths),
+        own_trades=decode_trades(own_trades),
+        market_trades=decode_trades(market_trades),
+        position=position,
+        observations=decode_observations(observations),
+    )
+
+
+def decode_orders(compressed: List[list]) -> Dict[str, List[Order]]:
+    orders = {}
+    for symbol, price, quantity in compressed:
+        orders.setdefault(symbol, []).append(Order(symbol, price, quantity))
+    return orders
+
+
+class DeltaBookDecoder:
+    """
+    Rebuilds full listings and books from lines written by Logger(delta_mode=True):
+    keyframes carry everything, the lines in between only the changed price levels
+    (volume 0 meaning the level was removed, null that the symbol left the order depths).
+    """
+
+    def __init__(self):
+        self.listings = None
+        self.books: Dict[str, list] = {}
+
+    def apply(self, compressed_state: list, keyframe: bool) -> Optional[list]:
+        # Returns the state with full listings and order depths, None while no keyframe was seen
+        if keyframe:
+            self.listings = compressed_state[2]
+            self.books = {symbol: [dict(buy_orders), dict(sell_orders)]
+                          for symbol, (buy_orders, sell_orders) in compressed_state[3].items()}
+        elif self.listings is None:
+            return None
+        else:
+            for symbol, changes in compressed_state[3].items():
+                if changes is None:
+                    # The symbol left the order depths
+                    self.books.pop(symbol, None)
+                    continue
+                book = self.books.setdefault(symbol, [{}, {}])
+                for side, side_changes in zip(book, changes):
+                    for price, volume in side_changes.items():
+                        if volume == 0:
+                            side.pop(price, None)
+                        else:
+                            side[price] = volume
+
+        full_state = list(compressed_state)
+        full_state[2] = self.listings
+        full_state[3] = {symbol: [dict(buy_orders), dict(sell_orders)]
+                         for symbol, (buy_orders, sell_orders) in self.books.items()}
+        return full_state
+
+
+def decode_line(line: str, delta_decoder: Optional[DeltaBookDecoder] = None) -> Optional[ReplayTick]:
+    payload = json.loads(line)
+    state, orders, conversions, trader_data, logs = payload[:5]
+    if len(payload) == 6:
+        if delta_decoder is None:
+            raise ValueError("Delta encoded log line needs a DeltaBookDecoder")
+        state = delta_decoder.apply(state, payload[5] == 1)
+        if state is None:
+            # The log starts in the middle of a delta run, wait for the next keyframe
+            return None
+    return ReplayTick(decode_state(state), decode_orders(orders), conversions, trader_data, logs)
+
+
+def iter_flush_lines(text: str):
+    # Either a full submission log ("Sandbox logs:" followed by concatenated JSON objects)
+    # or a plain file holding one Logger.flush line per tick
+    if text.startswith("Sandbox logs:"):
+        section = text[len("Sandbox logs:"):].split("Activities log:", 1)[0]
+        decoder = json.JSONDecoder()
+        position = 0
+        while True:
+            position = section.find("{", position)
+            if position == -1:
+                break
+            entry, position = decoder.raw_decode(section, position)
+            for line in entry.get("lambdaLog", "").split("\n"):
+                if line.startswith("[["):
+                    yield line
+    else:
+        for line in text.split("\n"):
+            if line.startswith("[["):
+                yield line
+
+
+def read_log(path: str) -> List[ReplayTick]:
+    with open(path) as f:
+        text = f.read()
+    delta_decoder = DeltaBookDecoder()
+    ticks = [decode_line(line, delta_decoder) for line in iter_flush_lines(text)]
+    return [tick for tick in ticks if tick is not None]
+
+
+def ticks_to_frames(ticks: List[ReplayTick]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # Rebuilds prices/trades frames in the csv layout so the Simulator's fill and pnl logic
+    # can run on the replayed books unchanged
+    price_rows = []
+    trade_rows = []
+    for tick in ticks:
+        state = tick.state
+        for symbol, order_depth in state.order_depths.items():
+            row = {"day": 0, "timestamp": state.timestamp, "product": symbol}
+            bids = sorted(order_depth.buy_orders.items(), reverse=True)
+            asks = sorted(order_depth.sell_orders.items())
+            for i in [1, 2, 3]:
+                bid = bids[i - 1] if len(bids) >= i else (float("nan"), float("nan"))
+                ask = asks[i - 1] if len(asks) >= i else (float("nan"), float("nan"))
+                row[f"bid_price_{i}"], row[f"bid_volume_{i}"] = bid
+                row[f"ask_price_{i}"], row[f"ask_volume_{i}"] = ask[0], -ask[1]
+            row["mid_price"] = (bids[0][0] + asks[0][0]) / 2 if bids and asks else float("nan")
+            row["profit_and_loss"] = 0.0
+            price_rows.append(row)
+
+        for trades in state.market_trades.values():
+            for trade in trades:
+                trade_rows.append({
+                    "timestamp": trade.timestamp, "buyer": trade.buyer, "seller": trade.seller,
+                    "symbol": trade.symbol, "currency": "SEASHELLS", "price": trade.price, "quantity": trade.quantity,
+                })
+
+    trade_columns = ["timestamp", "buyer", "seller", "symbol", "currency", "price", "quantity"]
+    return pd.DataFrame(price_rows), pd.DataFrame(trade_rows, columns=trade_columns)
+
+
+class ReplaySimulator(Simulator):
+    """
+    Runs a trader against the market states recorded in a live submission log.
+    Own trades and positions come from the local fill simulation, everything else
+    (books, market trades, observations, traderData) is exactly what the exchange sent.
+    """
+
+    def __init__(self, log_path: str, trader, capture_output: bool = True, output_buffer_size: int = 1000,
+                 output_spill_path: str = None):
+        self.prices_round_name = log_path
+        self.trades_round_name = log_path
+        self.ticks = read_log(log_path)
+        self.ticks_by_timestamp = {tick.state.timestamp: tick for tick in self.ticks}
+        self.prices, self.trades = ticks_to_frames(self.ticks)
+        self.trader = trader
+        self.products = ProductRegistry(sorted(self.prices["product"].unique()))
+
+        self.position = {}
+        self.position_history = {}
+        for symbol in self.prices["product"].unique():
+            self.position[symbol] = 0
+            self.position_history[symbol] = [0]
+        self.money_profit = {}
+        self.total_pnl = {}
+        self.simulated_fills: Dict[int, Dict[str, List[Trade]]] = {}
+        self.last_timestamp = None
+        self.output = OutputCapture(output_buffer_size, output_spill_path) if capture_output else None
+
+    def load_trading_sate(self, timestamp, own_trades=None):
+        recorded = self.ticks_by_timestamp[timestamp].state
+        if own_trades:
+            # Fills of the orders placed on the previous tick
+            self.simulated_fills[self.last_timestamp] = own_trades
+        self.last_timestamp = timestamp
+        return TradingState(
+            recorded.traderData,
+            timestamp=timestamp,
+            listings=recorded.listings,
+            order_depths=recorded.order_depths,
+            own_trades=own_trades if own_trades is not None else {},
+            market_trades=recorded.market_trades,
+            position=self.position,
+            observations=recorded.observations,
+            product_ids=self.products.ids,
+        )
+
+    def live_fills(self) -> Dict[int, List[Trade]]:
+        # The exchange keeps reporting the last own trades until new ones happen, so only the
+        # trades stamped with the directly preceding tick are new
+        fills = {}
+        previous_timestamp = None
+        for tick in self.ticks:
+            for trades in tick.state.own_trades.values():
+                for trade in trades:
+                    if trade.timestamp == previous_timestamp:
+                        fills.setdefault(previous_timestamp, []).append(trade)
+            previous_timestamp = tick.state.timestamp
+        return fills
+
+    def fill_diff(self) -> pd.DataFrame:
+        """
+        Per order tick and product, the quantity and cash of the fills reported by the live
+        exchange next to the ones produced by the local simulation, limited to rows that differ.
+        """
+        simulated = {timestamp: [trade for trades in own_trades.values() for trade in trades]
+                     for timestamp, own_trades in self.simulated_fills.items()}
+        rows = {}
+        for source, fills in (("live", self.live_fills()), ("sim", simulated)):
+            for timestamp, trades in fills.items():
+                for trade in trades:
+                    # Sells show up with the SUBMISSION as seller on the exchange and as negative
+                    # quantities in the local simulation
+                    quantity = -abs(trade.quantity) if trade.seller == "SUBMISSION" else trade.quantity
+                    row = rows.setdefault((timestamp, trade.symbol), {
+                        "timestamp": timestamp, "symbol": trade.symbol,
+                        "live_quantity": 0, "live_cash": 0, "sim_quantity": 0, "sim_cash": 0,
+                    })
+                    row[f"{source}_quantity"] += quantity
+                    row[f"{source}_cash"] -= quantity * trade.price
+
+        diff = pd.DataFrame(list(rows.values()),
+                            columns=["timestamp", "symbol", "live_quantity", "live_cash", "sim_quantity", "sim_cash"])
+        mismatch = (diff["live_quantity"] != diff["sim_quantity"]) | (diff["live_cash"] != diff["sim_cash"])
+        return diff[mismatch].sort_values(["timestamp", "symbol"]).reset_index(drop=True)
+
+
+def main():
+    import importlib
+    import sys
+
+    trader_file = importlib.import_module(sys.argv[1])
+    sim = ReplaySimulator(sys.argv[2], trader_file.Trader())
+    sim.simulate()
+
+    diff = sim.fill_diff()
+    print(f"{len(diff)} tick(s) where local fills differ from the live ones")
+    if len(diff) > 0:
+        print(diff.to_string(max_rows=50))
+
+
+if __name__ == "__main__":
+    main()
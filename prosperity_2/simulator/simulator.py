@@ -1,15 +1,30 @@
 import datetime
 import os
+import sys
 from datetime import datetime
 
 import pandas as pd
 from matplotlib import pyplot as plt
 from tqdm import tqdm
 
-from main import Listing, OrderDepth, Trade, TradingState
+from main import Listing, Trade, TradingState
+
+from .capture import OutputCapture
+
+# The data tooling shared with the Prosperity 3 rounds lives in <repo>/common
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.loader import load  # noqa: E402
+from common.order_book import BookArrays, OrderDepthView  # noqa: E402
+from common.products import ProductRegistry  # noqa: E402
+from common.storage import PartitionedStore  # noqa: E402
 
 
 # Instructions on how to run this simulator can be found in the readme file
+def _python(value):
+    # NumPy scalar -> the Python int/float/str it holds
+    return value.item() if hasattr(value, "item") else value
+
+
 def process_trades(last_prices, last_result):
     # Computes if any trades have been performed and outputs a dictionary containing a list of traded products
 
@@ -47,7 +62,7 @@ def process_trades(last_prices, last_result):
                         bought_quantity = min(quantity, product_row[f"ask_volume_{i}"].item())
                         own_trades[product].append(
                             Trade(product, product_row[f"ask_price_{i}"].item(), bought_quantity, "", "",
-                                  product_row["timestamp"]))
+                                  product_row["timestamp"].item()))
                         # Update remaining quantity
                         quantity = max(0, product_row[f"ask_volume_{i}"].item() + quantity)
 
@@ -55,12 +70,14 @@ def process_trades(last_prices, last_result):
 
 
 class Simulator:
-    def __init__(self, prices_round: str, trades_round: str, trader):
+    def __init__(self, prices_round: str, trades_round: str, trader, capture_output: bool = True,
+                 output_buffer_size: int = 1000, output_spill_path: str = None):
         self.prices_round_name = prices_round
         self.trades_round_name = trades_round
-        self.prices: pd.DataFrame = pd.read_csv(prices_round, delimiter=";")
-        self.trades: pd.DataFrame = pd.read_csv(trades_round, delimiter=";")
+        self.prices: pd.DataFrame = load(prices_round).to_frame()
+        self.trades: pd.DataFrame = load(trades_round).to_frame()
         self.trader = trader
+        self.index_books()
 
         self.position = {}
         self.position_history = {}
@@ -71,6 +88,23 @@ class Simulator:
         self.money_profit = {}
         self.total_pnl = {}
 
+        # Trader prints are kept per tick instead of going to the terminal, see self.output.get(timestamp)
+        self.output = OutputCapture(output_buffer_size, output_spill_path) if capture_output else None
+
+    def index_books(self):
+        # Order depths are views over these arrays, the dicts are only built if a strategy reads them
+        self.books = BookArrays.from_columns(self.prices)
+        self.book_products = self.prices["product"].astype(str).tolist()
+        self.book_rows = self.prices.groupby("timestamp", sort=False).indices
+        # Passed to the trader as state.product_ids, the same ids on every tick
+        self.products = ProductRegistry(sorted(set(self.book_products)))
+
+    def run_trader(self, state, timestamp):
+        if self.output is None:
+            return self.trader.run(state)
+        with self.output.tick(timestamp):
+            return self.trader.run(state)
+
     def simulate(self):
         # Simulates one round of the trading game
 
@@ -81,7 +115,7 @@ class Simulator:
             # Get the next state
 
             state = self.load_trading_sate(timestamp, own_trades)
-            last_result = self.trader.run(state)
+            last_result = self.run_trader(state, timestamp)
             # Simulate the market
             last_prices = self.prices[self.prices['timestamp'] == timestamp]
             own_trades = process_trades(last_prices, last_result)
@@ -89,6 +123,9 @@ class Simulator:
             self.process_position_profit(own_trades)
             self.calculate_pnl(last_prices)
 
+        if self.output is not None:
+            self.output.close()
+
         self.plot_pnl()
         self.plot_positions()
 
@@ -101,50 +138,36 @@ class Simulator:
     def load_trading_sate(self, timestamp, own_trades=None):
         # Creates a new trading state given the timestamp and the own trades that have been performed in the last round
 
-        curr_prices = self.prices[self.prices['timestamp'] == timestamp]
+        # The frames hold compact NumPy dtypes (int32 timestamps, float32 prices); the state gets
+        # plain Python values like on the exchange, so the trader can json.dumps whatever it reads
+        timestamp = int(timestamp)
+
         listings = {}
         order_depths = {}
         market_trades = {}
         observations = {}
 
-        for prod_row in curr_prices.iterrows():
+        for row in self.book_rows[timestamp]:
             # Get the symbol of the product
-            product = prod_row[1]["product"]
+            product = self.book_products[row]
             # Set observations if sighted dolphins
             if product == "DOLPHIN_SIGHTINGS":
-                observations[product] = prod_row[1]["mid_price"]
+                observations[product] = self.prices["mid_price"].iat[row].item()
                 continue
             # Add product to the listing
             listings[product] = Listing(symbol=product, product=product, denomination="SEASHELLS")
-
             # Add buy and sell order to the order depths
-            buy_orders = {}
-            if prod_row[1]["bid_price_1"] == prod_row[1]["bid_price_1"]:
-                buy_orders[prod_row[1]["bid_price_1"]] = prod_row[1]["bid_volume_1"]
-            if prod_row[1]["bid_price_2"] == prod_row[1]["bid_price_2"]:
-                buy_orders[prod_row[1]["bid_price_2"]] = prod_row[1]["bid_volume_2"]
-            if prod_row[1]["bid_price_3"] == prod_row[1]["bid_price_3"]:
-                buy_orders[prod_row[1]["bid_price_3"]] = prod_row[1]["bid_volume_3"]
-
-            sell_orders = {}
-            if prod_row[1]["ask_price_1"] == prod_row[1]["ask_price_1"]:
-                sell_orders[prod_row[1]["ask_price_1"]] = -prod_row[1]["ask_volume_1"]
-            if prod_row[1]["ask_price_2"] == prod_row[1]["ask_price_2"]:
-                sell_orders[prod_row[1]["ask_price_2"]] = -prod_row[1]["ask_volume_2"]
-            if prod_row[1]["ask_price_3"] == prod_row[1]["ask_price_3"]:
-                sell_orders[prod_row[1]["ask_price_3"]] = -prod_row[1]["ask_volume_3"]
-
-            order_depths[product] = OrderDepth(buy_orders=buy_orders, sell_orders=sell_orders)
+            order_depths[product] = OrderDepthView(self.books, row)
 
         # Update traded products
         traded_products = self.trades[self.trades["timestamp"] == timestamp]
-        for traded_row in traded_products.iterrows():
-            product = traded_row[1]['symbol']
+        for traded_row in traded_products.to_dict("records"):
+            product = traded_row['symbol']
             if product not in market_trades.keys():
                 market_trades[product] = []
             market_trades[product].append(
-                Trade(traded_row[1]['symbol'], traded_row[1]['price'], traded_row[1]['quantity'],
-                      traded_row[1]['buyer'], traded_row[1]['seller'], timestamp))
+                Trade(product, _python(traded_row['price']), _python(traded_row['quantity']),
+                      _python(traded_row['buyer']), _python(traded_row['seller']), timestamp))
 
         state = TradingState(
             "{}",
@@ -154,7 +177,8 @@ class Simulator:
             own_trades=own_trades,
             market_trades=market_trades,
             observations=observations,
-            position=self.position
+            position=self.position,
+            product_ids=self.products.ids,
         )
 
         return state
@@ -217,11 +241,12 @@ class Simulator:
         if not os.path.exists("simulator/results/midprices"):
             os.makedirs("simulator/results/midprices")
 
-        unique_prods = self.prices["product"].unique()
-        for product in unique_prods:
-            prod_rows = self.prices[self.prices["product"] == product]
-            # print(prod_rows["mid_price"].reset_index())
-            plt.plot(prod_rows["mid_price"].reset_index(drop=True))
+        # Read each product's partition instead of filtering the whole prices frame
+        store = PartitionedStore()
+        entry = store.catalog.entry_for(self.prices_round_name)
+        for product in store.products(entry):
+            prod_rows = store.query(entry, product, columns=["mid_price"])
+            plt.plot(prod_rows["mid_price"])
             plt.savefig(f"simulator/results/midprices/mid_price_{product}_{self.prices_round_name.replace('/', '_')}.jpg")
             plt.clf()
 
@@ -1,5 +1,6 @@
 from typing import Dict, List
 from round_1.datamodel import OrderDepth, TradingState, Order
+from common.indicators import ExponentialAverages
 import numpy as np
 
 #ISTRUZIONI PER IL BACKTESTING
@@ -14,7 +15,9 @@ class Trader:
         self.position_limit = {"RAINFOREST_RESIN": 50, "KELP": 50}
         self.last_mid_price = {'RAINFOREST_RESIN': 10000, 'KELP': 4935}
         self.mid_price = {'RAINFOREST_RESIN': {0: 10000}, 'KELP': {0: 4900}}
-        self.ema_price = {'RAINFOREST_RESIN': {0: 10000}, 'KELP': {0: 4900}}
+        self.ema_span = 50
+        # Solo il valore corrente dell'EMA: aggiornarla costa O(1) per tick
+        self.ema_price = {'RAINFOREST_RESIN': ExponentialAverages([self.ema_span], 10000), 'KELP': ExponentialAverages([self.ema_span], 4900)}
     def run(self, state: TradingState) -> Dict[str, List[Order]]:
         """
         Only method required. It takes all buy and sell orders for all symbols as an input,
@@ -26,7 +29,6 @@ class Trader:
         for product in state.order_depths.keys():
             # Check if the current product is the 'RAINFOREST_RESIN' product, only then run the order logic
             if product == 'RAINFOREST_RESIN':
-                N = 50
                 
                 
                 # Retrieve the Order Depth containing all the market BUY and SELL orders for RAINFOREST_RESIN
@@ -37,9 +39,8 @@ class Trader:
                 best_bid = max(order_depth.buy_orders.keys())
                 best_bid_volume = order_depth.buy_orders[best_bid]
                 mid_price = (best_ask * np.abs(best_ask_volume) + best_bid * np.abs(best_bid_volume)) / (np.abs(best_ask_volume) + np.abs(best_bid_volume))
-                ema_price = (2 * mid_price + (N - 1) * self.ema_price[product][list(self.ema_price[product].keys())[-1]]) / (N + 1)
+                ema_price = self.ema_price[product].update(mid_price)[0]
                 self.mid_price[product][state.timestamp] = mid_price
-                self.ema_price[product][state.timestamp] = ema_price
                 # print(f'{state.timestamp}: The mid price of {product} is {self.mid_price[product][state.timestamp]}.')
                 if product in state.position.keys():
                     current_position = state.position[product]
@@ -1,109 +1,13 @@
-import json
-from typing import Dict, List
-from json import JSONEncoder
-import jsonpickle
-
-Time = int
-Symbol = str
-Product = str
-Position = int
-UserId = str
-ObservationValue = int
-
-
-class Listing:
-
-    def __init__(self, symbol: Symbol, product: Product, denomination: Product):
-        self.symbol = symbol
-        self.product = product
-        self.denomination = denomination
-        
-                 
-class ConversionObservation:
-
-    def __init__(self, bidPrice: float, askPrice: float, transportFees: float, exportTariff: float, importTariff: float, sunlight: float, humidity: float):
-        self.bidPrice = bidPrice
-        self.askPrice = askPrice
-        self.transportFees = transportFees
-        self.exportTariff = exportTariff
-        self.importTariff = importTariff
-        self.sunlight = sunlight
-        self.humidity = humidity
-        
-
-class Observation:
-
-    def __init__(self, plainValueObservations: Dict[Product, ObservationValue], conversionObservations: Dict[Product, ConversionObservation]) -> None:
-        self.plainValueObservations = plainValueObservations
-        self.conversionObservations = conversionObservations
-        
-    def __str__(self) -> str:
-        return "(plainValueObservations: " + jsonpickle.encode(self.plainValueObservations) + ", conversionObservations: " + jsonpickle.encode(self.conversionObservations) + ")"
-     
-
-class Order:
-
-    def __init__(self, symbol: Symbol, price: int, quantity: int) -> None:
-        self.symbol = symbol
-        self.price = price
-        self.quantity = quantity
-
-    def __str__(self) -> str:
-        return "(" + self.symbol + ", " + str(self.price) + ", " + str(self.quantity) + ")"
-
-    def __repr__(self) -> str:
-        return "(" + self.symbol + ", " + str(self.price) + ", " + str(self.quantity) + ")"
-    
-
-class OrderDepth: # Key: price, Value: quantity
-
-    def __init__(self):
-        self.buy_orders: Dict[int, int] = {}
-        self.sell_orders: Dict[int, int] = {}
-
-
-class Trade:
-
-    def __init__(self, symbol: Symbol, price: int, quantity: int, buyer: UserId=None, seller: UserId=None, timestamp: int=0) -> None:
-        self.symbol = symbol
-        self.price: int = price
-        self.quantity: int = quantity
-        self.buyer = buyer
-        self.seller = seller
-        self.timestamp = timestamp
-
-    def __str__(self) -> str:
-        return "(" + self.symbol + ", " + self.buyer + " << " + self.seller + ", " + str(self.price) + ", " + str(self.quantity) + ", " + str(self.timestamp) + ")"
-
-    def __repr__(self) -> str:
-        return "(" + self.symbol + ", " + self.buyer + " << " + self.seller + ", " + str(self.price) + ", " + str(self.quantity) + ", " + str(self.timestamp) + ")"
-
-
-class TradingState(object):
-
-    def __init__(self,
-                 traderData: str,
-                 timestamp: Time,
-                 listings: Dict[Symbol, Listing],
-                 order_depths: Dict[Symbol, OrderDepth],
-                 own_trades: Dict[Symbol, List[Trade]],
-                 market_trades: Dict[Symbol, List[Trade]],
-                 position: Dict[Product, Position],
-                 observations: Observation):
-        self.traderData = traderData
-        self.timestamp = timestamp
-        self.listings = listings
-        self.order_depths = order_depths
-        self.own_trades = own_trades
-        self.market_trades = market_trades
-        self.position = position
-        self.observations = observations
-        
-    def toJSON(self):
-        return json.dumps(self, default=lambda o: o.__dict__, sort_keys=True)
-
-    
-class ProsperityEncoder(JSONEncoder):
-
-        def default(self, o):
-            return o.__dict__
\ No newline at end of file
+# The datamodel is shared by all rounds and lives in <repo>/common/datamodel.py
+# (a submission is made self-contained with `python -m common.bundle <trader>.py`)
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# This round's copy of the datamodel had the Prosperity 2 (sunlight, humidity) ConversionObservation
+from common.datamodel import (  # noqa: E402,F401
+    Time, Symbol, Product, Position, UserId, ObservationValue, Listing,
+    LegacyConversionObservation as ConversionObservation, Observation, Order, OrderDepth, Trade,
+    OwnTrade, TradingState, ProsperityEncoder,
+)
@@ -1,6 +1,11 @@
 from typing import Dict, List
 from datamodel import OrderDepth, TradingState, Order
 import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.indicators import ExponentialAverages  # noqa: E402
 
 #ISTRUZIONI PER IL BACKTESTING
 #Per fare il backtesting, bisogna installare il modulo prosperity3bt tramite il comando "pip install -U prosperity3bt" sul terminale
@@ -13,7 +18,9 @@ class Trader:
         self.position_limit = {"RAINFOREST_RESIN": 50, "KELP": 50, "SQUID_INK": 50}
         self.last_mid_price = {'RAINFOREST_RESIN': 10000, 'KELP': 2020, 'SQUID_INK': 10000}
         self.mid_price = {'RAINFOREST_RESIN': {0: 10000}, 'KELP': {0: 2010}, 'SQUID_INK': {0: 10000}}
-        self.ema_price = {'RAINFOREST_RESIN': {0: 10000}, 'KELP': {0: 2010}, 'SQUID_INK': {0: 10000}}
+        self.ema_span = 50
+        # Solo il valore corrente dell'EMA: aggiornarla costa O(1) per tick
+        self.ema_price = {'RAINFOREST_RESIN': ExponentialAverages([self.ema_span], 10000), 'KELP': ExponentialAverages([self.ema_span], 2010), 'SQUID_INK': ExponentialAverages([self.ema_span], 10000)}
     def run(self, state: TradingState) -> Dict[str, List[Order]]:
         """
         Only method required. It takes all buy and sell orders for all symbols as an input,
@@ -25,7 +32,6 @@ class Trader:
         for product in state.order_depths.keys():
             # Check if the current product is the 'RAINFOREST_RESIN' product, only then run the order logic
             if product == 'RAINFOREST_RESIN':
-                N = 50
                 
                 
                 # Retrieve the Order Depth containing all the market BUY and SELL orders for RAINFOREST_RESIN
@@ -36,9 +42,8 @@ class Trader:
                 best_bid = max(order_depth.buy_orders.keys())
                 best_bid_volume = order_depth.buy_orders[best_bid]
                 mid_price = (best_ask * np.abs(best_ask_volume) + best_bid * np.abs(best_bid_volume)) / (np.abs(best_ask_volume) + np.abs(best_bid_volume))
-                ema_price = (2 * mid_price + (N - 1) * self.ema_price[product][list(self.ema_price[product].keys())[-1]]) / (N + 1)
+                ema_price = self.ema_price[product].update(mid_price)[0]
                 self.mid_price[product][state.timestamp] = mid_price
-                self.ema_price[product][state.timestamp] = ema_price
                 # print(f'{state.timestamp}: The mid price of {product} is {self.mid_price[product][state.timestamp]}.')
                 if product in state.position.keys():
                     current_position = state.position[product]
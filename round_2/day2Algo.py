@@ -1,6 +1,11 @@
 from typing import Dict, List
 from datamodel import OrderDepth, TradingState, Order
 import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.baskets import BASKETS, BasketSpread, synthetic_quote  # noqa: E402
 
 # --- Strategia per i BASKET (PICNIC_BASKET1 e PICNIC_BASKET2) ---
 # Ogni basket è una combinazione di prodotti:
@@ -36,6 +41,9 @@ class Trader:
         self.last_mid_price = {product: {} for product in self.position_limit}
         # Prezzo medio esponenziale (EMA) per ogni prodotto
         self.ema_price = {product: {} for product in self.position_limit}
+        # Statistiche mobili del premio di ogni cesto sul suo valore equo
+        self.basket_window = 100
+        self.basket_spreads = {basket: BasketSpread(self.basket_window) for basket in BASKETS}
 
     def run(self, state: TradingState) -> Dict[str, List[Order]]:
         result = {}
@@ -70,20 +78,30 @@ class Trader:
             legal_sell = max(-(self.position_limit[basket] + current_position), -self.position_limit[basket])
             orders = []
 
-            if order_depth.buy_orders:
-                # Se il miglior bid è significativamente maggiore del valore equo, vendi
+            # Premio del cesto sul suo valore equo: media, std e z-score mobili
+            spread = self.basket_spreads[basket]
+            if order_depth.buy_orders and order_depth.sell_orders:
+                basket_mid = (max(order_depth.buy_orders.keys()) + min(order_depth.sell_orders.keys())) / 2
+                spread.update(basket_mid - fv)
+            premium = spread.mean()
+            # Prezzi eseguibili del cesto sintetico: quanto si incassa vendendo (bid) o si
+            # paga comprando (ask) tutte le componenti, livello per livello del book
+            synthetic_bid, synthetic_ask = synthetic_quote(state.order_depths, BASKETS[basket])
+
+            if order_depth.buy_orders and synthetic_ask is not None:
+                # Se il miglior bid supera il costo delle componenti più il premio medio, vendi
                 best_bid = max(order_depth.buy_orders.keys())
-                if best_bid > fv + 2:
+                if best_bid > synthetic_ask + premium + 2:
                     volume = min(-order_depth.buy_orders[best_bid], legal_sell)
-                    print(f"SELL {basket} @ {best_bid}, FV={fv}")
+                    print(f"SELL {basket} @ {best_bid}, FV={fv}, synthetic ask={synthetic_ask}, z={spread.zscore()}")
                     orders.append(Order(basket, best_bid, volume))
 
-            if order_depth.sell_orders:
-                # Se il miglior ask è significativamente minore del valore equo, compra
+            if order_depth.sell_orders and synthetic_bid is not None:
+                # Se il miglior ask è sotto il ricavo delle componenti più il premio medio, compra
                 best_ask = min(order_depth.sell_orders.keys())
-                if best_ask < fv - 2:
+                if best_ask < synthetic_bid + premium - 2:
                     volume = min(-order_depth.sell_orders[best_ask], legal_buy)
-                    print(f"BUY {basket} @ {best_ask}, FV={fv}")
+                    print(f"BUY {basket} @ {best_ask}, FV={fv}, synthetic bid={synthetic_bid}, z={spread.zscore()}")
                     orders.append(Order(basket, best_ask, volume))
 
             result[basket] = orders
@@ -1,6 +1,11 @@
 from typing import Dict, List
 from datamodel import OrderDepth, TradingState, Order
 import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.indicators import RollingWindow  # noqa: E402
 
 class Trader:
     def __init__(self):
@@ -10,7 +15,9 @@ class Trader:
         
         self.assets = list(self.position_limit.keys())
         self.sma = {product: 0.0 for product in self.position_limit}
-        self.price_action = {product: [] for product in self.position_limit}
+        self.sma_window = 50
+        # Ultimi sma_window prezzi con somma corrente: la SMA costa O(1) per tick
+        self.price_action = {product: RollingWindow(self.sma_window) for product in self.position_limit}
 
     def run(self, state: TradingState) -> Dict[str, List[Order]]:
 
@@ -32,14 +39,14 @@ class Trader:
                 avg_sell_price = sum([np.abs(order_depth.sell_orders[i]) * i for i in order_depth.sell_orders.keys()])/sum([np.abs(order_depth.sell_orders[i]) for i in order_depth.sell_orders.keys()])
                 price = (avg_sell_price + avg_buy_price)/2
                 # Price action
-                self.price_action[product].append(price)
+                self.price_action[product].update(price)
 
                 orders = []
-                sma_window = 50
+                sma_window = self.sma_window
 
                 # SMA computation
-                if len(self.price_action[product]) > sma_window: 
-                    sma_value = np.mean(self.price_action[product][-sma_window:])             
+                if self.price_action[product].seen > sma_window:
+                    sma_value = self.price_action[product].mean()
                     self.sma[product] = sma_value                                    
 
                     # Position limits
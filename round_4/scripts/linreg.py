@@ -1,11 +1,21 @@
 from typing import Dict, List
 from datamodel import Order, OrderDepth, TradingState
 import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.regression import (  # noqa: E402
+    MACARONS_SEEDED_COEFFICIENTS, macarons_features, macarons_model, macarons_target,
+)
 
 class Trader:
     def __init__(self):
         self.product = 'MAGNIFICENT_MACARONS'
         self.position_limit = {self.product: 75}
+        # Fair value model updated every tick with recursive least squares, starting from
+        # the coefficients fitted on the round 4 observations
+        self.macarons_model = macarons_model(MACARONS_SEEDED_COEFFICIENTS)
 
     def run(self, state: TradingState) -> Dict[str, List[Order]]:
         result = {}
@@ -21,23 +31,15 @@ class Trader:
         best_ask = min(order_depth.sell_orders)
         mid_price = (best_bid + best_ask) / 2
 
-        sugar = state.observations.plainValueObservations.get("SUGAR", 100)
-        sunlight = state.observations.plainValueObservations.get("SUNLIGHT", 200)
-        sunlight_sq = sunlight ** 2
-        transport = state.observations.plainValueObservations.get("TRANSPORT_FEE", 1)
-        export_tariff = state.observations.plainValueObservations.get("EXPORT_TARIFF", 1)
-        import_tariff = state.observations.plainValueObservations.get("IMPORT_TARIFF", 1)
-
-        # Calculate fair value from regression model
-        fair_value = (
-            -173.43 +
-            (-75.37 * transport) +
-            (-61.49 * export_tariff) +
-            (-34.63 * import_tariff) +
-            (7.59 * sugar) +
-            (-4.76 * sunlight) +
-            (0.0336 * sunlight_sq)
-        )
+        conv_obs = state.observations.conversionObservations.get(product)
+        if conv_obs is None:
+            result[product] = []
+            return result, 1, ""
+
+        # Calculate fair value from regression model, then let the model learn this tick's conversion mid
+        macarons_x = macarons_features(conv_obs)
+        fair_value = self.macarons_model.predict(macarons_x)
+        self.macarons_model.update(macarons_x, macarons_target(conv_obs))
 
         position = state.position.get(product, 0)
         limit = self.position_limit[product]
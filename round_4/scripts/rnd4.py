@@ -1,6 +1,14 @@
 from typing import Dict, List
 from datamodel import OrderDepth, TradingState, Order
 import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.indicators import RollingWindow  # noqa: E402
+from common.regression import (  # noqa: E402
+    MACARONS_SEEDED_COEFFICIENTS, macarons_features, macarons_model, macarons_target,
+)
 
 # --- Strategia per i BASKET (PICNIC_BASKET1 e PICNIC_BASKET2) ---
 # Ogni basket è una combinazione di prodotti:
@@ -71,7 +79,12 @@ class Trader:
         self.ema_price = {product: {} for product in self.position_limit}
         self.assets = list(self.position_limit.keys())
         self.sma = {product: 0.0 for product in self.position_limit}
-        self.price_action = {product: [] for product in self.position_limit}
+        self.sma_window = 50
+        # Ultimi sma_window prezzi con somma corrente: la SMA costa O(1) per tick
+        self.price_action = {product: RollingWindow(self.sma_window) for product in self.position_limit}
+        # Regressione del fair value dei MAGNIFICENT_MACARONS, aggiornata a ogni tick con i
+        # minimi quadrati ricorsivi partendo dai coefficienti stimati sui dati del round 4
+        self.macarons_model = macarons_model(MACARONS_SEEDED_COEFFICIENTS)
 
     def run(self, state: TradingState) -> Dict[str, List[Order]]:
         result = {}
@@ -170,14 +183,14 @@ class Trader:
                 avg_sell_price = sum([np.abs(order_depth.sell_orders[i]) * i for i in order_depth.sell_orders.keys()])/sum([np.abs(order_depth.sell_orders[i]) for i in order_depth.sell_orders.keys()])
                 price = (avg_sell_price + avg_buy_price)/2
                 # Price action
-                self.price_action[product].append(price)
+                self.price_action[product].update(price)
 
                 orders = []
-                sma_window = 50
+                sma_window = self.sma_window
 
                 # SMA computation
-                if len(self.price_action[product]) > sma_window: 
-                    sma_value = np.mean(self.price_action[product][-sma_window:])             
+                if self.price_action[product].seen > sma_window:
+                    sma_value = self.price_action[product].mean()
                     self.sma[product] = sma_value                                    
 
                     # Position limits
@@ -208,23 +221,15 @@ class Trader:
             best_bid = max(order_depth.buy_orders)
             best_ask = min(order_depth.sell_orders)
             mid_price = (best_bid + best_ask) / 2
-            sugar = state.observations.plainValueObservations.get("SUGAR", 100)
-            sunlight = state.observations.plainValueObservations.get("SUNLIGHT", 200)
-            sunlight_sq = sunlight ** 2
-            transport = state.observations.plainValueObservations.get("TRANSPORT_FEE", 1)
-            export_tariff = state.observations.plainValueObservations.get("EXPORT_TARIFF", 1)
-            import_tariff = state.observations.plainValueObservations.get("IMPORT_TARIFF", 1)
-
-            # Calculate fair value from regression model
-            fair_value = (
-                -173.43 +
-                (-75.37 * transport) +
-                (-61.49 * export_tariff) +
-                (-34.63 * import_tariff) +
-                (7.59 * sugar) +
-                (-4.76 * sunlight) +
-                (0.0336 * sunlight_sq)
-            )
+            conv_obs = state.observations.conversionObservations.get(product)
+            if conv_obs is None:
+                result[product] = []
+                continue
+
+            # Calculate fair value from regression model, then let the model learn this tick's conversion mid
+            macarons_x = macarons_features(conv_obs)
+            fair_value = self.macarons_model.predict(macarons_x)
+            self.macarons_model.update(macarons_x, macarons_target(conv_obs))
 
             position = state.position.get(product, 0)
             limit = self.position_limit[product]
@@ -1,6 +1,20 @@
 from typing import Dict, List
 from datamodel import OrderDepth, TradingState, Order
 import numpy as np
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from common.baskets import BASKETS, BasketSpread, synthetic_quote  # noqa: E402
+from common.features import ASK_VWAP, BID_VWAP, MID_PRICE, state_features  # noqa: E402
+from common.indicators import RollingWindow  # noqa: E402
+from common.options import ImpliedVolatilitySolver, black_scholes  # noqa: E402
+from common.products import ProductRegistry  # noqa: E402
+from common.regression import (  # noqa: E402
+    MACARONS_SEEDED_COEFFICIENTS, macarons_features, macarons_model, macarons_target,
+)
+from common.smile import SmileFit, log_moneyness  # noqa: E402
+from common.state_codec import StateCodec  # noqa: E402
 
 # --- Strategia per i BASKET (PICNIC_BASKET1 e PICNIC_BASKET2) ---
 # Ogni basket è una combinazione di prodotti:
@@ -71,21 +85,99 @@ class Trader:
         self.ema_price = {product: {} for product in self.position_limit}
         self.assets = list(self.position_limit.keys())
         self.sma = {product: 0.0 for product in self.position_limit}
-        self.price_action = {product: [] for product in self.position_limit}
+        self.sma_window = 50
+        # Ultimi sma_window prezzi con somma corrente: la SMA costa O(1) per tick
+        self.price_action = {product: RollingWindow(self.sma_window) for product in self.position_limit}
+        self.sma_products = ['SQUID_INK', 'CROISSANTS', 'JAMS', 'DJEMBES']
+        self.basket_components = ['CROISSANTS', 'JAMS', 'DJEMBES']
+        # Statistiche mobili del premio di ogni cesto sul suo valore equo
+        self.basket_window = 100
+        self.basket_spreads = {basket: BasketSpread(self.basket_window) for basket in BASKETS}
+        # Regressione del fair value dei MAGNIFICENT_MACARONS, aggiornata a ogni tick con i
+        # minimi quadrati ricorsivi partendo dai coefficienti stimati sui dati del round 4
+        self.macarons_model = macarons_model(MACARONS_SEEDED_COEFFICIENTS)
+        # Giorni alla scadenza dei voucher all'inizio del round (7 al round 1, uno in meno a round)
+        self.voucher_days_to_expiry = 3
+        # Volatilità implicita di ogni strike, risolta a ogni tick partendo da quella del tick precedente
+        self.voucher_iv = ImpliedVolatilitySolver(list(self.voucher_strikes.values()))
+        # Smile delle volatilità implicite (quadratica nella log-moneyness), aggiornato a ogni
+        # tick; uno strike il cui scarto dallo smile vale più di smile_threshold è fuori prezzo
+        self.voucher_smile = SmileFit(forgetting=0.9)
+        self.smile_threshold = 2
+        # Stato salvato in traderData: le finestre della SMA, l'ultimo prezzo medio delle
+        # componenti dei cesti, il premio dei cesti, il modello dei macarons, le volatilità
+        # implicite dei voucher e il loro smile
+        self.state_codec = StateCodec(
+            [field for product in self.sma_products
+             for field in self.price_action[product].codec_fields(f"price_action_{product}")]
+            + [(f"last_mid_{product}", "f8", 1) for product in self.basket_components]
+            + [field for basket in BASKETS for field in self.basket_spreads[basket].codec_fields(f"premium_{basket}")]
+            + self.macarons_model.codec_fields("macarons_model")
+            + self.voucher_iv.codec_fields("voucher_iv")
+            + self.voucher_smile.codec_fields("voucher_smile")
+        )
+        # Ultimo traderData scritto da questa istanza: se l'exchange lo ripassa invariato lo
+        # stato in memoria è già quello giusto e non serve decodificarlo
+        self.saved_trader_data = None
         self.CSI = 45  # Indice di luce solare critico empiricamente scoperto
+        # Id dei prodotti, cioè le righe della matrice delle feature
+        self.products = None
+
+    def load_state(self, trader_data: str):
+        # Ripristina lo stato della chiamata precedente (se traderData è vuoto o scritto
+        # da un'altra versione del trader si riparte da zero). Se è quello che questa istanza
+        # ha scritto al tick precedente lo stato è già in memoria; dopo un tick finito con
+        # un'eccezione saved_trader_data è None e lo stato viene ricaricato
+        saved, self.saved_trader_data = self.saved_trader_data, None
+        if saved is not None and trader_data == saved:
+            return
+        values = self.state_codec.decode(trader_data)
+        if values is None:
+            return
+        for product in self.sma_products:
+            self.price_action[product].restore_state(values, f"price_action_{product}")
+        for product in self.basket_components:
+            last_mid = values[f"last_mid_{product}"]
+            if not np.isnan(last_mid):
+                self.last_mid_price[product] = last_mid
+        for basket in BASKETS:
+            self.basket_spreads[basket].restore_state(values, f"premium_{basket}")
+        self.macarons_model.restore_state(values, "macarons_model")
+        self.voucher_iv.restore_state(values, "voucher_iv")
+        self.voucher_smile.restore_state(values, "voucher_smile")
+
+    def save_state(self) -> str:
+        values = {}
+        for product in self.sma_products:
+            values.update(self.price_action[product].state(f"price_action_{product}"))
+        for product in self.basket_components:
+            # {} finché non è stato visto nessun prezzo
+            if not isinstance(self.last_mid_price[product], dict):
+                values[f"last_mid_{product}"] = self.last_mid_price[product]
+        for basket in BASKETS:
+            values.update(self.basket_spreads[basket].state(f"premium_{basket}"))
+        values.update(self.macarons_model.state("macarons_model"))
+        values.update(self.voucher_iv.state("voucher_iv"))
+        values.update(self.voucher_smile.state("voucher_smile"))
+        self.saved_trader_data = self.state_codec.encode(values)
+        return self.saved_trader_data
 
     def run(self, state: TradingState) -> Dict[str, List[Order]]:
+        self.load_state(state.traderData)
         result = {}
 
+        # Mid, VWAP dei due lati, spread, ... di tutti i prodotti in un colpo solo, una
+        # riga per prodotto (vedi common/features.py)
+        self.products = ProductRegistry.from_state(state, self.products)
+        features = state_features(state, self.products)
+
         # --- Step 1: Calcolo dei prezzi medi dei prodotti base ---
         mid_prices = {}
         for product in ['CROISSANTS', 'JAMS', 'DJEMBES']:
             order_depth = state.order_depths[product]
             if order_depth.buy_orders and order_depth.sell_orders:
                 # Calcolo del prezzo medio come media tra il miglior bid e il miglior ask
-                best_ask = min(order_depth.sell_orders.keys())
-                best_bid = max(order_depth.buy_orders.keys())
-                mid_price = (best_ask + best_bid) / 2
+                mid_price = float(features[self.products[product], MID_PRICE])
                 mid_prices[product] = mid_price
                 self.last_mid_price[product] = mid_price
             else:
@@ -108,20 +200,30 @@ class Trader:
             legal_sell = max(-(self.position_limit[basket] + current_position), -self.position_limit[basket])
             orders = []
 
-            if order_depth.buy_orders:
-                # Se il miglior bid è significativamente maggiore del valore equo, vendi
+            # Premio del cesto sul suo valore equo: media, std e z-score mobili
+            spread = self.basket_spreads[basket]
+            if order_depth.buy_orders and order_depth.sell_orders:
+                basket_mid = (max(order_depth.buy_orders.keys()) + min(order_depth.sell_orders.keys())) / 2
+                spread.update(basket_mid - fv)
+            premium = spread.mean()
+            # Prezzi eseguibili del cesto sintetico: quanto si incassa vendendo (bid) o si
+            # paga comprando (ask) tutte le componenti, livello per livello del book
+            synthetic_bid, synthetic_ask = synthetic_quote(state.order_depths, BASKETS[basket])
+
+            if order_depth.buy_orders and synthetic_ask is not None:
+                # Se il miglior bid supera il costo delle componenti più il premio medio, vendi
                 best_bid = max(order_depth.buy_orders.keys())
-                if best_bid > fv + 4:
+                if best_bid > synthetic_ask + premium + 4:
                     volume = min(-order_depth.buy_orders[best_bid], legal_sell)
-                    print(f"SELL {basket} @ {best_bid}, FV={fv}")
+                    print(f"SELL {basket} @ {best_bid}, FV={fv}, synthetic ask={synthetic_ask}, z={spread.zscore()}")
                     orders.append(Order(basket, best_bid, volume))
 
-            if order_depth.sell_orders:
-                # Se il miglior ask è significativamente minore del valore equo, compra
+            if order_depth.sell_orders and synthetic_bid is not None:
+                # Se il miglior ask è sotto il ricavo delle componenti più il premio medio, compra
                 best_ask = min(order_depth.sell_orders.keys())
-                if best_ask < fv - 4:
+                if best_ask < synthetic_bid + premium - 4:
                     volume = min(-order_depth.sell_orders[best_ask], legal_buy)
-                    print(f"BUY {basket} @ {best_ask}, FV={fv}")
+                    print(f"BUY {basket} @ {best_ask}, FV={fv}, synthetic bid={synthetic_bid}, z={spread.zscore()}")
                     orders.append(Order(basket, best_ask, volume))
 
                 result[basket] = orders
@@ -167,18 +269,18 @@ class Trader:
                 best_bid_volume = order_depth.buy_orders[best_bid]
                 best_ask_volume = order_depth.sell_orders[best_ask]
                 # Avg price computation
-                avg_buy_price = sum([np.abs(order_depth.buy_orders[i]) * i for i in order_depth.buy_orders.keys()]) / sum([np.abs(order_depth.buy_orders[i]) for i in order_depth.buy_orders.keys()])
-                avg_sell_price = sum([np.abs(order_depth.sell_orders[i]) * i for i in order_depth.sell_orders.keys()])/sum([np.abs(order_depth.sell_orders[i]) for i in order_depth.sell_orders.keys()])
-                price = (avg_sell_price + avg_buy_price)/2
+                avg_buy_price = features[self.products[product], BID_VWAP]
+                avg_sell_price = features[self.products[product], ASK_VWAP]
+                price = float(avg_sell_price + avg_buy_price)/2
                 # Price action
-                self.price_action[product].append(price)
+                self.price_action[product].update(price)
 
                 orders = []
-                sma_window = 50
+                sma_window = self.sma_window
 
                 # SMA computation
-                if len(self.price_action[product]) > sma_window: 
-                    sma_value = np.mean(self.price_action[product][-sma_window:])             
+                if self.price_action[product].seen > sma_window:
+                    sma_value = self.price_action[product].mean()
                     self.sma[product] = sma_value                                    
 
                     # Position limits
@@ -210,22 +312,12 @@ class Trader:
             # Retrieve sunlight and fundamental indicators
             conv_obs = state.observations.conversionObservations[product]
             sunlight = getattr(conv_obs, "sunlightIndex")
-            sugar = state.observations.plainValueObservations.get("SUGAR", 100)
-            sunlight_sq = sunlight ** 2
-            transport = state.observations.plainValueObservations.get("TRANSPORT_FEE", 1)
-            export_tariff = state.observations.plainValueObservations.get("EXPORT_TARIFF", 1)
-            import_tariff = state.observations.plainValueObservations.get("IMPORT_TARIFF", 1)
-
-            # Calculate fair value from regression model
-            fair_value = (
-                -173.43 +
-                (-75.37 * transport) +
-                (-61.49 * export_tariff) +
-                (-34.63 * import_tariff) +
-                (7.59 * sugar) +
-                (-4.76 * sunlight) +
-                (0.0336 * sunlight_sq)
-            )
+
+            # Fair value dal modello di regressione, poi il modello impara dal mid di
+            # conversione di questo tick, lo stesso target del seed (vedi common/regression.py)
+            macarons_x = macarons_features(conv_obs)
+            fair_value = self.macarons_model.predict(macarons_x)
+            self.macarons_model.update(macarons_x, macarons_target(conv_obs))
 
             position = state.position.get(product, 0)
             limit = self.position_limit[product]
@@ -272,11 +364,29 @@ class Trader:
             best_bid = max(rock_orders.buy_orders.keys())
             best_ask = min(rock_orders.sell_orders.keys())
             rock_mid = (best_bid + best_ask) / 2
+            # Volatilità implicita dei voucher dai loro prezzi medi (NaN dove manca un prezzo
+            # o nessuna volatilità lo spiega)
+            time_to_expiry = (self.voucher_days_to_expiry - state.timestamp / 1_000_000) / 365
+            voucher_mids = [features[self.products[voucher], MID_PRICE] if voucher in self.products else np.nan
+                            for voucher in self.voucher_strikes]
+            voucher_vols = self.voucher_iv.update(voucher_mids, rock_mid, time_to_expiry)
+            # Smile pesato per vega, così le ali poco sensibili alla volatilità non lo spostano;
+            # lo scarto di ogni strike in unità di prezzo è (vol di mercato - vol dello smile) * vega
+            strikes = self.voucher_iv.strikes
+            voucher_moneyness = log_moneyness(strikes, rock_mid, time_to_expiry)
+            voucher_vegas = black_scholes(rock_mid, strikes, time_to_expiry, voucher_vols).vega
+            self.voucher_smile.update(voucher_moneyness, voucher_vols, voucher_vegas)
+            voucher_edges = self.voucher_smile.residuals(voucher_moneyness, voucher_vols) * voucher_vegas
+            for voucher, edge in zip(self.voucher_strikes, voucher_edges):
+                if abs(edge) > self.smile_threshold:
+                    print(f"MISPRICED {voucher}: {edge:+.2f} rispetto allo smile")
         else:
             rock_mid = 10300  #in caso non ci siano informazioni di mercato
+            voucher_vols = np.full(len(self.voucher_strikes), np.nan)
+            voucher_edges = np.full(len(self.voucher_strikes), np.nan)
 
         # Step 2: Iterazione attraverso ogni voucher e applicazione della logica di arbitraggio
-        for voucher, strike in self.voucher_strikes.items():
+        for i, (voucher, strike) in enumerate(self.voucher_strikes.items()):
             orders: List[Order] = []
             order_depth = state.order_depths.get(voucher, OrderDepth())
             position = state.position.get(voucher, 0)
@@ -293,7 +403,7 @@ class Trader:
             if best_ask < intrinsic_value - threshold:
                 buy_volume = min(-ask_volume, legal_buy)
                 if buy_volume > 0:
-                    print(f"BUY {buy_volume} {voucher} @ {best_ask} (IV={intrinsic_value})")
+                    print(f"BUY {buy_volume} {voucher} @ {best_ask} (IV={intrinsic_value}, vol={voucher_vols[i]:.4f}, smile={voucher_edges[i]:+.2f})")
                     orders.append(Order(voucher, best_ask, buy_volume))
 
             if order_depth.buy_orders:
@@ -302,7 +412,7 @@ class Trader:
                 if best_bid > intrinsic_value + threshold:
                     sell_volume = min(bid_volume, legal_sell) 
                     if sell_volume > 0:
-                        print(f"SELL {sell_volume} {voucher} @ {best_bid} (IV={intrinsic_value})")
+                        print(f"SELL {sell_volume} {voucher} @ {best_bid} (IV={intrinsic_value}, vol={voucher_vols[i]:.4f}, smile={voucher_edges[i]:+.2f})")
                         orders.append(Order(voucher, best_bid, -sell_volume))
 
             result[voucher] = orders
@@ -327,6 +437,6 @@ class Trader:
 
 
 
-        traderData = ""
+        traderData = self.save_state()
         conversions = None
         return result, conversions, traderData
\ No newline at end of file
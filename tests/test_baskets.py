@@ -0,0 +1,67 @@
+import random
+import statistics
+
+import pytest
+
+from common.baskets import BASKETS, BasketSpread, sweep, synthetic_capacity, synthetic_mid, synthetic_quote
+from common.datamodel import OrderDepth
+from common.state_codec import StateCodec
+
+
+def books():
+    return {
+        "CROISSANTS": OrderDepth({100: 10, 99: 20}, {101: -5, 102: -30}),
+        "JAMS": OrderDepth({50: 8, 49: 10}, {52: -20}),
+        "DJEMBES": OrderDepth({300: 1, 298: 4}, {303: -2, 305: -1}),
+    }
+
+
+def test_sweep_walks_the_book_best_price_first():
+    levels = {101: -5, 102: -30}
+    assert sweep(levels, [101, 102], 3) == 303
+    assert sweep(levels, [101, 102], 7) == 5 * 101 + 2 * 102
+    assert sweep(levels, [101, 102], 36) is None
+    assert sweep(levels, [101, 102], 0) == 0
+
+
+def test_synthetic_quote_of_one_basket_is_the_top_of_book():
+    depths = books()
+    bid, ask = synthetic_quote(depths, BASKETS["PICNIC_BASKET1"])
+    # 6 croissants fit on the top bid, the 6 at the ask take 5 at 101 and 1 at 102
+    assert bid == 6 * 100 + 3 * 50 + 300
+    assert ask == (5 * 101 + 102) + 3 * 52 + 303
+    assert synthetic_mid({"CROISSANTS": 100.5, "JAMS": 51, "DJEMBES": 301.5}, BASKETS["PICNIC_BASKET1"]) == 1057.5
+
+
+def test_synthetic_quote_of_several_baskets_pays_for_depth():
+    depths = books()
+    bid, ask = synthetic_quote(depths, BASKETS["PICNIC_BASKET1"], baskets=2)
+    assert bid == (10 * 100 + 2 * 99 + 6 * 50 + 300 + 298) / 2
+    assert ask == (5 * 101 + 7 * 102 + 6 * 52 + 2 * 303) / 2
+    # Buying 4 baskets needs 4 djembes, the book offers 3
+    bid, ask = synthetic_quote(depths, BASKETS["PICNIC_BASKET1"], baskets=4)
+    assert bid == (10 * 100 + 14 * 99 + 8 * 50 + 4 * 49 + 300 + 3 * 298) / 4
+    assert ask is None
+    assert synthetic_capacity(depths, BASKETS["PICNIC_BASKET1"]) == (5, 3)
+    assert synthetic_quote({"CROISSANTS": depths["CROISSANTS"]}, BASKETS["PICNIC_BASKET2"]) == (None, None)
+
+
+def test_spread_statistics_and_round_trip():
+    rng = random.Random(0)
+    live = BasketSpread(window=30)
+    assert live.mean() == 0.0 and live.zscore() is None
+    codec = StateCodec(live.codec_fields("premium"))
+    trader_data = ""
+    premiums = []
+    for _ in range(200):
+        premium = rng.gauss(40, 5)
+        premiums.append(premium)
+        rebuilt = BasketSpread(window=30).restore_state(codec.decode(trader_data), "premium")
+        rebuilt.update(premium)
+        live.update(premium)
+        # The restored window recomputes its variance, equal up to rounding
+        assert rebuilt.mean() == live.mean() and rebuilt.zscore() == pytest.approx(live.zscore(), rel=1e-9)
+        trader_data = codec.encode(rebuilt.state("premium"))
+    window = premiums[-30:]
+    assert live.mean() == pytest.approx(statistics.fmean(window))
+    assert live.zscore() == pytest.approx((window[-1] - statistics.fmean(window)) / statistics.pstdev(window))
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from common.bundle import bundle
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Feeds a trader a few hundred random ticks and prints its orders. The trader's module
+# is imported first, so the datamodel classes come from wherever it got them.
+DRIVER = textwrap.dedent("""
+    import contextlib, importlib, io, random, sys
+
+    module = importlib.import_module(sys.argv[1])
+    datamodel = sys.modules.get("datamodel") or sys.modules["common.datamodel"]
+    ConversionObservation = getattr(module, "ConversionObservation", datamodel.ConversionObservation)
+
+    trader = module.Trader()
+    products = sorted(getattr(trader, "position_limit", None) or trader.products)
+    rng = random.Random(1)
+    mids = {product: rng.randint(50, 10000) for product in products}
+    data = ""
+    for t in range(200):
+        depths = {}
+        for product in products:
+            mids[product] += rng.choice([-2, -1, 0, 1, 2])
+            depth = datamodel.OrderDepth()
+            depth.buy_orders = {mids[product] - 1 - i: rng.randint(1, 20) for i in range(rng.randint(1, 3))}
+            depth.sell_orders = {mids[product] + 1 + i: -rng.randint(1, 20) for i in range(rng.randint(1, 3))}
+            depths[product] = depth
+        conversions = {name: ConversionObservation(650, 652, 1, 1, 1, 50, 60)
+                       for name in ("MAGNIFICENT_MACARONS", "ORCHIDS")}
+        observations = datamodel.Observation({}, conversions)
+        own_trades = {product: [datamodel.Trade(product, mids[product], 1, "SUBMISSION", "", t * 100)]
+                      for product in products}
+        state = datamodel.TradingState(data, t * 100, {}, depths, own_trades, {},
+                                       {product: 0 for product in products}, observations)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result, _, data = trader.run(state)
+        print(sorted((product, [(o.price, o.quantity) for o in orders]) for product, orders in result.items()))
+""")
+
+
+def run_trader(directory, module, extra_path=None):
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+    command = [sys.executable, "-c", DRIVER, module]
+    if extra_path is not None:
+        command[2] = f"import sys; sys.path.insert(0, {extra_path!r})\n" + DRIVER
+    completed = subprocess.run(command, cwd=directory, env=env, capture_output=True, text=True, timeout=300)
+    assert completed.returncode == 0, completed.stderr
+    return completed.stdout
+
+
+@pytest.mark.parametrize("trader", ["round_5/day5Algo.py", "prosperity_2/main.py"])
+def test_bundled_trader_runs_on_its_own(tmp_path, trader):
+    path = os.path.join(REPO_ROOT, trader)
+    module = os.path.splitext(os.path.basename(trader))[0]
+    (tmp_path / f"{module}.py").write_text(bundle(path, datamodel=True), encoding="utf-8")
+
+    bundled = run_trader(tmp_path, module)
+    original = run_trader(os.path.dirname(path), module, extra_path=os.path.dirname(path))
+    assert bundled == original
+    assert bundled.count("\n") == 200
+
+
+def test_bundle_leaves_no_repo_imports(tmp_path):
+    source = bundle(os.path.join(REPO_ROOT, "round_5", "day5Algo.py"))
+    assert "sys.path.append" not in source.split("_load_bundled_modules()\n", 2)[-1]
+    assert "('common.options'," in source and "('common.normal'," in source
+    # Without --datamodel the exchange's datamodel module is used
+    assert "('datamodel'," not in source
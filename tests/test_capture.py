@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pytest
+
+from conftest import REPO_ROOT
+
+PROSPERITY_2 = os.path.join(REPO_ROOT, "prosperity_2")
+
+
+@pytest.fixture(scope="module")
+def prosperity_2():
+    sys.path.insert(0, PROSPERITY_2)
+    try:
+        from simulator import capture
+        from simulator.simulator import Simulator
+        yield capture, Simulator
+    finally:
+        sys.path.remove(PROSPERITY_2)
+
+
+def test_keeps_the_last_ticks(prosperity_2):
+    capture, _ = prosperity_2
+    output = capture.OutputCapture(buffer_size=3)
+    for timestamp in range(0, 600, 100):
+        with output.tick(timestamp):
+            print("tick", timestamp)
+            if timestamp == 200:
+                print("twice")
+    with output.tick(600):
+        pass  # Printed nothing: not stored, nothing evicted
+    assert list(output.buffer) == [300, 400, 500]
+    assert output.get(200) is None and output.get(600) is None
+    assert output.get(500) == "tick 500\n"
+    assert output.last(2) == "--- 400 ---\ntick 400\n--- 500 ---\ntick 500\n"
+
+
+def test_stdout_is_restored_when_the_trader_raises(prosperity_2):
+    capture, Simulator = prosperity_2
+
+    class FailingTrader:
+        def run(self, state):
+            print("before the error")
+            raise RuntimeError("bad tick")
+
+    simulator = Simulator.__new__(Simulator)
+    simulator.trader = FailingTrader()
+    simulator.output = capture.OutputCapture()
+
+    stdout = sys.stdout
+    with pytest.raises(RuntimeError):
+        simulator.run_trader(None, 100)
+    assert sys.stdout is stdout
+    # What the tick printed before failing is kept for debugging
+    assert simulator.output.get(100) == "before the error\n"
+
+
+def test_spill_round_trip(prosperity_2, tmp_path):
+    capture, _ = prosperity_2
+    path = str(tmp_path / "output.jsonl.gz")
+    output = capture.OutputCapture(buffer_size=2, spill_path=path)
+    printed = {timestamp: f"tick {timestamp}\n\"quoted\" é\n" for timestamp in range(0, 1000, 100)}
+    for timestamp, text in printed.items():
+        with output.tick(timestamp):
+            print(text, end="")
+    output.close()
+    # Every tick is in the file, also the ones evicted from the buffer
+    assert len(output.buffer) == 2
+    assert list(capture.read_spill(path)) == list(printed.items())
+    output.close()  # A second close does nothing
@@ -0,0 +1,54 @@
+import os
+
+from common import catalog
+from common.catalog import DatasetCatalog
+
+HEADER = "day;timestamp;product;bid_price_1;bid_volume_1;ask_price_1;ask_volume_1;mid_price\n"
+
+
+def write_prices(path, day, timestamps, product="KELP"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(HEADER + "".join(f"{day};{t};{product};9;1;11;1;10.0\n" for t in timestamps))
+
+
+def counting_scans(monkeypatch):
+    scanned = []
+    scan_file = catalog.scan_file
+    monkeypatch.setattr(catalog, "scan_file", lambda root, path: scanned.append(path) or scan_file(root, path))
+    return scanned
+
+
+def test_refresh_scans_only_new_and_changed_files(tmp_path, monkeypatch):
+    write_prices(tmp_path / "round_1" / "prices_round_1_day_0.csv", 0, [0, 100, 200])
+    manifest_path = tmp_path / catalog.MANIFEST_NAME
+    scanned = counting_scans(monkeypatch)
+
+    first = DatasetCatalog.load(tmp_path)
+    assert scanned == ["round_1/prices_round_1_day_0.csv"] and manifest_path.exists()
+    entry = first.resolve("prices", 1, 0)
+    assert (entry.row_count, entry.timestamp_min, entry.timestamp_max, entry.products) == (3, 0, 200, ["KELP"])
+
+    # A new file is picked up, the unchanged one is taken from the manifest
+    write_prices(tmp_path / "round_1" / "prices_round_1_day_1.csv", 1, [0, 100], product="SQUID_INK")
+    scanned.clear()
+    reopened = DatasetCatalog.load(tmp_path)
+    assert scanned == []
+    assert reopened.refresh() == scanned == ["round_1/prices_round_1_day_1.csv"]
+    assert reopened.resolve("prices", 1, 1).products == ["SQUID_INK"]
+    assert reopened.resolve("prices", 1, 0).to_dict() == entry.to_dict()
+
+    # Nothing changed: nothing is read and the manifest is not rewritten
+    written = manifest_path.stat().st_mtime_ns
+    scanned.clear()
+    assert DatasetCatalog.load(tmp_path).refresh() == scanned == []
+    assert manifest_path.stat().st_mtime_ns == written
+
+    # A file rewritten in place (new mtime) is read again, a deleted one leaves the manifest
+    day_0 = tmp_path / "round_1" / "prices_round_1_day_0.csv"
+    write_prices(day_0, 0, [0, 100, 200, 300])
+    os.utime(day_0, ns=(entry.mtime_ns + 10 ** 9, entry.mtime_ns + 10 ** 9))
+    (tmp_path / "round_1" / "prices_round_1_day_1.csv").unlink()
+    refreshed = DatasetCatalog.load(tmp_path)
+    assert refreshed.refresh() == ["round_1/prices_round_1_day_0.csv"]
+    assert list(refreshed.entries) == ["round_1/prices_round_1_day_0.csv"]
+    assert refreshed.resolve("prices", 1, 0).timestamp_max == 300
@@ -0,0 +1,102 @@
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import REPO_ROOT
+
+PROSPERITY_2 = os.path.join(REPO_ROOT, "prosperity_2")
+
+
+@pytest.fixture(scope="module")
+def prosperity_2():
+    sys.path.insert(0, PROSPERITY_2)
+    try:
+        import main
+        from simulator.replay import DeltaBookDecoder, decode_line
+        from simulator.simulator import Simulator
+        yield main, DeltaBookDecoder, decode_line, Simulator
+    finally:
+        sys.path.remove(PROSPERITY_2)
+
+
+def books(state):
+    return {symbol: (dict(depth.buy_orders), dict(depth.sell_orders)) for symbol, depth in state.order_depths.items()}
+
+
+def make_state(main, timestamp, order_books):
+    order_depths = {symbol: main.OrderDepth(dict(buy_orders), dict(sell_orders))
+                    for symbol, (buy_orders, sell_orders) in order_books.items()}
+    listings = {symbol: main.Listing(symbol, symbol, "SEASHELLS") for symbol in order_books}
+    return main.TradingState("", timestamp, listings, order_depths, {}, {}, {}, {})
+
+
+def test_round_3_books_round_trip(prosperity_2, monkeypatch):
+    main, DeltaBookDecoder, decode_line, Simulator = prosperity_2
+    monkeypatch.chdir(PROSPERITY_2)
+    simulator = Simulator("datasets/round-3/prices_round_3_day_0.csv",
+                          "datasets/round-3/trades_round_3_day_0_nn.csv", main.Trader())
+    logger = main.Logger(delta_mode=True, keyframe_interval=20)
+    decoder = DeltaBookDecoder()
+    for tick, timestamp in enumerate(simulator.prices["timestamp"].unique()[:150]):
+        state = simulator.load_trading_sate(timestamp, {})
+        line = logger.serialize(state, {}, 0, "")
+        assert json.loads(line)[5] == (tick % 20 == 0)
+        decoded = decode_line(line, decoder).state
+        assert decoded.timestamp == state.timestamp
+        assert books(decoded) == books(state)
+        assert decoded.listings.keys() == state.listings.keys()
+
+
+def test_changed_and_removed_levels(prosperity_2):
+    main, DeltaBookDecoder, decode_line, _ = prosperity_2
+    logger = main.Logger(delta_mode=True)
+    decoder = DeltaBookDecoder()
+    ticks = [
+        {"A": ({100: 5, 99: 3}, {101: -4, 102: -7})},
+        # 100 changes volume, 99 is removed, 98 is new; the ask side is unchanged
+        {"A": ({100: 2, 98: 6}, {101: -4, 102: -7})},
+        # Nothing changes
+        {"A": ({100: 2, 98: 6}, {101: -4, 102: -7})},
+    ]
+    lines = [logger.serialize(make_state(main, 100 * t, book), {}, 0, "") for t, book in enumerate(ticks)]
+    assert json.loads(lines[1])[0][3] == {"A": [{"100": 2, "98": 6, "99": 0}, {}]}
+    assert json.loads(lines[2])[0][3] == {}
+    for line, book in zip(lines, ticks):
+        assert books(decode_line(line, decoder).state) == book
+
+
+def test_symbols_that_disappear_and_appear(prosperity_2):
+    main, DeltaBookDecoder, decode_line, _ = prosperity_2
+    logger = main.Logger(delta_mode=True)
+    decoder = DeltaBookDecoder()
+    ticks = [
+        {"A": ({100: 5}, {101: -4}), "B": ({50: 1}, {52: -1})},
+        {"A": ({100: 5}, {101: -4})},
+        # A new symbol with an empty book is still there
+        {"A": ({100: 5}, {101: -4}), "C": ({}, {})},
+        {"C": ({10: 1}, {})},
+    ]
+    for t, book in enumerate(ticks):
+        line = logger.serialize(make_state(main, 100 * t, book), {}, 0, "")
+        assert books(decode_line(line, decoder).state) == book
+
+
+def test_log_starting_without_a_keyframe(prosperity_2):
+    main, DeltaBookDecoder, decode_line, _ = prosperity_2
+    logger = main.Logger(delta_mode=True, keyframe_interval=4)
+    ticks = [{"A": ({100 + t: 5}, {102 + t: -5 - t})} for t in range(10)]
+    lines = [logger.serialize(make_state(main, 100 * t, book), {}, 0, "") for t, book in enumerate(ticks)]
+    with pytest.raises(ValueError):
+        decode_line(lines[1])
+
+    # A log cut after the first keyframe: nothing until the next one, ticks 4-9 afterwards
+    decoder = DeltaBookDecoder()
+    decoded = [decode_line(line, decoder) for line in lines[2:]]
+    assert decoded[:2] == [None, None]
+    assert [books(tick.state) for tick in decoded[2:]] == ticks[4:]
+
+    # A rebuilt trader's logger starts with a keyframe again
+    logger.start_keyframe()
+    assert json.loads(logger.serialize(make_state(main, 1000, ticks[0]), {}, 0, ""))[5] == 1
@@ -0,0 +1,93 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from common.datamodel import OrderDepth
+from common.features import (ASK_DEPTH, ASK_VWAP, BID_DEPTH, BID_VWAP, FEATURES, IMBALANCE, MICROPRICE, MID_PRICE,
+                             SPREAD, TOTAL_DEPTH, day_features, state_features)
+from common.products import ProductRegistry
+
+
+class State:
+    def __init__(self, order_depths):
+        self.order_depths = order_depths
+
+
+def random_depths(rng, symbols):
+    depths = {}
+    for symbol in symbols:
+        mid = rng.randint(1000, 10000)
+        depths[symbol] = OrderDepth({mid - 1 - i: rng.randint(1, 30) for i in range(rng.randint(1, 3))},
+                                    {mid + 1 + i: -rng.randint(1, 30) for i in range(rng.randint(1, 3))})
+    return depths
+
+
+def python_features(depth):
+    # The per product formulas the algos used before state_features
+    best_bid, best_ask = max(depth.buy_orders), min(depth.sell_orders)
+    bid_volume, ask_volume = depth.buy_orders[best_bid], -depth.sell_orders[best_ask]
+    bid_depth = sum(depth.buy_orders.values())
+    ask_depth = -sum(depth.sell_orders.values())
+    return [
+        (best_bid + best_ask) / 2,
+        (best_bid * ask_volume + best_ask * bid_volume) / (bid_volume + ask_volume),
+        best_ask - best_bid,
+        (bid_volume - ask_volume) / (bid_volume + ask_volume),
+        sum(price * volume for price, volume in depth.buy_orders.items()) / bid_depth,
+        sum(price * -volume for price, volume in depth.sell_orders.items()) / ask_depth,
+        bid_depth,
+        ask_depth,
+        bid_depth + ask_depth,
+    ]
+
+
+def test_state_features_match_the_per_product_formulas():
+    rng = random.Random(0)
+    symbols = [f"PRODUCT_{i}" for i in range(8)]
+    products = ProductRegistry(symbols)
+    for _ in range(50):
+        depths = random_depths(rng, symbols)
+        features = state_features(State(depths), products)
+        assert features.shape == (len(symbols), len(FEATURES))
+        for symbol, depth in depths.items():
+            np.testing.assert_allclose(features[products[symbol]], python_features(depth), rtol=1e-15)
+
+
+def test_one_sided_and_missing_books():
+    products = ProductRegistry(["A", "B", "C"])
+    features = state_features(State({"A": OrderDepth({100: 5, 99: 2}, {}), "B": OrderDepth({}, {101: -3})}),
+                              products)
+    for row in range(3):
+        assert np.isnan(features[row, [MID_PRICE, MICROPRICE, SPREAD, IMBALANCE]]).all()
+    assert features[products["A"], BID_VWAP] == pytest.approx((100 * 5 + 99 * 2) / 7)
+    assert np.isnan(features[products["A"], ASK_VWAP])
+    assert features[products["A"], [BID_DEPTH, ASK_DEPTH, TOTAL_DEPTH]].tolist() == [7, 0, 7]
+    assert features[products["B"], [BID_DEPTH, ASK_DEPTH, TOTAL_DEPTH]].tolist() == [0, 3, 3]
+    assert features[products["C"], TOTAL_DEPTH] == 0
+
+
+def test_day_features_agree_with_the_prices_file():
+    from common.loader import load_day
+
+    try:
+        prices = load_day("prices", 1, 0).to_frame()
+    except LookupError:
+        pytest.skip("round 1 prices not available")
+    features = day_features(prices)
+    assert features.shape == (len(prices), len(FEATURES))
+    two_sided = ~(prices["bid_price_1"].isna() | prices["ask_price_1"].isna()).to_numpy()
+    np.testing.assert_array_equal(features[two_sided, MID_PRICE], prices["mid_price"].to_numpy(float)[two_sided])
+
+    # Row by row the same as the live path on the same book
+    for row in range(0, len(prices), 997):
+        line = prices.iloc[row]
+        depth = OrderDepth()
+        for level in (1, 2, 3):
+            if not math.isnan(line[f"bid_price_{level}"]):
+                depth.buy_orders[int(line[f"bid_price_{level}"])] = int(line[f"bid_volume_{level}"])
+            if not math.isnan(line[f"ask_price_{level}"]):
+                depth.sell_orders[int(line[f"ask_price_{level}"])] = -int(line[f"ask_volume_{level}"])
+        live = state_features(State({"X": depth}), ProductRegistry(["X"]))[0]
+        np.testing.assert_array_equal(live, features[row])
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from common.options import (VOUCHER_STRIKE_ARRAY, ImpliedVolatilitySolver, black_scholes, chain_prices,
+                            implied_volatility, implied_volatility_surface)
+from common.state_codec import StateCodec
+
+
+def smile_chain(ticks=200, seed=0):
+    rng = np.random.default_rng(seed)
+    spots = 10000 * np.exp(np.cumsum(rng.normal(0, 0.001, ticks)))
+    times = (5 - np.arange(ticks) / ticks) / 365
+    vols = np.clip(0.2 + np.cumsum(rng.normal(0, 0.0002, ticks)), 0.05, 1.0)
+    true_vols = vols[:, None] * (1 + 2 * np.log(VOUCHER_STRIKE_ARRAY / spots[:, None]) ** 2)
+    prices = black_scholes(spots[:, None], VOUCHER_STRIKE_ARRAY, times[:, None], true_vols).price
+    return spots, times, true_vols, prices
+
+
+def test_round_trip_price_to_vol_to_price():
+    spots, times, true_vols, prices = smile_chain()
+    solved, iterations = implied_volatility(prices, spots[:, None], VOUCHER_STRIKE_ARRAY, times[:, None])
+    assert solved.shape == prices.shape and not np.isnan(solved).any()
+    repriced = black_scholes(spots[:, None], VOUCHER_STRIKE_ARRAY, times[:, None], solved).price
+    np.testing.assert_allclose(repriced, prices, atol=1e-6)
+    # Where a vol point is worth something the vol itself comes back
+    vega = black_scholes(spots[:, None], VOUCHER_STRIKE_ARRAY, times[:, None], true_vols).vega
+    np.testing.assert_allclose(solved[vega >= 1], true_vols[vega >= 1], atol=1e-5)
+    assert 0 < iterations < 100
+
+
+def test_known_value():
+    # S = K = 100, one year, no rate: 7.965567455405804 is the price at 20% vol
+    solved, _ = implied_volatility(7.965567455405804, 100.0, 100.0, 1.0)
+    assert solved.shape == ()
+    assert float(solved) == pytest.approx(0.2, abs=1e-8)
+
+
+def test_prices_outside_the_no_arbitrage_bounds_have_no_vol():
+    intrinsic = np.maximum(10000.0 - VOUCHER_STRIKE_ARRAY, 0.0)
+    for price in (intrinsic, intrinsic - 1, np.full(5, 10000.0), np.full(5, np.nan)):
+        solved, _ = implied_volatility(price, 10000.0, VOUCHER_STRIKE_ARRAY, 4 / 365)
+        assert np.isnan(solved).all()
+    # Expired options neither
+    solved, iterations = implied_volatility(intrinsic + 10, 10000.0, VOUCHER_STRIKE_ARRAY, 0.0)
+    assert np.isnan(solved).all() and iterations == 0
+
+
+def test_warm_start_needs_fewer_passes_than_cold():
+    spots, times, true_vols, prices = smile_chain()
+    solver = ImpliedVolatilitySolver(VOUCHER_STRIKE_ARRAY)
+    warm, cold = [], []
+    for i in range(len(spots)):
+        vols = solver.update(prices[i], spots[i], times[i])
+        warm.append(solver.iterations)
+        cold.append(implied_volatility(prices[i], spots[i], VOUCHER_STRIKE_ARRAY, times[i])[1])
+        np.testing.assert_allclose(black_scholes(spots[i], VOUCHER_STRIKE_ARRAY, times[i], vols).price,
+                                   prices[i], atol=1e-6)
+    # After the first tick the previous vols are within a Newton step or two
+    assert max(warm[1:]) <= 2 < min(cold)
+
+
+def test_solver_keeps_the_last_vol_of_a_missing_price():
+    spots, times, _, prices = smile_chain(ticks=2)
+    solver = ImpliedVolatilitySolver(VOUCHER_STRIKE_ARRAY)
+    first = solver.update(prices[0], spots[0], times[0])
+    quotes = prices[1].copy()
+    quotes[2] = np.nan
+    second = solver.update(quotes, spots[1], times[1])
+    assert np.isnan(second[2]) and solver.volatility[2] == first[2]
+
+
+def test_solver_state_round_trip():
+    spots, times, _, prices = smile_chain(ticks=3)
+    solver = ImpliedVolatilitySolver(VOUCHER_STRIKE_ARRAY)
+    solver.update(prices[0], spots[0], times[0])
+    codec = StateCodec(solver.codec_fields("iv"))
+    restored = ImpliedVolatilitySolver(VOUCHER_STRIKE_ARRAY).restore_state(codec.decode(codec.encode(solver.state("iv"))),
+                                                                            "iv")
+    np.testing.assert_array_equal(restored.volatility, solver.volatility)
+    np.testing.assert_array_equal(restored.update(prices[1], spots[1], times[1]),
+                                  solver.update(prices[1], spots[1], times[1]))
+    assert restored.iterations == solver.iterations
+
+
+def test_surface_of_a_prices_file():
+    from common.loader import load_day
+
+    try:
+        prices = load_day("prices", 4, 1, season=2)
+    except LookupError:
+        pytest.skip("Prosperity 2 round 4 prices not available")
+    options = {"COCONUT_COUPON": 10000}
+    times, spots, coupons = chain_prices(prices, "COCONUT", options)
+    assert len(times) == len(spots) == len(coupons) and coupons.shape[1] == 1
+    expiry = lambda timestamps: (246 - timestamps / 1e6) / 365
+    surface_times, surface = implied_volatility_surface(prices, expiry, "COCONUT", options)
+    np.testing.assert_array_equal(surface_times, times)
+    usable = ~np.isnan(surface[:, 0])
+    assert usable.mean() > 0.99
+    repriced = black_scholes(spots[usable], 10000.0, expiry(times[usable]), surface[usable, 0]).price
+    np.testing.assert_allclose(repriced, coupons[usable, 0], atol=1e-5)
@@ -0,0 +1,125 @@
+import random
+import statistics
+
+import pandas as pd
+import pytest
+
+from common.indicators import ExponentialAverages, RollingMax, RollingMedian, RollingMin, RollingWindow, WeightedPriceWindow
+from common.state_codec import StateCodec
+
+WINDOW = 20
+
+
+def stream(ticks=500, seed=0):
+    rng = random.Random(seed)
+    price = 2000.0
+    for _ in range(ticks):
+        price += rng.choice([-1.5, -1.0, 0.0, 0.0, 1.0, 1.5])
+        yield price
+
+
+def reading(indicator):
+    if isinstance(indicator, RollingMedian):
+        return indicator.median()
+    if isinstance(indicator, RollingWindow):
+        return indicator.mean()
+    return indicator.value()
+
+
+@pytest.mark.parametrize("cls, reference", [(RollingMin, min), (RollingMax, max),
+                                            (RollingMedian, statistics.median),
+                                            (RollingWindow, statistics.fmean)])
+def test_matches_the_window_recomputed(cls, reference):
+    indicator = cls(WINDOW)
+    values = []
+    for value in stream():
+        indicator.update(value)
+        values.append(value)
+        assert reading(indicator) == pytest.approx(reference(values[-WINDOW:]), abs=1e-9)
+
+
+@pytest.mark.parametrize("cls", [RollingMin, RollingMax, RollingMedian, RollingWindow])
+def test_state_round_trip_through_trader_data(cls):
+    # A trader rebuilt from traderData every tick follows the one that lived all day
+    live = cls(WINDOW)
+    codec = StateCodec(live.codec_fields("x"))
+    trader_data = ""
+    for value in stream():
+        rebuilt = cls(WINDOW).restore_state(codec.decode(trader_data), "x")
+        rebuilt.update(value)
+        live.update(value)
+        assert reading(rebuilt) == reading(live)
+        trader_data = codec.encode(rebuilt.state("x"))
+
+
+def test_exponential_averages_match_the_per_tick_recurrence():
+    # The tutorial traders kept every EMA in a dict keyed by timestamp
+    spans = [1, 5, 20, 100]
+    averages = ExponentialAverages(spans, initial=2000.0)
+    history = {span: {0: 2000.0} for span in spans}
+    prices = list(stream())
+    for tick, price in enumerate(prices, 1):
+        averages.update(price)
+        for span in spans:
+            previous = history[span][list(history[span].keys())[-1]]
+            history[span][100 * tick] = (2 * price + (span - 1) * previous) / (span + 1)
+            assert averages.mean(span) == pytest.approx(history[span][100 * tick], rel=1e-12)
+    series = pd.Series([2000.0] + prices)
+    for span in spans:
+        expected = series.ewm(span=span, adjust=False).var(bias=True).iloc[-1]
+        assert averages.var(span) == pytest.approx(expected, rel=1e-9, abs=1e-12)
+    assert averages.seen == len(prices) and averages.mean() == averages.mean(1) == prices[-1]
+
+
+@pytest.mark.parametrize("initial", [None, 2000.0])
+def test_exponential_averages_round_trip(initial):
+    live = ExponentialAverages([5, 20], initial)
+    codec = StateCodec(live.codec_fields("ema"))
+    trader_data = codec.encode(live.state("ema"))
+    for value in stream(200):
+        rebuilt = ExponentialAverages([5, 20], initial).restore_state(codec.decode(trader_data), "ema")
+        assert (rebuilt.means, rebuilt.variances, rebuilt.seen) == (live.means, live.variances, live.seen)
+        rebuilt.update(value)
+        live.update(value)
+        trader_data = codec.encode(rebuilt.state("ema"))
+    # A state saved for other spans is ignored
+    other = ExponentialAverages([5], initial).restore_state(codec.decode(trader_data), "ema")
+    assert other.means == [initial] and other.seen == 0
+
+
+def test_weighted_price_window_round_trip():
+    live = WeightedPriceWindow(5)
+    codec = StateCodec(live.codec_fields("vwap"))
+    trader_data = ""
+    rng = random.Random(1)
+    for price in stream(200):
+        levels = {int(price) - i: rng.randint(1, 20) for i in range(rng.randint(1, 3))}
+        rebuilt = WeightedPriceWindow(5).restore_state(codec.decode(trader_data), "vwap")
+        rebuilt.push(levels)
+        live.push(levels)
+        assert rebuilt.average() == live.average() and rebuilt.seen == live.seen
+        trader_data = codec.encode(rebuilt.state("vwap"))
+
+
+@pytest.mark.parametrize("cls", [RollingMin, RollingMax, RollingMedian, RollingWindow])
+@pytest.mark.parametrize("count", [0, 1, 7, WINDOW, 3 * WINDOW])
+def test_restore_matches_feeding_the_values(cls, count):
+    # restore() fills the structures directly; it must leave them as the updates would
+    rng = random.Random(count)
+    values = [2000 + rng.gauss(0, 3) for _ in range(count)]
+    fed = cls(WINDOW)
+    for value in values:
+        fed.update(value)
+    restored = cls(WINDOW)
+    restored.restore(values)
+    for value in [2000 + rng.gauss(0, 3) for _ in range(2 * WINDOW)]:
+        if isinstance(fed, RollingWindow):
+            assert restored.count == fed.count and restored.values() == fed.values()
+            for statistic in ("mean", "var", "std"):
+                expected = getattr(fed, statistic)()
+                assert getattr(restored, statistic)() == (None if expected is None
+                                                          else pytest.approx(expected, rel=1e-9, abs=1e-9))
+        else:
+            assert reading(restored) == reading(fed)
+        fed.update(value)
+        restored.update(value)
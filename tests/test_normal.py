@@ -0,0 +1,61 @@
+import math
+
+import numpy as np
+import pytest
+
+from common.normal import abramowitz_stegun_cdf, norm_cdf, norm_pdf
+
+
+def exact_cdf(values):
+    return np.array([0.5 * math.erfc(-x / math.sqrt(2)) for x in np.ravel(values).tolist()]).reshape(np.shape(values))
+
+
+@pytest.mark.parametrize("size", [1, 5, 16, 17, 100_001])
+def test_agrees_with_erfc_on_the_small_and_large_paths(size):
+    grid = np.linspace(-38, 38, size) if size > 1 else np.array([0.3])
+    exact = exact_cdf(grid)
+    approximate = norm_cdf(grid)
+    assert approximate.shape == grid.shape
+    np.testing.assert_allclose(approximate, exact, rtol=0, atol=3e-16)
+    lower = (grid < 0) & (exact > 0)
+    np.testing.assert_allclose(approximate[lower], exact[lower], rtol=1e-8)
+
+
+def test_known_values():
+    assert norm_cdf(0.0) == 0.5
+    assert norm_cdf(1.959963984540054) == pytest.approx(0.975, rel=1e-15)
+    np.testing.assert_allclose(norm_cdf(np.full(20, -1.0)), 0.15865525393145707, rtol=1e-9)
+    assert norm_pdf(0.0) == pytest.approx(1 / math.sqrt(2 * math.pi), rel=1e-15)
+    # Old cdf within its documented 7.5e-8
+    assert abs(abramowitz_stegun_cdf(0.7) - norm_cdf(0.7)) < 7.5e-8
+
+
+@pytest.mark.parametrize("size", [3, 50])
+def test_nan_and_infinities(size):
+    values = np.zeros(size)
+    values[:3] = [np.nan, -np.inf, np.inf]
+    cdf = norm_cdf(values)
+    assert np.isnan(cdf[0]) and cdf[1] == 0.0 and cdf[2] == 1.0
+    pdf = norm_pdf(values)
+    assert np.isnan(pdf[0]) and pdf[1] == 0.0 and pdf[2] == 0.0
+    assert math.isnan(norm_cdf(float("nan")))
+
+
+def test_shapes_and_scalars():
+    for value in (0.4, 1, np.float64(0.4), np.int64(1), np.array(0.4)):
+        assert isinstance(norm_cdf(value), float)
+        assert isinstance(norm_pdf(value), float)
+    assert norm_cdf(np.array(0.4)) == norm_cdf(0.4)
+    for shape in ((0,), (2, 3), (40, 5)):
+        values = np.random.default_rng(0).normal(0, 2, shape)
+        assert norm_cdf(values).shape == shape
+        assert norm_pdf(values).shape == shape
+    assert norm_cdf([[-1.0, 1.0]]).shape == (1, 2)
+
+
+def test_pdf_is_the_derivative_of_the_cdf():
+    grid = np.linspace(-8, 8, 161)
+    h = 1e-5
+    np.testing.assert_allclose(norm_pdf(grid), (norm_cdf(grid + h) - norm_cdf(grid - h)) / (2 * h), atol=1e-9)
+    # Symmetry
+    np.testing.assert_allclose(norm_cdf(grid) + norm_cdf(-grid), 1.0, atol=1e-15)
@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+import pytest
+
+from common.options import VOUCHER_STRIKE_ARRAY, black_scholes, black_scholes_call
+
+
+def test_known_values():
+    # S = K = 100, one year, 20% vol: d1 = 0.1, d2 = -0.1
+    chain = black_scholes(100.0, 100.0, 1.0, 0.2)
+    assert chain.price == pytest.approx(7.965567455405804, rel=1e-12)
+    assert chain.delta == pytest.approx(0.539827837277029, rel=1e-12)
+    assert chain.exercise_probability == pytest.approx(0.460172162722971, rel=1e-12)
+    assert chain.vega == pytest.approx(39.69525474770118, rel=1e-12)
+    assert chain.gamma == pytest.approx(0.019847627373850593, rel=1e-12)
+    assert chain.theta == pytest.approx(-3.969525474770118, rel=1e-12)
+    # With a rate: Hull's example 15.6, S = 42, K = 40, r = 10%, vol = 20%, half a year
+    assert black_scholes(42.0, 40.0, 0.5, 0.2, rate=0.1).price == pytest.approx(4.759422392871532, rel=1e-12)
+
+
+@pytest.mark.parametrize("rate", [0.0, 0.05])
+def test_greeks_agree_with_finite_differences(rate):
+    spot = np.array([9400.0, 9900.0, 10000.0, 10300.0, 10800.0])[:, None]
+    time, volatility, h = 4 / 365, 0.2, 1e-3
+    chain = black_scholes(spot, VOUCHER_STRIKE_ARRAY, time, volatility, rate)
+    price = lambda **kwargs: black_scholes(**{"spot": spot, "strike": VOUCHER_STRIKE_ARRAY, "time": time,
+                                              "volatility": volatility, "rate": rate, **kwargs}).price
+    delta = (price(spot=spot + h) - price(spot=spot - h)) / (2 * h)
+    gamma = (price(spot=spot + 1) - 2 * chain.price + price(spot=spot - 1))
+    # A smaller step in the vol: far out of the money the price is strongly convex in it
+    vega = (price(volatility=volatility + 1e-5) - price(volatility=volatility - 1e-5)) / 2e-5
+    theta = -(price(time=time + h / 365) - price(time=time - h / 365)) / (2 * h / 365)
+    np.testing.assert_allclose(chain.delta, delta, atol=1e-7)
+    np.testing.assert_allclose(chain.gamma, gamma, rtol=1e-3, atol=1e-7)
+    np.testing.assert_allclose(chain.vega, vega, rtol=1e-5, atol=1e-4)
+    np.testing.assert_allclose(chain.theta, theta, rtol=1e-4, atol=1e-6)
+
+
+def test_broadcasts_over_ticks_and_strikes():
+    spots = np.array([9800.0, 10000.0, 10200.0])
+    times = np.array([5.0, 4.5, 4.0]) / 365
+    chain = black_scholes(spots[:, None], VOUCHER_STRIKE_ARRAY, times[:, None], 0.2)
+    for name in ("price", "delta", "gamma", "vega", "theta", "exercise_probability"):
+        assert getattr(chain, name).shape == (3, 5)
+    for t in range(3):
+        row = black_scholes(spots[t], VOUCHER_STRIKE_ARRAY, times[t], 0.2)
+        np.testing.assert_array_equal(chain.price[t], row.price)
+    # Prices fall and deltas fall with the strike
+    assert np.all(np.diff(chain.price, axis=1) < 0)
+    assert np.all(np.diff(chain.delta, axis=1) < 0)
+
+
+@pytest.mark.parametrize("time, volatility", [(0.0, 0.2), (-1 / 365, 0.2), (1.0, 0.0)])
+def test_expired_or_volatility_free_options_are_worth_intrinsic(time, volatility):
+    chain = black_scholes(10000.0, VOUCHER_STRIKE_ARRAY, time, volatility)
+    np.testing.assert_array_equal(chain.price, np.maximum(10000.0 - VOUCHER_STRIKE_ARRAY, 0.0))
+    np.testing.assert_array_equal(chain.delta, [1.0, 1.0, 0.0, 0.0, 0.0])
+    np.testing.assert_array_equal(chain.exercise_probability, chain.delta)
+    for name in ("gamma", "vega", "theta"):
+        np.testing.assert_array_equal(getattr(chain, name), 0.0)
+
+
+def test_zero_volatility_with_a_rate_is_worth_forward_intrinsic():
+    chain = black_scholes(100.0, 100.0, 1.0, 0.0, rate=0.05)
+    assert chain.price == pytest.approx(100.0 - 100.0 * math.exp(-0.05))
+    assert chain.delta == 1.0
+    # A mix of live and dead options prices each on its own
+    mixed = black_scholes(100.0, 100.0, np.array([0.0, 1.0]), 0.2)
+    assert mixed.price.tolist() == [0.0, black_scholes(100.0, 100.0, 1.0, 0.2).price]
+
+
+@pytest.mark.parametrize("spot, strike, time, volatility, rate", [
+    (10000.0, 9500.0, 5 / 365, 0.2, 0.0),
+    (10000.0, 10500.0, 0.5 / 365, 0.15, 0.0),
+    (42.0, 40.0, 0.5, 0.2, 0.1),
+    (10000.0, 10000.0, 0.0, 0.2, 0.0),
+    (10000.0, 9750.0, 1 / 365, 0.0, 0.0),
+])
+def test_scalar_call_agrees_with_the_array_version(spot, strike, time, volatility, rate):
+    scalar = black_scholes_call(spot, strike, time, volatility, rate)
+    array = black_scholes(spot, strike, time, volatility, rate)
+    for name in ("price", "delta", "gamma", "vega", "theta", "exercise_probability"):
+        assert getattr(scalar, name) == pytest.approx(float(getattr(array, name)), rel=1e-12, abs=1e-12)
+        assert isinstance(getattr(scalar, name), float)
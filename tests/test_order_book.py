@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from common.datamodel import OrderDepth
+from common.order_book import BookArrays, BookSide, OrderDepthView, SortedOrderDepth, ask_prices, bid_prices
+
+
+def test_iterates_best_price_first_after_every_change():
+    bids = BookSide({9: 3, 10: 5}, descending=True)
+    asks = BookSide({13: -1, 12: -4})
+    assert list(bids) == [10, 9] and list(asks) == [12, 13]
+    assert bids.best() == 10 and asks.best() == 12  # caches the prices
+
+    bids[11] = 1          # new best
+    bids[8] = 2           # new worst, appended in place
+    bids[10] = 7          # existing level
+    assert list(bids) == bids.prices() == [11, 10, 9, 8]
+    assert next(iter(bids)) == bids.best() == 11
+
+    asks.update({11: -2, 14: -6})
+    assert list(asks) == asks.prices() == [11, 12, 13, 14]
+    asks |= {10: -1}
+    assert next(iter(asks)) == asks.best() == 10
+    assert asks.setdefault(9, -3) == -3 and asks.setdefault(9, -5) == -3
+    assert list(asks) == [9, 10, 11, 12, 13, 14]
+
+    del asks[9]
+    asks.pop(10)
+    assert list(asks) == asks.prices() == [11, 12, 13, 14]
+    # Without cached prices a new level still goes to its place
+    side = BookSide({5: 1, 4: 1}, descending=True)
+    side[6] = 1
+    assert list(side) == [6, 5, 4]
+
+
+def test_summaries_follow_changes():
+    asks = BookSide({12: -4, 13: -1})
+    assert (asks.best(), asks.best_volume(), asks.volume(), asks.vwap()) == (12, 4, 5, (12 * 4 + 13) / 5)
+    asks[11] = -5
+    assert (asks.best(), asks.best_volume(), asks.volume()) == (11, 5, 10)
+    assert asks.vwap() == pytest.approx((11 * 5 + 12 * 4 + 13) / 10)
+    asks.pop(11)
+    asks[12] = -2
+    assert (asks.best(), asks.best_volume(), asks.volume()) == (12, 2, 3)
+    asks.popitem()
+    asks.clear()
+    assert (asks.best(), asks.best_volume(), asks.volume(), asks.vwap()) == (None, 0, 0, None)
+
+
+def test_sorted_order_depth():
+    order_depth = SortedOrderDepth({9: 3, 10: 5}, {12: -4, 13: -1})
+    assert (order_depth.best_bid(), order_depth.best_ask(), order_depth.spread()) == (10, 12, 2)
+    assert order_depth.mid_price() == 11
+    assert order_depth.microprice() == (10 * 4 + 12 * 5) / 9
+    assert (order_depth.bid_depth(), order_depth.ask_depth(), order_depth.total_depth()) == (8, 5, 13)
+    assert order_depth.bid_vwap() == (9 * 3 + 10 * 5) / 8
+    # Plain dicts assigned later are wrapped, with the right order
+    order_depth.buy_orders = {7: 1, 8: 2}
+    assert isinstance(order_depth.buy_orders, BookSide) and list(order_depth.buy_orders) == [8, 7]
+    order_depth.sell_orders[11] = -1
+    assert order_depth.best_ask() == 11 and order_depth.spread() == 3
+    empty = SortedOrderDepth()
+    assert (empty.best_bid(), empty.spread(), empty.mid_price(), empty.microprice()) == (None, None, None, None)
+
+
+def test_view_agrees_with_the_dicts():
+    book = BookArrays(np.array([[10, 9, 0]]), np.array([[5, 3, 0]]), np.array([[12, 13, 14]]),
+                      np.array([[-4, -1, -2]]))
+    view = OrderDepthView(book, 0)
+    sorted_depth = SortedOrderDepth({10: 5, 9: 3}, {12: -4, 13: -1, 14: -2})
+    accessors = ("best_bid", "best_ask", "best_bid_volume", "best_ask_volume", "spread", "mid_price", "microprice",
+                 "bid_vwap", "ask_vwap", "bid_depth", "ask_depth", "total_depth")
+    for name in accessors:
+        assert getattr(view, name)() == pytest.approx(getattr(sorted_depth, name)())
+    # Once built, the dicts win, changes included
+    view.sell_orders[11] = -3
+    sorted_depth.sell_orders[11] = -3
+    for name in accessors:
+        assert getattr(view, name)() == pytest.approx(getattr(sorted_depth, name)())
+    assert view.buy_orders == {10: 5, 9: 3}
+
+
+def test_price_lists_of_any_order_depth():
+    plain = OrderDepth({9: 3, 10: 5}, {13: -1, 12: -4})
+    assert bid_prices(plain) == [10, 9] and ask_prices(plain) == [12, 13]
+    sorted_depth = SortedOrderDepth(plain.buy_orders, plain.sell_orders)
+    assert bid_prices(sorted_depth) == [10, 9] and ask_prices(sorted_depth) == [12, 13]
@@ -0,0 +1,130 @@
+import json
+import math
+import os
+import sys
+
+import pytest
+
+from conftest import REPO_ROOT
+
+PROSPERITY_2 = os.path.join(REPO_ROOT, "prosperity_2")
+
+
+@pytest.fixture(scope="module")
+def prosperity_2():
+    sys.path.insert(0, PROSPERITY_2)
+    try:
+        import main
+        from simulator import replay
+        yield main, replay
+    finally:
+        sys.path.remove(PROSPERITY_2)
+
+
+def vars_of(value):
+    return {name: getattr(value, name) for name in type(value).__slots__}
+
+
+def recorded_states(main):
+    books = [
+        {"A": ({10: 5, 9: 2}, {12: -3}), "B": ({20: 1}, {22: -4, 23: -1, 24: -2})},
+        {"A": ({10: 4}, {11: -3, 12: -1}), "B": ({21: 2}, {22: -4})},
+        {"A": ({9: 1}, {}), "B": ({21: 2}, {22: -3})},
+    ]
+    own_trades = [
+        {},
+        # Filled on the exchange after the orders of tick 0
+        {"A": [main.Trade("A", 10, 2, "SUBMISSION", "X", 0)]},
+        # The A fill is reported again (stale), B is new
+        {"A": [main.Trade("A", 10, 2, "SUBMISSION", "X", 0)], "B": [main.Trade("B", 20, 1, "X", "SUBMISSION", 100)]},
+    ]
+    market_trades = [{}, {"A": [main.Trade("A", 11, 3, "Y", "Z", 0)]}, {}]
+    observations = main.Observation({"DOLPHIN_SIGHTINGS": 3},
+                                    {"ORCHIDS": main.ConversionObservation(1000.0, 1002.0, 1.0, 2.0, -3.0, 2500.0, 70.0)})
+    states = []
+    for tick, book in enumerate(books):
+        states.append(main.TradingState(
+            f"data {tick}", 100 * tick,
+            {symbol: main.Listing(symbol, symbol, "SEASHELLS") for symbol in book},
+            {symbol: main.OrderDepth(dict(buy_orders), dict(sell_orders)) for symbol, (buy_orders, sell_orders)
+             in book.items()},
+            own_trades[tick], market_trades[tick], {"A": 2 * (tick > 0), "B": -(tick > 1)}, observations,
+        ))
+    return states
+
+
+@pytest.fixture
+def sandbox_log(prosperity_2, tmp_path):
+    # A downloaded submission log: the Logger.flush line of each tick sits in lambdaLog
+    # next to whatever else the trader printed
+    main, _ = prosperity_2
+    logger = main.Logger()
+    entries = []
+    for state in recorded_states(main):
+        orders = {"A": [main.Order("A", 10, 2)]}
+        line = logger.serialize(state, orders, 0, state.traderData + " out")
+        entries.append({"sandboxLog": "", "lambdaLog": "some print\n" + line, "timestamp": state.timestamp})
+    path = tmp_path / "sandbox.log"
+    path.write_text("Sandbox logs:\n" + "\n".join(json.dumps(entry, indent=2) for entry in entries)
+                    + "\n\n\n\nActivities log:\nday;timestamp;product\n")
+    return str(path)
+
+
+def test_read_log_gives_back_the_states(prosperity_2, sandbox_log):
+    main, replay = prosperity_2
+    with open(sandbox_log) as f:
+        lines = list(replay.iter_flush_lines(f.read()))
+    assert len(lines) == 3
+    ticks = replay.read_log(sandbox_log)
+    for tick, state in zip(ticks, recorded_states(main)):
+        decoded = tick.state
+        assert decoded.timestamp == state.timestamp and decoded.traderData == state.traderData
+        assert tick.trader_data == state.traderData + " out" and tick.logs == ""
+        assert [(order.symbol, order.price, order.quantity) for order in tick.orders["A"]] == [("A", 10, 2)]
+        assert {symbol: (dict(depth.buy_orders), dict(depth.sell_orders))
+                for symbol, depth in decoded.order_depths.items()} == \
+            {symbol: (depth.buy_orders, depth.sell_orders) for symbol, depth in state.order_depths.items()}
+        for field in ("own_trades", "market_trades"):
+            assert {symbol: [vars_of(trade) for trade in trades] for symbol, trades in getattr(decoded, field).items()} \
+                == {symbol: [vars_of(trade) for trade in trades] for symbol, trades in getattr(state, field).items()}
+        assert decoded.position == state.position
+        assert decoded.observations.plainValueObservations == {"DOLPHIN_SIGHTINGS": 3}
+        assert vars_of(decoded.observations.conversionObservations["ORCHIDS"]) == \
+            vars_of(state.observations.conversionObservations["ORCHIDS"])
+
+    # A plain file of flush lines reads the same
+    plain = os.path.join(os.path.dirname(sandbox_log), "lines.log")
+    with open(plain, "w") as f:
+        f.write("\n".join(lines))
+    assert [tick.state.timestamp for tick in replay.read_log(plain)] == [0, 100, 200]
+
+
+def test_frames_in_the_csv_layout(prosperity_2, sandbox_log):
+    _, replay = prosperity_2
+    prices, trades = replay.ticks_to_frames(replay.read_log(sandbox_log))
+    assert len(prices) == 6
+    row = prices[(prices["timestamp"] == 0) & (prices["product"] == "B")].iloc[0]
+    assert (row["bid_price_1"], row["bid_volume_1"]) == (20, 1)
+    assert [(row[f"ask_price_{i}"], row[f"ask_volume_{i}"]) for i in (1, 2, 3)] == [(22, 4), (23, 1), (24, 2)]
+    assert row["mid_price"] == 21
+    # One sided book: no mid, NaN levels
+    row = prices[(prices["timestamp"] == 200) & (prices["product"] == "A")].iloc[0]
+    assert row["bid_price_1"] == 9 and math.isnan(row["ask_price_1"]) and math.isnan(row["mid_price"])
+    assert trades.to_dict("records") == [{"timestamp": 0, "buyer": "Y", "seller": "Z", "symbol": "A",
+                                          "currency": "SEASHELLS", "price": 11, "quantity": 3}]
+
+
+def test_fill_diff_lists_the_ticks_where_fills_differ(prosperity_2, sandbox_log):
+    main, replay = prosperity_2
+    simulator = replay.ReplaySimulator(sandbox_log, trader=None, capture_output=False)
+    assert simulator.live_fills().keys() == {0, 100}
+
+    simulator.load_trading_sate(0)
+    # The A buy of tick 0 fills like on the exchange, the B sell of tick 100 one tick better
+    simulator.load_trading_sate(100, {"A": [main.Trade("A", 10, 2, "SUBMISSION", "", 0)]})
+    state = simulator.load_trading_sate(200, {"B": [main.Trade("B", 21, -1, "", "SUBMISSION", 100)]})
+    assert state.traderData == "data 2" and state.own_trades["B"][0].price == 21
+
+    diff = simulator.fill_diff()
+    assert diff.to_dict("records") == [{"timestamp": 100, "symbol": "B", "live_quantity": -1, "live_cash": 20,
+                                        "sim_quantity": -1, "sim_cash": 21}]
@@ -0,0 +1,68 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from common import datamodel
+from common.serialization import (_original_datamodel, observation_to_str, sample_state, state_from_json,
+                                  state_to_dict, state_to_json)
+from conftest import REPO_ROOT
+
+jsonpickle = pytest.importorskip("jsonpickle")
+pytestmark = pytest.mark.filterwarnings("ignore:keys will default:DeprecationWarning")
+
+
+@pytest.mark.parametrize("sugar", [True, False])
+def test_same_text_as_the_original_datamodel(sugar):
+    model = datamodel
+    if not sugar:
+        # The layout rounds 1-3 import as ConversionObservation
+        model = SimpleNamespace(**{**vars(datamodel), "ConversionObservation": datamodel.LegacyConversionObservation})
+    state = sample_state(model)
+    original = sample_state(_original_datamodel(sugar))
+
+    assert state_to_json(state) == original.toJSON()
+    assert state.toJSON() == original.toJSON()
+    assert observation_to_str(state.observations) == str(original.observations)
+
+
+def test_state_round_trip():
+    text = state_to_json(sample_state(datamodel))
+    assert state_to_json(state_from_json(text)) == text
+
+
+def test_state_to_dict_is_plain():
+    # Nothing is left for a default hook: the tree encodes with the plain json module
+    state = sample_state(datamodel)
+    state.own_trades["KELP"] = [datamodel.OwnTrade("KELP", 2000, 1, "SUBMISSION")] + state.own_trades["KELP"]
+    tree = state_to_dict(state)
+
+    def plain(value):
+        if isinstance(value, dict):
+            return type(value) is dict and all(plain(item) for item in value.values())
+        if isinstance(value, list):
+            return all(plain(item) for item in value)
+        return value is None or isinstance(value, (str, int, float))
+
+    assert plain(tree)
+    assert tree["own_trades"]["KELP"][0] == {"symbol": "KELP", "price": 2000, "quantity": 1,
+                                             "counter_party": "SUBMISSION"}
+    assert json.dumps(tree, sort_keys=True) == state_to_json(state)
+
+
+@pytest.mark.parametrize("round_dir, field", [("round_5", "sugarPrice"), ("round_3", "humidity")])
+def test_jsonpickle_decodes_observations_with_the_round_datamodel(monkeypatch, round_dir, field):
+    monkeypatch.syspath_prepend(os.path.join(REPO_ROOT, round_dir))
+    monkeypatch.delitem(sys.modules, "datamodel", raising=False)
+    conversion = datamodel.ConversionObservation(650.0, 652.5, 1.5, 9.5, -5.0, 200.0, 60.0)
+    if field == "humidity":
+        conversion = datamodel.LegacyConversionObservation(650.0, 652.5, 1.5, 9.5, -5.0, 200.0, 60.0)
+    text = str(datamodel.Observation({}, {"MAGNIFICENT_MACARONS": conversion}))
+    encoded = text[text.index("conversionObservations: ") + len("conversionObservations: "):-1]
+
+    assert json.loads(encoded)["MAGNIFICENT_MACARONS"]["py/object"] == "datamodel.ConversionObservation"
+    decoded = jsonpickle.decode(encoded)["MAGNIFICENT_MACARONS"]
+    assert type(decoded) is sys.modules["datamodel"].ConversionObservation
+    assert getattr(decoded, field) == getattr(conversion, field)
@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import REPO_ROOT
+
+PROSPERITY_2 = os.path.join(REPO_ROOT, "prosperity_2")
+
+
+@pytest.fixture(scope="module")
+def prosperity_2():
+    sys.path.insert(0, PROSPERITY_2)
+    try:
+        import main
+        from simulator.simulator import Simulator, process_trades
+        yield main, Simulator, process_trades
+    finally:
+        sys.path.remove(PROSPERITY_2)
+
+
+@pytest.mark.parametrize("day", ["round-1/prices_round_1_day_0", "round-3/prices_round_3_day_0",
+                                 "round-4/prices_round_4_day_1"])
+def test_main_trader_runs_in_the_simulator(prosperity_2, monkeypatch, day):
+    main, Simulator, process_trades = prosperity_2
+    monkeypatch.chdir(PROSPERITY_2)
+    prices = f"datasets/{day}.csv"
+    trades = prices.replace("prices_", "trades_").replace(".csv", "_nn.csv")
+    simulator = Simulator(prices, trades, main.Trader())
+
+    own_trades = {}
+    timestamps = simulator.prices["timestamp"].unique()[:50]
+    for timestamp in timestamps:
+        state = simulator.load_trading_sate(timestamp, own_trades)
+        assert type(state.timestamp) is int
+        result = simulator.run_trader(state, timestamp)
+        prices_now = simulator.prices[simulator.prices["timestamp"] == timestamp]
+        own_trades = process_trades(prices_now, result)
+        simulator.process_position_profit(own_trades)
+        simulator.calculate_pnl(prices_now)
+
+    # Every tick's log line is valid JSON carrying its timestamp
+    for timestamp in timestamps:
+        log = json.loads(simulator.output.get(int(timestamp)))
+        assert log[0][0] == timestamp
+    assert set(simulator.position) == set(simulator.book_products)
+
+
+def test_logger_encodes_numpy_scalars(prosperity_2):
+    main = prosperity_2[0]
+    value = [np.int32(3), np.float32(0.5), {"a": np.int64(-2)}, main.Order("X", np.int16(7), 1)]
+    assert main.logger.to_json(value) == '[3,0.5,{"a":-2},{"symbol":"X","price":7,"quantity":1}]'
+
+
+def test_coupon_volatility_follows_the_underlying(prosperity_2, monkeypatch):
+    main, Simulator, process_trades = prosperity_2
+    monkeypatch.chdir(PROSPERITY_2)
+    trader = main.Trader()
+    coupon = main.BlackScholesStrategy("COCONUT_COUPON", strike_price=10000, maturity=246, max_pos=600)
+    trader.products["COCONUT_COUPON"] = coupon
+    simulator = Simulator("datasets/round-4/prices_round_4_day_1.csv",
+                          "datasets/round-4/trades_round_4_day_1_nn.csv", trader)
+
+    for timestamp in simulator.prices["timestamp"].unique()[:2000]:
+        simulator.run_trader(simulator.load_trading_sate(timestamp, {}), timestamp)
+
+    # COCONUT's realized volatility on this day is about 0.197 a year
+    assert coupon.volatility.seen == 2000
+    assert 0.15 < coupon.sigma < 0.25 and coupon.sigma != 0.2
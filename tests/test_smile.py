@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from common.options import VOUCHER_STRIKE_ARRAY
+from common.smile import SmileFit, log_moneyness, smile_history
+from common.state_codec import StateCodec
+
+SMILE = np.array([0.2, 0.02, 0.03])
+
+
+def moving_chain(ticks=300, seed=0):
+    rng = np.random.default_rng(seed)
+    spots = 10000 * np.exp(np.cumsum(rng.normal(0, 0.001, ticks)))
+    times = (5 - np.arange(ticks) / ticks) / 365
+    moneyness = log_moneyness(VOUCHER_STRIKE_ARRAY, spots[:, None], times[:, None])
+    level = 0.2 + np.cumsum(rng.normal(0, 0.0005, ticks))
+    vols = level[:, None] + 0.02 * moneyness + 0.03 * moneyness ** 2 + rng.normal(0, 0.002, moneyness.shape)
+    weights = rng.uniform(0.5, 2.0, moneyness.shape)
+    vols[rng.random(vols.shape) < 0.05] = np.nan
+    return moneyness, vols, weights
+
+
+def test_log_moneyness():
+    np.testing.assert_allclose(log_moneyness([9000.0, 10000.0], 10000.0, 0.25), [2 * np.log(0.9), 0.0])
+
+
+@pytest.mark.parametrize("forgetting", [0.0, 0.9, 1.0])
+def test_recovers_a_known_smile(forgetting):
+    smile = SmileFit(forgetting)
+    moneyness = np.linspace(-3, 3, 5)
+    coefficients = smile.update(moneyness, np.polynomial.polynomial.polyval(moneyness, SMILE))
+    np.testing.assert_allclose(coefficients, SMILE, atol=1e-7)
+    np.testing.assert_allclose(smile.residuals(moneyness, smile.fitted(moneyness)), 0.0, atol=1e-12)
+    # A point off the smile shows up in its residual only
+    vols = np.polynomial.polynomial.polyval(moneyness, SMILE)
+    vols[2] += 0.01
+    assert smile.residuals(moneyness, vols)[2] == pytest.approx(0.01, abs=1e-7)
+
+
+def test_matches_weighted_least_squares_with_forgetting():
+    moneyness, vols, weights = moving_chain()
+    smile = SmileFit(0.9)
+    for t in range(len(vols)):
+        smile.update(moneyness[t], vols[t], weights[t])
+    # The same fit from scratch: tick t weighs 0.9 ** (age in ticks) times its weight
+    age = 0.9 ** (len(vols) - 1 - np.arange(len(vols)))[:, None] * weights
+    usable = ~np.isnan(vols)
+    root = np.sqrt(age[usable])
+    design = moneyness[usable][:, None] ** np.arange(3)
+    expected = np.linalg.lstsq(design * root[:, None], vols[usable] * root, rcond=None)[0]
+    np.testing.assert_allclose(smile.coefficients, expected, atol=1e-6)
+    assert smile.points == usable.sum()
+
+
+def test_nan_handling():
+    smile = SmileFit()
+    assert np.isnan(smile.fitted(0.0))
+    # Nothing usable yet: no fit
+    smile.update([np.nan, 0.5], [0.2, np.nan])
+    assert smile.points == 0 and np.isnan(smile.coefficients).all()
+    # A single strike gives a flat smile through it instead of a singular system
+    smile.update([0.5], [0.25])
+    assert smile.points == 1
+    assert smile.fitted(0.5) == pytest.approx(0.25, abs=1e-6)
+    assert np.isnan(smile.residuals([0.0, 0.5], [np.nan, 0.25])[0])
+
+
+def test_history_equals_the_live_updates():
+    moneyness, vols, weights = moving_chain()
+    vols[:3] = np.nan  # No fit for the first ticks
+    smile = SmileFit(0.8)
+    live = np.array([smile.update(moneyness[t], vols[t], weights[t]) for t in range(len(vols))])
+    history = smile_history(moneyness, vols, weights, forgetting=0.8)
+    assert history.shape == (len(vols), 3)
+    assert np.isnan(history[:3]).all()
+    np.testing.assert_allclose(history[3:], live[3:], atol=1e-10)
+
+
+def test_state_round_trip():
+    moneyness, vols, weights = moving_chain(ticks=20)
+    smile = SmileFit()
+    for t in range(10):
+        smile.update(moneyness[t], vols[t], weights[t])
+    codec = StateCodec(smile.codec_fields("smile"))
+    restored = SmileFit().restore_state(codec.decode(codec.encode(smile.state("smile"))), "smile")
+    np.testing.assert_array_equal(restored.coefficients, smile.coefficients)
+    assert restored.points == smile.points
+    for t in range(10, 20):
+        np.testing.assert_array_equal(restored.update(moneyness[t], vols[t], weights[t]),
+                                      smile.update(moneyness[t], vols[t], weights[t]))
+    # No saved state: a fresh fit
+    assert SmileFit().restore_state(None, "smile").points == 0
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from common import loader
+from common.catalog import DatasetCatalog
+from common.storage import PartitionedStore
+
+RANGES = [(None, None), (0, 0), (25000, 61000), (24950, 61050), (None, 30000), (99000, None), (200000, 300000)]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "CACHE_DIR", tmp_path / "cache")
+    data = tmp_path / "data" / "round_1"
+    data.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+
+    prices = []
+    for timestamp in range(0, 100000, 100):
+        for product in ("RAINFOREST_RESIN", "KELP"):
+            bid = int(rng.integers(1990, 2010))
+            prices.append({"day": 0, "timestamp": timestamp, "product": product, "bid_price_1": bid,
+                           "bid_volume_1": int(rng.integers(1, 30)), "ask_price_1": bid + 2,
+                           "ask_volume_1": int(rng.integers(1, 30)), "mid_price": bid + 1.0})
+    pd.DataFrame(prices).to_csv(data / "prices_round_1_day_0.csv", sep=";", index=False)
+
+    # Several trades may share a timestamp, so both ends of a range need the right side
+    timestamps = np.sort(rng.choice(np.arange(0, 100000, 100), 400))
+    trades = pd.DataFrame({"timestamp": timestamps, "buyer": rng.choice(["", "Olivia"], 400), "seller": "",
+                           "symbol": rng.choice(["KELP", "SQUID_INK"], 400), "currency": "SEASHELLS",
+                           "price": rng.integers(1990, 2010, 400), "quantity": rng.integers(1, 10, 400)})
+    trades.to_csv(data / "trades_round_1_day_0.csv", sep=";", index=False)
+    return PartitionedStore(DatasetCatalog.load(tmp_path / "data"), tmp_path / "partitions")
+
+
+def full_frame(store, kind):
+    return pd.read_csv(store.catalog.path(kind, 1, 0), sep=";")
+
+
+def in_range(frame, start, end):
+    timestamps = frame["timestamp"]
+    keep = np.ones(len(frame), bool)
+    if start is not None:
+        keep &= timestamps >= start
+    if end is not None:
+        keep &= timestamps <= end
+    return frame[keep]
+
+
+@pytest.mark.parametrize("start, end", RANGES)
+def test_price_query_matches_filtering_the_file(store, start, end):
+    frame = full_frame(store, "prices")
+    assert store.products(store.catalog.resolve("prices", 1, 0)) == ["KELP", "RAINFOREST_RESIN"]
+    for product in ("KELP", "RAINFOREST_RESIN"):
+        expected = in_range(frame[frame["product"] == product], start, end)
+        rows = store.query_day("prices", 1, 0, product, start, end)
+        assert "product" not in rows
+        for name in ("timestamp", "bid_price_1", "bid_volume_1", "ask_price_1", "mid_price"):
+            np.testing.assert_array_equal(rows[name], expected[name].to_numpy())
+
+
+@pytest.mark.parametrize("start, end", RANGES)
+def test_trade_query_matches_filtering_the_file(store, start, end):
+    frame = full_frame(store, "trades")
+    entry = store.catalog.resolve("trades", 1, 0)
+    for symbol in ("KELP", "SQUID_INK"):
+        expected = in_range(frame[frame["symbol"] == symbol], start, end)
+        rows = store.query(entry, symbol, start, end, ["timestamp", "price", "buyer"])
+        assert list(rows) == ["timestamp", "price", "buyer"]
+        np.testing.assert_array_equal(rows["timestamp"], expected["timestamp"].to_numpy())
+        np.testing.assert_array_equal(rows["price"], expected["price"].to_numpy())
+        buyers = store.categories(entry, symbol)["buyer"]
+        assert [buyers[code] for code in rows["buyer"]] == expected["buyer"].fillna("").tolist()
+
+
+def test_unknown_product(store):
+    with pytest.raises(KeyError):
+        store.query_day("prices", 1, 0, "SQUID_INK")
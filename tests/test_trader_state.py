@@ -0,0 +1,50 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+from conftest import REPO_ROOT
+
+
+@pytest.fixture(params=["round_3/day3Algo", "round_4/scripts/day4Algo", "round_5/day5Algo"])
+def trader(request, monkeypatch):
+    folder, module = os.path.split(request.param)
+    monkeypatch.syspath_prepend(os.path.join(REPO_ROOT, folder))
+    for name in ("datamodel", module):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    return importlib.import_module(module).Trader()
+
+
+def count_decodes(trader, monkeypatch):
+    calls = []
+    decode = trader.state_codec.decode
+    monkeypatch.setattr(trader.state_codec, "decode", lambda data: calls.append(data) or decode(data))
+    return calls
+
+
+def test_own_trader_data_is_not_decoded_again(trader, monkeypatch):
+    for _ in range(30):
+        trader.price_action[trader.sma_products[0]].update(2000.0)
+    data = trader.save_state()
+    calls = count_decodes(trader, monkeypatch)
+    trader.load_state(data)
+    assert calls == []
+    # Without a save_state in between (a tick that raised) the state is loaded again
+    trader.load_state(data)
+    assert calls == [data]
+
+
+def test_other_trader_data_is_restored(trader, monkeypatch):
+    product = trader.sma_products[0]
+    for value in range(30):
+        trader.price_action[product].update(2000.0 + value)
+    data = trader.save_state()
+    # A new Trader, as when the exchange rebuilds it, and one that has written something else
+    rebuilt = type(trader)()
+    rebuilt.save_state()
+    for target in (rebuilt, type(trader)()):
+        calls = count_decodes(target, monkeypatch)
+        target.load_state(data)
+        assert calls == [data]
+        assert target.price_action[product].values() == trader.price_action[product].values()